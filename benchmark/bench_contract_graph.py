@@ -0,0 +1,79 @@
+import argparse, os, sys, time, random
+import pandas as pd
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+import pyapiccontractgraph
+
+# Build the contract graph of pyapiccontractgraph from synthetic fvRsCons, fvRsProv, vzAny, fvRsBd, fvRtCtx and vzRsSubjFiltAtt tables,
+# time the EPG pair and reachability queries and check them against the consumer x provider product of each contract.
+
+def make_frames(epgs: int, contracts: int, relations: int, vrfs: int, seed: int = 1) -> dict:
+    # EPGs spread over tenants and VRFs, one BD per EPG, a few external EPGs, vzAny of every 10th VRF consumes a contract
+    rnd = random.Random(seed)
+    epg_dns = [f'uni/tn-t{i % 20}/ap-app/epg-e{i}' for i in range(epgs)] + [f'uni/tn-t{i % 20}/out-o1/instP-x{i}' for i in range(epgs // 50)]
+    contract_dns = [f'uni/tn-t{i % 20}/brc-c{i}' for i in range(contracts)]
+    vrf_dns = [f'uni/tn-t{i % 20}/ctx-v{i}' for i in range(vrfs)]
+    cons = [(rnd.choice(epg_dns), rnd.choice(contract_dns)) for _ in range(relations // 2)]
+    prov = [(rnd.choice(epg_dns), rnd.choice(contract_dns)) for _ in range(relations // 2)]
+    anys = [(f'{vrf}/any', rnd.choice(contract_dns)) for vrf in vrf_dns[::10]]
+    bd_vrf = [rnd.randrange(vrfs) for _ in range(epgs)]
+    return {
+        'fvRsCons': pd.DataFrame({'dn': [f'{epg}/rscons-{c.rsplit("-", 1)[1]}' for epg, c in cons], 'tDn': [c for _, c in cons]}),
+        'fvRsProv': pd.DataFrame({'dn': [f'{epg}/rsprov-{c.rsplit("-", 1)[1]}' for epg, c in prov], 'tDn': [c for _, c in prov]}),
+        'vzRtAnyToCons': pd.DataFrame({'dn': [f'{c}/rtanyToCons-[{any}]' for any, c in anys], 'tDn': [any for any, _ in anys]}),
+        'vzRtAnyToProv': pd.DataFrame({'dn': pd.Series([], dtype='str'), 'tDn': pd.Series([], dtype='str')}),
+        'fvRsBd': pd.DataFrame({'dn': [f'{epg_dns[i]}/rsbd' for i in range(epgs)], 'tDn': [f'uni/tn-t{i % 20}/BD-b{i}' for i in range(epgs)]}),
+        'fvRtCtx': pd.DataFrame({'dn': [f'{vrf_dns[v]}/rtctx-[uni/tn-t{i % 20}/BD-b{i}]' for i, v in enumerate(bd_vrf)],
+                                 'tDn': [f'uni/tn-t{i % 20}/BD-b{i}' for i in range(epgs)]}),
+        'vzRsSubjFiltAtt': pd.DataFrame({'dn': [f'{c}/subj-s1/rssubjFiltAtt-f{i % 7}' for i, c in enumerate(contract_dns)],
+                                         'tnVzFilterName': [f'f{i % 7}' for i in range(contracts)], 'action': 'permit'}),
+    }
+
+def product(graph: pyapiccontractgraph.ContractGraph) -> pd.DataFrame:
+    # every consumer x provider pair of each contract, vzAny replaced by its EPGs
+    df = graph.relations.copy()
+    members = pd.DataFrame([(any, epg) for any, epgs in graph.members.items() for epg in epgs], columns=['group', 'member'])
+    df = pd.merge(df, members, left_on='epg', right_on='group', how='left')
+    df['epg'] = df['member'].fillna(df['epg'])
+    cons, prov = df[df['role'] == 'consumer'], df[df['role'] == 'provider']
+    return pd.merge(cons[['epg', 'contract']], prov[['epg', 'contract']], on='contract', suffixes=('_cons', '_prov')).drop_duplicates()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--epgs", type=int, default=20000, help="number of synthetic EPGs")
+    parser.add_argument("--contracts", type=int, default=5000, help="number of synthetic contracts")
+    parser.add_argument("--relations", type=int, default=60000, help="number of synthetic fvRsCons and fvRsProv relations")
+    parser.add_argument("--vrfs", type=int, default=200, help="number of synthetic VRFs")
+    parser.add_argument("--queries", type=int, default=1000, help="number of EPGs queried")
+    args = parser.parse_args()
+
+    frames = make_frames(args.epgs, args.contracts, args.relations, args.vrfs)
+    start = time.perf_counter()
+    graph = pyapiccontractgraph.ContractGraph(frames)
+    build_time = time.perf_counter() - start
+
+    rnd = random.Random(2)
+    epgs = sorted(graph.consumes.keys() | graph.provides.keys() | graph.vzany.keys())
+    epgs = [epg for epg in epgs if not epg.endswith('/any')]
+    sample = [rnd.choice(epgs) for _ in range(args.queries)]
+    start = time.perf_counter()
+    reach = [graph.who_can_reach(epg) for epg in sample]
+    reach_time = time.perf_counter() - start
+    start = time.perf_counter()
+    talk = [graph.can_talk(rnd.choice(epgs), rnd.choice(epgs)) for _ in range(args.queries)]
+    talk_time = time.perf_counter() - start
+
+    df_product = product(graph)
+    for epg, df in list(zip(sample, reach))[:100]:
+        expected = set(map(tuple, df_product.loc[df_product['epg_prov'] == epg, ['epg_cons', 'contract']].to_numpy()))
+        assert set(map(tuple, df[['consumer', 'contract']].to_numpy())) == expected, epg
+    for consumer, contract, provider in df_product[['epg_cons', 'contract', 'epg_prov']].sample(100, random_state=3).to_numpy():
+        df = graph.can_talk(consumer, provider)
+        assert ((df['consumer'] == consumer) & (df['contract'] == contract)).any(), (consumer, provider)
+
+    print(f'relations: {len(graph.relations)}, build: {build_time:.3f}s, full product: {len(df_product)} pairs')
+    print(f'who_can_reach {args.queries} EPGs: {reach_time:.3f}s ({reach_time / args.queries * 1e3:.2f}ms per query), {sum(map(len, reach))} rows')
+    print(f'can_talk {args.queries} EPG pairs: {talk_time:.3f}s ({talk_time / args.queries * 1e3:.2f}ms per query), {sum(map(len, talk))} rows')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse, os, sys, time
+import pandas as pd
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+import pyapicdn
+
+# Compare what the interface and contract analyses run now with their previous per table regexes on synthetic tables:
+# the dn parser (pyapicdn.parse_dn) for the node and port of l1PhysIf, a plain suffix strip for the fixed rns, and the
+# end anchored regexes for the child dns of the contract analysis, where the parser is slower (given for reference).
+
+def make_tables(rows: int) -> dict:
+    # 48 ports per leaf, 1 in 12 are breakout ports (eth1/49/1) which keep their dn as _intf_p
+    ports = [f'eth1/{p}' for p in range(1, 45)] + [f'eth1/{p}/{b}' for p in (49, 50) for b in (1, 2)]
+    phys = [f'topology/pod-{1 + i // 24000}/node-{1101 + i // 48}/sys/phys-[{ports[i % 48]}]' for i in range(rows)]
+    # one path per EPG and leaf port, vpc paths on protpaths
+    paths = [f'topology/pod-1/protpaths-{1101 + 2 * (i % 200)}-{1102 + 2 * (i % 200)}/pathep-[vpc-{i % 40}]' if i % 5 == 0 else
+             f'topology/pod-1/paths-{1101 + i % 400}/pathep-[eth1/{i // 400 % 48 + 1}]' for i in range(rows)]
+    path_att = [f'uni/tn-t{i % 20}/ap-app{i % 7}/epg-e{i % 2000}/rspathAtt-[{path}]' for i, path in enumerate(paths)]
+    return {
+        'l1PhysIf': pd.Series(phys, dtype='str'),
+        'ethpmFcot': pd.Series([f'{dn}/phys/fcot' for dn in phys], dtype='str'),
+        'rmonIfIn': pd.Series([f'{dn}/dbgIfIn' for dn in phys], dtype='str'),
+        'fvRsPathAtt': pd.Series(path_att, dtype='str'),
+        # the child rn of each row is distinct: one relation per EPG and contract, one filter per subject
+        'fvRsBd': pd.Series([f'uni/tn-t{i % 20}/ap-app{i % 7}/epg-e{i}/rsbd' for i in range(rows)], dtype='str'),
+        'fvRsCons': pd.Series([f'uni/tn-t{i % 20}/ap-app{i % 7}/epg-e{i % 2000}/rscons-c{i}' for i in range(rows)], dtype='str'),
+        'vzRsSubjFiltAtt': pd.Series([f'uni/tn-t{i % 20}/brc-c{i // 4}/subj-s{i % 2}/rssubjFiltAtt-f{i}' for i in range(rows)], dtype='str'),
+    }
+
+def regex_l1PhysIf(dn: pd.Series) -> pd.DataFrame:
+    # previous implementation
+    return pd.DataFrame({'_nodeid': dn.str.replace(r'.*node-(\d+).*', r'\1', regex=True),
+                         '_intf_p': dn.str.replace(r'.*\[eth1\/(\d+)\].*', 'p'+ r'\1', regex=True)})
+
+def parser_l1PhysIf(dn: pd.Series) -> pd.DataFrame:
+    # same as pyapicanaylsis_interface.process_frames
+    df_dn = pyapicdn.parse_dn(dn, ['node', 'interface'])
+    port = df_dn['interface'].str.removeprefix('eth1/')
+    is_port = (df_dn['interface'].str.startswith('eth1/') & port.str.isdigit()).fillna(False).astype(bool)
+    return pd.DataFrame({'_nodeid': df_dn['node'].fillna(dn), '_intf_p': ('p' + port).where(is_port, dn)})
+
+# table: (previous regex, current, dn parser or None when current is the parser)
+CASES = {
+    'l1PhysIf': (regex_l1PhysIf, parser_l1PhysIf, None),
+    'ethpmFcot': (lambda dn: dn.str.replace(r'/phys/fcot$', '', regex=True),
+                  lambda dn: dn.str.removesuffix('/phys/fcot'),
+                  lambda dn: pyapicdn.parse_dn(dn, ['interface_dn'])['interface_dn']),
+    'rmonIfIn': (lambda dn: dn.str.replace(r'/dbgIfIn$', '', regex=True),
+                 lambda dn: dn.str.removesuffix('/dbgIfIn'),
+                 lambda dn: pyapicdn.parse_dn(dn, ['parent'])['parent']),
+    'fvRsBd': (lambda dn: dn.str.replace(r'/rsbd$', '', regex=True),
+               lambda dn: dn.str.removesuffix('/rsbd'),
+               lambda dn: pyapicdn.parse_dn(dn, ['parent'])['parent']),
+    'fvRsCons': (lambda dn: dn.str.replace(r'/rscons-[^/]+$', '', regex=True),
+                 lambda dn: dn.str.replace(r'/rscons-[^/]+$', '', regex=True),
+                 lambda dn: pyapicdn.parse_dn(dn, ['parent'])['parent']),
+    'vzRsSubjFiltAtt': (lambda dn: dn.str.replace(r'/subj-(.*)/rssubjFiltAtt-(.*)$', '', regex=True),
+                        lambda dn: dn.str.replace(r'/subj-(.*)/rssubjFiltAtt-(.*)$', '', regex=True),
+                        lambda dn: pyapicdn.parse_dn(dn, ['contract_dn'])['contract_dn']),
+}
+
+def timed(func, dn: pd.Series) -> tuple:
+    start = time.perf_counter()
+    result = func(dn)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of rows of each synthetic table")
+    args = parser.parse_args()
+
+    tables = make_tables(args.rows)
+    print(f'rows per table: {args.rows}')
+    total_regex = total_current = 0
+    for table, (regex_func, current_func, parser_func) in CASES.items():
+        expected, regex_time = timed(regex_func, tables[table])
+        # cold: the distinct heads and tails are parsed, as for the first table of a device
+        pyapicdn.parse_head.cache_clear()
+        pyapicdn.parse_tail.cache_clear()
+        result, current_time = timed(current_func, tables[table])
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(result, expected)
+        else:
+            pd.testing.assert_series_equal(result, expected, check_names=False)
+        reference = ''
+        if parser_func:
+            pyapicdn.parse_head.cache_clear()
+            pyapicdn.parse_tail.cache_clear()
+            parsed, parser_time = timed(parser_func, tables[table])
+            pd.testing.assert_series_equal(parsed, expected, check_names=False)
+            reference = f', dn parser: {parser_time:.3f}s'
+        total_regex += regex_time
+        total_current += current_time
+        print(f'{table:16} regex: {regex_time:.3f}s  current: {current_time:.3f}s ({regex_time / current_time:.1f}x){reference}')
+    print(f'{"total":16} regex: {total_regex:.3f}s  current: {total_current:.3f}s ({total_regex / total_current:.1f}x)')
+
+if __name__ == "__main__":
+    main()
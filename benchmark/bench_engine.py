@@ -0,0 +1,69 @@
+import argparse, os, sys, json, time, tempfile, requests
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+import pyapicapi
+
+# Compare the threaded collection path (process_infile) with the asyncio engine (process_infiles_async)
+# against a simulated controller, each request sleeps for the given latency.
+
+class LatencyApicDevice(pyapicapi.CiscoApicDevice):
+    device_type = "bench_latency"
+    latency = 0.05
+    rows = 100
+
+    def get_token(self) -> str:
+        time.sleep(self.latency)
+        return 'token'
+
+    def get_api_resp(self, key: str, token: str, params: dict = None, stream: bool = False) -> requests.Response:
+        time.sleep(self.latency)
+        imdata = [{key: {"attributes": {"dn": f"uni/{key}-{i}", "name": f"{key}-{i}", "modTs": "2025-01-01T00:00:00.000+08:00"}}}
+                  for i in range(self.rows)]
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = json.dumps({"totalCount": str(self.rows), "imdata": imdata}).encode()
+        resp._content_consumed = True
+        return resp
+
+def write_config(config_dir: str, devices: int, tables: int, table_workers: int) -> list:
+    with open(os.path.join(config_dir, 'bench_tables.json'), 'w') as f:
+        json.dump({"remove_properties_flag": 1,
+                   "tables": [{"key": f"class{i}", "remove_properties": ["modTs"]} for i in range(tables)]}, f)
+    with open(os.path.join(config_dir, 'bench_apic.json'), 'w') as f:
+        json.dump({"devices": [{"environment": f"d{i}", "ip": f"10.0.0.{i}:443", "username": "admin", "password": "pass",
+                                "device_type": LatencyApicDevice.device_type, "table_workers": table_workers,
+                                "tables": "bench_tables.json"} for i in range(devices)]}, f)
+    return ['bench_apic.json']
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=8, help="number of simulated devices")
+    parser.add_argument("--tables", type=int, default=38, help="number of tables per device")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per simulated request")
+    parser.add_argument("--table-workers", type=int, default=pyapicapi.DEFAULT_TABLE_WORKERS, help="per device (per host) limit")
+    parser.add_argument("--max-concurrency", type=int, default=pyapicapi.DEFAULT_MAX_CONCURRENCY, help="asyncio engine global limit")
+    args = parser.parse_args()
+
+    LatencyApicDevice.latency = args.latency
+    pyapicapi.DEVICE_REGISTRY[LatencyApicDevice.device_type] = LatencyApicDevice
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pyapicapi.PARENT_DIR = tmpdir
+        pyapicapi.CONFIG_DIR_FULL = tmpdir
+        files = write_config(tmpdir, args.devices, args.tables, args.table_workers)
+
+        start = time.perf_counter()
+        outfiles = []
+        for f in files:
+            outfiles.extend(pyapicapi.process_infile(f, '20250101_0000')[0])
+        thread_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        async_outfiles = pyapicapi.process_infiles_async(files, '20250101_0001', args.max_concurrency)[0]
+        async_time = time.perf_counter() - start
+
+    print(f"devices={args.devices} tables={args.tables} latency={args.latency}s")
+    print(f"thread : {thread_time:8.3f}s ({len(outfiles)} devices)")
+    print(f"asyncio: {async_time:8.3f}s ({len(async_outfiles)} devices)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse, os, sys, time, random
+import pandas as pd
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+import pyapicanaylsis_interface
+
+# Compare the vectorized interface profile range expansion (df_intf_profile_split_rows)
+# with the previous row by row expansion on a synthetic set of access port selectors.
+
+def split_row(row) -> list:
+    # previous implementation, one iterrows() call per selector
+    nodeids = []
+    if '-' in row['_nodeid']:
+        start, end = row['_nodeid'].split('-')
+        nodeids = [str(i) for i in range(int(start), int(end) + 1)]
+    else:
+        nodeids = [row['_nodeid']]
+    intf_ps = []
+    intf_ns = []
+    if '-' in row['_intf_p']:
+        prefix = row['_intf_p'][0]
+        start, end = map(int, row['_intf_n'].split('-'))
+        intf_ps = [f"{prefix}{i}" for i in range(start, end + 1)]
+        intf_ns = [str(i) for i in range(start, end + 1)]
+    else:
+        intf_ps = [row['_intf_p']]
+        intf_ns = [row['_intf_n']]
+    result = []
+    for nodeid in nodeids:
+        for intf_p, intf_n in zip(intf_ps, intf_ns):
+            result.append({'dn': row['dn'], '_nodeid': nodeid, '_intf_p': intf_p, '_intf_n': intf_n, '_policyGrp': row['_policyGrp']})
+    return result
+
+def split_iterrows(df: pd.DataFrame) -> pd.DataFrame:
+    expanded_rows = []
+    for _, row in df.iterrows():
+        expanded_rows.extend(split_row(row))
+    return pd.DataFrame(expanded_rows)
+
+def make_profiles(selectors: int, seed: int = 1) -> pd.DataFrame:
+    # single ports (p31), port ranges in both forms (p1-p2, p16-17), single leaves and vpc leaf pairs
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(selectors):
+        leaf = 1101 + 2 * (i % 200)
+        nodeid = f'{leaf}-{leaf + 1}' if rnd.random() < 0.3 else str(leaf)
+        port = rnd.randint(1, 40)
+        form = rnd.random()
+        if form < 0.6:
+            intf_p, intf_n = f'p{port}', str(port)
+        elif form < 0.8:
+            intf_p, intf_n = f'p{port}-p{port + 3}', f'{port}-{port + 3}'
+        else:
+            intf_p, intf_n = f'p{port}-{port + 7}', f'{port}-{port + 7}'
+        rows.append({'dn': f'uni/infra/accportprof-lif-{nodeid}/hports-{intf_p}-typ-range-{i}', '_nodeid': nodeid,
+                     '_intf_p': intf_p, '_intf_n': intf_n, '_policyGrp': f'ipg-{i % 50}'})
+    return pd.DataFrame(rows).sort_values(by=['dn'])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--selectors", type=int, default=20000, help="number of synthetic access port selectors")
+    args = parser.parse_args()
+
+    df = make_profiles(args.selectors)
+    start = time.perf_counter()
+    expected = split_iterrows(df)
+    iterrows_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = pyapicanaylsis_interface.df_intf_profile_split_rows(df)
+    vectorized_time = time.perf_counter() - start
+
+    # same sort as the interface analysis
+    expected = expected.sort_values(['_nodeid', '_intf_n']).reset_index(drop=True)
+    result = result.sort_values(['_nodeid', '_intf_n']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected)
+
+    print(f'selectors: {len(df)}, expanded rows: {len(result)}')
+    print(f'iterrows:   {iterrows_time:.3f}s')
+    print(f'vectorized: {vectorized_time:.3f}s ({iterrows_time / vectorized_time:.1f}x)')
+
+if __name__ == "__main__":
+    main()
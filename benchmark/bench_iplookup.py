@@ -0,0 +1,67 @@
+import argparse, os, sys, time, random
+import numpy as np
+import pandas as pd
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+import pyapiciplookup
+import pysubnet
+
+# Build the IP to EPG index of pyapiciplookup from synthetic fvSubnet, fvRsBd, l3extSubnet and fvIp tables,
+# time a batch lookup and check a sample against a scan of all prefixes.
+
+def make_frames(bds: int, endpoints: int, seed: int = 1) -> dict:
+    # one /24 BD subnet and EPG per BD, endpoints in the BD subnets, external EPGs with a default route and the 172.16/12 range
+    rnd = random.Random(seed)
+    epgs = [f'uni/tn-t{i % 10}/ap-app/epg-e{i}' for i in range(bds)]
+    subnets = [f'10.{i // 250}.{i % 250}' for i in range(bds)]
+    ep = [rnd.randrange(bds) for _ in range(endpoints)]
+    hosts = [f'{subnets[b]}.{rnd.randint(2, 254)}' for b in ep]
+    return {
+        'fvRsBd': pd.DataFrame({'dn': [f'{epg}/rsbd' for epg in epgs], 'tDn': [f'uni/tn-t{i % 10}/BD-b{i}' for i in range(bds)]}),
+        'fvSubnet': pd.DataFrame({'dn': [f'uni/tn-t{i % 10}/BD-b{i}/subnet-[{subnet}.1/24]' for i, subnet in enumerate(subnets)],
+                                  'ip': [f'{subnet}.1/24' for subnet in subnets]}),
+        'l3extSubnet': pd.DataFrame({'dn': ['uni/tn-t0/out-o1/instP-any/extsubnet-[0.0.0.0/0]', 'uni/tn-t0/out-o1/instP-dc/extsubnet-[172.16.0.0/12]'],
+                                     'ip': ['0.0.0.0/0', '172.16.0.0/12']}),
+        'fvIp': pd.DataFrame({'dn': [f'{epgs[b]}/cep-00:50:56:00:00:01/ip-[{host}]' for b, host in zip(ep, hosts)], 'addr': hosts}),
+    }
+
+def scan(index: pyapiciplookup.IpEpgIndex, ip: str) -> set:
+    # rows of the longest prefixes containing ip, by comparing it with every prefix
+    _, network, prefix = pysubnet.to_network(index.entries['prefix'])
+    network, prefix = network.astype(np.int64), prefix.astype(np.int64)
+    _, address, _ = pysubnet.to_network([ip])
+    mask = (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+    contains = (int(address[0]) & mask) == network
+    if not contains.any():
+        return set()
+    return set(np.flatnonzero(contains & (prefix == prefix[contains].max())))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bds", type=int, default=5000, help="number of synthetic BD subnets and EPGs")
+    parser.add_argument("--endpoints", type=int, default=200000, help="number of synthetic fvIp endpoints")
+    parser.add_argument("--queries", type=int, default=10000, help="number of addresses looked up")
+    args = parser.parse_args()
+
+    frames = make_frames(args.bds, args.endpoints)
+    start = time.perf_counter()
+    index = pyapiciplookup.IpEpgIndex()
+    index.add_frames(frames, 'n1')
+    build_time = time.perf_counter() - start
+
+    rnd = random.Random(2)
+    ips = [f'{rnd.choice([10, 10, 10, 172, 8])}.{rnd.randint(0, 30)}.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}' for _ in range(args.queries)]
+    start = time.perf_counter()
+    df_result = index.lookup(ips)
+    lookup_time = time.perf_counter() - start
+
+    positions, rows = index.match(pd.Series(ips, dtype='str'))
+    for i in range(0, len(ips), max(len(ips) // 100, 1)):
+        assert set(rows[positions == i]) == scan(index, ips[i]), ips[i]
+
+    print(f'prefixes: {len(index.entries)}, build: {build_time:.3f}s')
+    print(f'lookup {len(ips)} addresses: {lookup_time:.3f}s ({lookup_time / len(ips) * 1e6:.1f}us per address), {len(df_result)} rows')
+    print(df_result['source'].value_counts(dropna=False).to_string())
+
+if __name__ == "__main__":
+    main()
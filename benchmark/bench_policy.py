@@ -0,0 +1,115 @@
+import argparse, os, sys, time, random
+import numpy as np
+import pandas as pd
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+import pyapicpolicy
+import bench_iplookup
+import bench_contract_graph
+
+# Evaluate a batch of synthetic flows with pyapicpolicy over the synthetic tables of bench_iplookup and bench_contract_graph
+# plus vzEntry filters, and check a sample of the verdicts against a flow by flow evaluation.
+
+def make_frames(epgs: int, contracts: int, relations: int, filters: int, seed: int = 1) -> dict:
+    # the EPGs of bench_contract_graph take the BD subnets of bench_iplookup, each filter has 1 to 4 tcp/udp/icmp entries,
+    # one entry in 10 restricts the source port
+    rnd = random.Random(seed)
+    frames = bench_contract_graph.make_frames(epgs, contracts, relations, max(epgs // 100, 1), seed)
+    for key, df in bench_iplookup.make_frames(epgs, epgs * 2, seed).items():
+        if key != 'fvRsBd':
+            # bench_iplookup spreads the EPGs and BDs over 10 tenants, bench_contract_graph over 20
+            frames[key] = df.assign(dn=df['dn'].str.replace(r'^uni/tn-t\d+/(ap-app/epg-e|BD-b)(\d+)',
+                                                            lambda m: f'uni/tn-t{int(m[2]) % 20}/{m[1]}{m[2]}', regex=True))
+    names, entries = [f'f{i}' for i in range(filters)], []
+    for i, name in enumerate(names):
+        for e in range(rnd.randint(1, 4)):
+            prot = rnd.choice(['tcp', 'tcp', 'udp', 'icmp', 'unspecified'])
+            start = rnd.choice(['https', 'http', 'ssh', 'dns', 1024, 8000, 'unspecified']) if prot in ('tcp', 'udp') else 'unspecified'
+            end = start if not isinstance(start, int) else start + rnd.randint(0, 1000)
+            src_start = rnd.randint(1024, 60000) if rnd.random() < 0.1 else 'unspecified'
+            src_end = src_start if src_start == 'unspecified' else src_start + rnd.randint(0, 5000)
+            entries.append((f'uni/tn-{"common" if i % 5 == 0 else f"t{i % 20}"}/flt-{name}/e-e{e}', f'e{e}', 'ip', prot, str(start), str(end),
+                            str(src_start), str(src_end)))
+    frames['vzEntry'] = pd.DataFrame(entries, columns=['dn', 'name', 'etherT', 'prot', 'dFromPort', 'dToPort', 'sFromPort', 'sToPort'])
+    df = frames['vzRsSubjFiltAtt']
+    filter_names = [rnd.choice(names) for _ in range(len(df))]
+    frames['vzRsSubjFiltAtt'] = pd.DataFrame({'dn': [f'{dn.rsplit("/", 1)[0]}/rssubjFiltAtt-{name}' for dn, name in zip(df['dn'], filter_names)],
+                                              'tnVzFilterName': filter_names, 'action': [rnd.choice(['permit'] * 9 + ['deny']) for _ in range(len(df))]})
+    return frames
+
+def make_flows(frames: dict, graph, flows: int, seed: int = 2) -> pd.DataFrame:
+    # half the flows between EPGs sharing a contract, the rest random, addresses taken from the endpoints
+    rnd = random.Random(seed)
+    df_ip = frames['fvIp']
+    hosts = df_ip.groupby(df_ip['dn'].str.replace(r'/cep-.*', '', regex=True))['addr'].agg(list).to_dict()
+    pairs = [(c, p) for contract in list(graph.consumers)[:2000] for c in graph.consumers[contract] for p in graph.providers.get(contract, [])
+             if c in hosts and p in hosts]
+    all_hosts = df_ip['addr'].tolist()
+    rows = []
+    for _ in range(flows):
+        if pairs and rnd.random() < 0.5:
+            c, p = rnd.choice(pairs)
+            src, dst = rnd.choice(hosts[c]), rnd.choice(hosts[p])
+        else:
+            src, dst = rnd.choice(all_hosts), rnd.choice(all_hosts)
+        prot = rnd.choice(['tcp', 'tcp', '6', 'udp', 'icmp'])
+        rows.append((src, dst, prot, str(rnd.randint(1024, 65535)), str(rnd.choice([443, 80, 22, 53, 1500, 8500, 9999]))))
+    return pd.DataFrame(rows, columns=pyapicpolicy.FLOW_COLUMNS)
+
+def evaluate_flow(evaluator, flow) -> set:
+    # verdicts of one flow, flow by flow and entry by entry
+    src_ip, dst_ip, prot, sport, dport = flow
+    protocol = int(prot) if prot.isdigit() else pyapicpolicy.PROTOCOLS[prot]
+    src_epgs = set(evaluator.index.lookup([src_ip])['epg'].dropna()) or {None}
+    dst_epgs = set(evaluator.index.lookup([dst_ip])['epg'].dropna()) or {None}
+    entries = evaluator.entries.entries
+    verdicts = set()
+    for s in src_epgs:
+        for d in dst_epgs:
+            if s is None or d is None:
+                verdicts.add((s, d, 'deny'))
+                continue
+            found = []
+            for contract, subject, name, code, permit in evaluator.rules(s, d):
+                if code < 0:
+                    continue
+                for _, e in entries.iloc[evaluator.entries.starts[code]:evaluator.entries.starts[code + 1]].iterrows():
+                    port_ok = e['protocol'] not in (6, 17) or (e['port_from'] <= int(dport) <= e['port_to']
+                                                               and e['src_port_from'] <= int(sport) <= e['src_port_to'])
+                    if e['ether'] in (0, 4) and e['protocol'] in (-1, protocol) and port_ok:
+                        found.append(permit)
+            verdicts.add((s, d, ('deny' if False in found else 'permit') if found else ('permit' if s == d else 'deny')))
+    return verdicts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--epgs", type=int, default=5000, help="number of synthetic EPGs with a BD subnet")
+    parser.add_argument("--contracts", type=int, default=2000, help="number of synthetic contracts")
+    parser.add_argument("--relations", type=int, default=20000, help="number of synthetic fvRsCons and fvRsProv relations")
+    parser.add_argument("--filters", type=int, default=500, help="number of synthetic filters")
+    parser.add_argument("--flows", type=int, default=500000, help="number of flows evaluated")
+    args = parser.parse_args()
+
+    frames = make_frames(args.epgs, args.contracts, args.relations, args.filters)
+    start = time.perf_counter()
+    evaluator = pyapicpolicy.PolicyEvaluator(frames)
+    build_time = time.perf_counter() - start
+    df_flows = make_flows(frames, evaluator.graph, args.flows)
+
+    start = time.perf_counter()
+    df_result = evaluator.evaluate(df_flows)
+    evaluate_time = time.perf_counter() - start
+
+    flow_index = {}
+    for i, row in enumerate(df_result.itertuples(index=False)):
+        flow_index.setdefault(tuple(row[:5]), set()).add((row.src_epg if isinstance(row.src_epg, str) else None,
+                                                          row.dst_epg if isinstance(row.dst_epg, str) else None, row.verdict))
+    for flow in df_flows.sample(min(200, len(df_flows)), random_state=3).itertuples(index=False, name=None):
+        assert flow_index[flow] == evaluate_flow(evaluator, flow), flow
+
+    print(f'filter entries: {len(frames["vzEntry"])}, relations: {len(evaluator.graph.relations)}, build: {build_time:.3f}s')
+    print(f'evaluate {len(df_flows)} flows: {evaluate_time:.3f}s ({len(df_flows) / evaluate_time * 60:,.0f} flows per minute), {len(df_result)} rows')
+    print(df_result.groupby(['verdict', 'reason']).size().to_string())
+
+if __name__ == "__main__":
+    main()
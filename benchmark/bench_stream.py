@@ -0,0 +1,62 @@
+import argparse, os, sys, gc, json, time, tracemalloc
+import pandas as pd
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+import pyapicapi
+import pyapicstream
+import fabric
+
+# Compare the previous parse of a class response (resp.json() of the whole body, a list of attribute dicts,
+# then the DataFrame) with the streamed parse into column lists (pyapicstream), on a synthetic fvCEp response:
+# time and peak memory (tracemalloc) of each, and checks that both give the same DataFrame.
+
+def parse_whole(body: bytes, key: str, keep: list, drop: list) -> pd.DataFrame:
+    # as requests' resp.json() followed by the previous parse_json
+    json_obj = json.loads(body.decode('utf-8'))
+    keep, drop = pyapicapi.get_property_sets(keep, drop)
+    parsed_data = [pyapicapi.filter_properties(data[key]['attributes'], keep, drop) for data in json_obj['imdata']]
+    return pd.DataFrame(parsed_data)
+
+def parse_stream(body: bytes, key: str, keep: list, drop: list) -> pd.DataFrame:
+    chunks = (body[i:i + pyapicstream.CHUNK_SIZE] for i in range(0, len(body), pyapicstream.CHUNK_SIZE))
+    device = pyapicapi.CiscoApicDevice('127.0.0.1', 'admin', 'pass')
+    return device.parse_json(pyapicstream.ImdataStream(chunks, key), key, keep, drop)
+
+def measure(func, *args) -> tuple:
+    gc.collect()
+    start = time.perf_counter()
+    df = func(*args)
+    seconds = time.perf_counter() - start
+    del df
+    gc.collect()
+    tracemalloc.start()
+    df = func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return df, seconds, peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of fvCEp objects")
+    parser.add_argument("--key", default='fvCEp', help="class of table_apic.json")
+    args = parser.parse_args()
+
+    fab = fabric.SyntheticFabric(endpoints=args.rows, epgs=max(args.rows // 100, 1))
+    table = {table['key']: table for table in fabric.get_tables()}[args.key]
+    body = json.dumps(fab.apic_response(args.key)).encode()
+    del fab
+    keep, drop = pyapicapi.get_table_properties(table, 1)
+
+    df_whole, whole_time, whole_peak = measure(parse_whole, body, args.key, keep, drop)
+    del df_whole
+    df_stream, stream_time, stream_peak = measure(parse_stream, body, args.key, keep, drop)
+    frame_size = df_stream.memory_usage(deep=True).sum()
+    pd.testing.assert_frame_equal(df_stream, parse_whole(body, args.key, keep, drop))
+
+    print(f"{args.key}: {len(df_stream)} rows x {df_stream.shape[1]} columns, body {len(body) / 1e6:.0f} MB, DataFrame {frame_size / 1e6:.0f} MB")
+    print(f"whole : {whole_time:8.3f}s, peak {whole_peak / 1e6:8.0f} MB")
+    print(f"stream: {stream_time:8.3f}s, peak {stream_peak / 1e6:8.0f} MB")
+    print("same DataFrame")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse, ipaddress, os, sys, time, random
+import pandas as pd
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+import pysubnet
+
+# Compare pysubnet.to_subnet with the previous per row calculate_subnet .apply()
+# on synthetic gateways (fvSubnet), endpoint addresses (fvIp) and IPv6 prefixes.
+
+def calculate_subnet(ip):
+    # previous implementation
+    if pd.isna(ip):
+        return ''
+    try:
+        network = ipaddress.ip_network(ip, strict=False)
+        return str(network)
+    except ValueError:
+        return ''
+
+def make_addresses(rows: int, seed: int = 1) -> pd.Series:
+    # 1 in 10 IPv6, a few null and invalid values, gateways repeat across EPGs and BDs
+    rnd = random.Random(seed)
+    values = []
+    for i in range(rows):
+        form = rnd.random()
+        if form < 0.4:
+            values.append(f'10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}')
+        elif form < 0.85:
+            values.append(f'172.{rnd.randint(16, 31)}.{rnd.randint(0, 255)}.1/{rnd.randint(16, 30)}')
+        elif form < 0.95:
+            values.append(f'2001:db8:{rnd.randint(0, 4095):x}::{rnd.randint(1, 65535):x}/64')
+        elif form < 0.98:
+            values.append(None)
+        else:
+            values.append(rnd.choice(['', '0.0.0.0', '10.0.0.256/24', '10.0.0.1/255.255.255.0']))
+    return pd.Series(values, dtype='str')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000, help="number of synthetic addresses")
+    args = parser.parse_args()
+
+    ips = make_addresses(args.rows)
+    start = time.perf_counter()
+    expected = ips.apply(calculate_subnet)
+    apply_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = pysubnet.to_subnet(ips)
+    vectorized_time = time.perf_counter() - start
+    pd.testing.assert_series_equal(result, expected)
+
+    print(f'addresses: {len(ips)}, distinct: {ips.nunique()}')
+    print(f'apply:      {apply_time:.3f}s')
+    print(f'vectorized: {vectorized_time:.3f}s ({apply_time / vectorized_time:.1f}x)')
+
+if __name__ == "__main__":
+    main()
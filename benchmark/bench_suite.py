@@ -0,0 +1,121 @@
+import argparse, os, sys, json, time, platform, shutil, subprocess, tempfile
+from datetime import datetime
+import pandas as pd
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+import pyapicapi
+import pymsoapi
+import pymerge_xlsx
+import fabric
+
+# Time the stages of a collection and analysis run on synthetic fabrics of several sizes:
+# parse_json, remove_columns and export_df_to_xlsx of every table_apic.json class, the F5 and MSO parsers,
+# each analysis module and pymerge_xlsx over the analysis outputs of several fabrics.
+# The results are written to a json file, compare two of them with --compare to spot regressions.
+
+MSO_KEYS = ['sites', 'tenants', 'schemas']
+
+def timed(func, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def run_scale(name: str, params: dict, workdir: str, fabrics: int) -> dict:
+    fab = fabric.SyntheticFabric(**params)
+    device = pyapicapi.CiscoApicDevice('127.0.0.1', 'admin', 'pass')
+    tables, stages = {}, dict.fromkeys(['parse_json', 'remove_columns', 'export_df_to_xlsx'], 0.0)
+    frames = {}
+    analysis_tables = pyapicapi.get_analysis_tables('cisco_apic')
+
+    writer = pd.ExcelWriter(os.path.join(workdir, f'ciscoapic_{name}.xlsx'))
+    for table in fabric.get_tables():
+        key = table['key']
+        json_obj = fab.apic_response(key)
+        response_bytes = len(json.dumps(json_obj))
+        # parse_json as the collection runs it, removed properties dropped while parsing
+        keep, drop = pyapicapi.get_table_properties(table, 1)
+        df, parse_time = timed(device.parse_json, json_obj, key, keep, drop)
+        # remove_columns on the full width frame, as with remove_properties_flag without projection
+        df_full = device.parse_json(json_obj, key)
+        _, remove_time = timed(pyapicapi.remove_columns, df_full, table.get('remove_properties', []))
+        _, export_time = timed(pyapicapi.export_df_to_xlsx, writer, df, key)
+        if key in analysis_tables:
+            frames[key] = pyapicapi.get_analysis_frame(df, analysis_tables[key])
+        tables[key] = {'rows': len(df), 'columns': df.shape[1], 'response_bytes': response_bytes,
+                       'parse_json': parse_time, 'remove_columns': remove_time, 'export_df_to_xlsx': export_time}
+        stages['parse_json'] += parse_time
+        stages['remove_columns'] += remove_time
+        stages['export_df_to_xlsx'] += export_time
+    _, stages['xlsx_close'] = timed(writer.close)
+
+    f5 = pyapicapi.F5LtmDevice('127.0.0.1', 'admin', 'pass')
+    for table in fabric.get_tables('table_f5ltm.json'):
+        keep, drop = pyapicapi.get_table_properties(table, 1)
+        _, stages[f'f5_parse_json_{table["key"]}'] = timed(f5.parse_json, fab.f5_response(table['key']), table['key'], keep, drop)
+    stages['mso_parse_json'] = sum(timed(pymsoapi.parse_mso_json, fab.mso_response(key), key)[1] for key in MSO_KEYS)
+
+    # analyses, with the outputs written to the work folder
+    outputs = {}
+    for module in pyapicapi.ANALYSIS_REGISTRY['cisco_apic']:
+        module.PARENT_DIR = workdir
+        outfile, stages[module.__name__] = timed(module.process_frames, frames, name, 'bench')
+        outputs[module.__name__] = os.path.join(workdir, outfile)
+
+    # pymerge_xlsx over the interface output of several fabrics
+    merge_files = []
+    for i in range(fabrics):
+        merge_files.append(os.path.join(workdir, f'apic_{name}{i}_interface_bench.xlsx'))
+        shutil.copyfile(outputs['pyapicanaylsis_interface'], merge_files[-1])
+    merged, merge_time = timed(pymerge_xlsx.merge_xlsx_files, merge_files)
+    _, save_time = timed(pymerge_xlsx.save_merged_xlsx, merged, os.path.join(workdir, f'apic_merged_{name}.xlsx'))
+    stages['pymerge_xlsx'] = merge_time + save_time
+
+    return {'params': params, 'objects': sum(table['rows'] for table in tables.values()),
+            'response_bytes': sum(table['response_bytes'] for table in tables.values()), 'stages': stages, 'tables': tables}
+
+def get_git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PARENT_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+def compare(baseline_file: str, results: dict) -> None:
+    # stage time of each scale against a previous results file
+    with open(baseline_file, 'r') as f:
+        baseline = json.load(f)
+    print(f'compared with {baseline_file} ({baseline.get("git_revision")}, {baseline.get("datetime")})')
+    for name, result in results['scales'].items():
+        before = baseline.get('scales', {}).get(name, {}).get('stages', {})
+        for stage, seconds in result['stages'].items():
+            if before.get(stage):
+                print(f'{name:8} {stage:32} {before[stage]:9.3f}s -> {seconds:9.3f}s ({(seconds / before[stage] - 1) * 100:+.0f}%)')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default='small,medium', help=f"comma separated scale points of {list(fabric.SCALES)}, example: --scales small,medium,large")
+    parser.add_argument("--fabrics", type=int, default=4, help="number of fabric outputs merged by pymerge_xlsx")
+    parser.add_argument("-o", "--outfile", help="results json, default: benchmark/results/bench_suite_<datetime>.json")
+    parser.add_argument("--compare", help="previous results json to compare with")
+    args = parser.parse_args()
+
+    results = {'datetime': datetime.now().strftime("%Y%m%d_%H%M%S"), 'version': pyapicapi.verion, 'git_revision': get_git_revision(),
+               'python': platform.python_version(), 'pandas': pd.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count(), 'scales': {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.scales.split(','):
+            start = time.perf_counter()
+            results['scales'][name] = run_scale(name, fabric.SCALES[name], workdir, args.fabrics)
+            result = results['scales'][name]
+            print(f'{name}: {result["objects"]} objects, {result["response_bytes"] / 1e6:.1f} MB of responses, {time.perf_counter() - start:.1f}s')
+            for stage, seconds in result['stages'].items():
+                print(f'  {stage:32} {seconds:9.3f}s')
+
+    outfile = args.outfile or os.path.join(PARENT_DIR, 'benchmark', 'results', f'bench_suite_{results["datetime"]}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(outfile)), exist_ok=True)
+    with open(outfile, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'results: {outfile}')
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == "__main__":
+    main()
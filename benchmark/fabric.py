@@ -0,0 +1,302 @@
+import json, os, random
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+CONFIG_DIR_FULL = os.path.join(PARENT_DIR, 'config')
+
+# Synthetic ACI fabric for the benchmarks: APIC class query responses (imdata) for every class of table_apic.json,
+# F5 ltm collections (items) and MSO lists, consistent with each other, e.g. the static paths of the EPGs are on the
+# interfaces of l1PhysIf and the endpoints are in the BD subnets. Each object also carries the properties the table
+# config removes, so the parsing and column removal see responses of a realistic width.
+
+TIMESTAMP = '2025-10-01T12:00:00.000+08:00'
+# scale points of the benchmarks, keyword arguments of SyntheticFabric
+SCALES = {
+    'small': dict(leaves=4, ports=48, tenants=2, epgs=50, contracts=20, endpoints=1000, faults=500, virtuals=100),
+    'medium': dict(leaves=20, ports=48, tenants=10, epgs=500, contracts=200, endpoints=10000, faults=5000, virtuals=1000),
+    'large': dict(leaves=100, ports=48, tenants=40, epgs=4000, contracts=1500, endpoints=100000, faults=50000, virtuals=5000),
+}
+
+def get_tables(file: str = 'table_apic.json') -> list:
+    with open(os.path.join(CONFIG_DIR_FULL, file), 'r') as f:
+        return json.load(f)['tables']
+
+def get_filler(prop: str) -> str:
+    # a plausible value for a property the analyses never read
+    if prop.endswith('Ts') or prop.endswith('Tm'):
+        return TIMESTAMP
+    if prop in ('childAction', 'status', 'configIssues', 'descr', 'nameAlias', 'annotation', 'ownerKey', 'ownerTag', 'extMngdBy'):
+        return ''
+    if prop in ('lcOwn',):
+        return 'local'
+    if prop in ('uid', 'userdom', 'monPolDn'):
+        return {'uid': '15374', 'userdom': ':all:common:', 'monPolDn': 'uni/tn-common/monepg-default'}[prop]
+    return 'unspecified'
+
+class SyntheticFabric:
+    """
+        One fabric of the given scale: leaves with ports, tenants with VRFs, BDs and EPGs, contracts with filters,
+        endpoints and faults. Objects are built per class on first use and kept, the same seed gives the same fabric.
+    """
+    def __init__(self, leaves: int = 4, ports: int = 48, tenants: int = 2, epgs: int = 20, contracts: int = 10,
+                 endpoints: int = 200, faults: int = 100, virtuals: int = 50, seed: int = 1):
+        self.leaves, self.ports, self.tenants, self.epgs = max(leaves, 2), ports, max(tenants, 1), max(epgs, 1)
+        self.contracts, self.endpoints, self.faults, self.virtuals = max(contracts, 1), endpoints, faults, virtuals
+        self.seed = seed
+        self.tables = {table['key']: table for table in get_tables()}
+        self.f5_tables = {table['key']: table for table in get_tables('table_f5ltm.json')}
+        self.cache = {}
+
+        rnd = random.Random(seed)
+        self.nodes = [101 + i for i in range(self.leaves)]
+        self.spines = [201, 202]
+        self.tenant_names = [f'tn{i}' for i in range(self.tenants)]
+        # EPG i is in tenant i % tenants, in its own BD, in one of the two VRFs of the tenant
+        self.epg_dns, self.bd_dns, self.vrf_of_bd = [], [], []
+        for i in range(self.epgs):
+            tenant = self.tenant_names[i % self.tenants]
+            self.epg_dns.append(f'uni/tn-{tenant}/ap-ap{i % 3}/epg-epg{i}')
+            self.bd_dns.append(f'uni/tn-{tenant}/BD-bd{i}')
+            self.vrf_of_bd.append(f'uni/tn-{tenant}/ctx-vrf{i % 2}')
+        self.contract_dns = [f'uni/tn-{self.tenant_names[i % self.tenants]}/brc-ct{i}' for i in range(self.contracts)]
+        self.filter_dns = [f'uni/tn-{self.tenant_names[i % self.tenants]}/flt-flt{i}' for i in range(max(self.contracts // 2, 1))]
+        self.consumes = [rnd.sample(range(self.contracts), min(2, self.contracts)) for _ in range(self.epgs)]
+        self.provides = [rnd.randrange(self.contracts) for _ in range(self.epgs)]
+        # static paths: each EPG on a few ports of a few leaves, VLAN 100 + EPG number
+        self.paths = [[(rnd.choice(self.nodes), rnd.randint(1, self.ports)) for _ in range(4)] for _ in range(self.epgs)]
+        self.rnd = rnd
+
+    def get_objects(self, key: str) -> list:
+        """Attribute dicts of the objects of an APIC class, with the removed properties of its table."""
+        if key not in self.cache:
+            builder = getattr(self, f'build_{key}', None)
+            objects = builder() if builder else [{'dn': f'uni/{key}-{i}', 'name': f'{key}{i}'} for i in range(10)]
+            remove = self.tables.get(key, {}).get('remove_properties', [])
+            self.cache[key] = [dict(obj, **{prop: get_filler(prop) for prop in remove if prop not in obj}) for obj in objects]
+        return self.cache[key]
+
+    def apic_response(self, key: str, page: int = None, page_size: int = None) -> dict:
+        """Body of GET /api/class/<key>.json, one page of it when page and page_size are given."""
+        objects = self.get_objects(key)
+        if page_size:
+            objects = objects[page * page_size:(page + 1) * page_size]
+        return {'totalCount': str(len(self.get_objects(key))), 'imdata': [{key: {'attributes': obj}} for obj in objects]}
+
+    def f5_response(self, key: str) -> dict:
+        """Body of GET /mgmt/tm/ltm/<key>."""
+        if key != 'virtual':
+            return {'kind': f'tm:ltm:{key}:{key}collectionstate', 'items': []}
+        items = []
+        for i in range(self.virtuals):
+            item = {'kind': 'tm:ltm:virtual:virtualstate', 'name': f'vs_app{i}_443', 'partition': 'Common', 'fullPath': f'/Common/vs_app{i}_443',
+                    'destination': f'/Common/10.{200 + i // 65536 % 50}.{i // 256 % 256}.{i % 256}:443', 'pool': f'/Common/pool_app{i}',
+                    'description': f'app{i}', 'enabled': True, 'vlansEnabled': True, 'vlans': ['/Common/vlan_ext'],
+                    'profilesReference': {'link': f'https://localhost/mgmt/tm/ltm/virtual/~Common~vs_app{i}_443/profiles', 'isSubcollection': True}}
+            remove = self.f5_tables.get(key, {}).get('remove_properties', [])
+            items.append(dict(item, **{prop: get_filler(prop) for prop in remove if prop not in item}))
+        return {'kind': 'tm:ltm:virtual:virtualcollectionstate', 'items': items}
+
+    def mso_response(self, key: str) -> dict:
+        """Body of GET /api/v1/<key> for the sites, tenants and schemas lists."""
+        if key == 'sites':
+            return {'sites': [{'id': f'site{i:020d}', 'name': f'site{i}', 'apicSiteId': str(i + 1), 'urls': [f'https://10.0.{i}.1'],
+                               'platform': 'on-premise', 'siteType': 'aci'} for i in range(2)]}
+        if key == 'tenants':
+            return {'tenants': [{'id': f'tenant{i:018d}', 'name': name, 'displayName': name, 'siteAssociations': [{'siteId': f'site{s:020d}'} for s in range(2)]}
+                                for i, name in enumerate(self.tenant_names)]}
+        if key == 'schemas':
+            return {'schemas': [{'id': f'schema{i:018d}', 'displayName': f'schema-{name}',
+                                 'templates': [{'name': f'template-{name}', 'tenantId': f'tenant{i:018d}',
+                                                'anps': [{'name': f'ap{a}', 'epgs': [{'name': dn.rsplit('-', 1)[1], 'bdRef': {'bdName': f'bd{e}'}}
+                                                                                    for e, dn in enumerate(self.epg_dns) if dn.startswith(f'uni/tn-{name}/ap-ap{a}/')]}
+                                                         for a in range(3)],
+                                                'contracts': [{'name': dn.rsplit('-', 1)[1]} for dn in self.contract_dns if dn.startswith(f'uni/tn-{name}/')]}]}
+                                for i, name in enumerate(self.tenant_names)]}
+        return {key: []}
+
+    # topology ========================================
+    def build_topSystem(self) -> list:
+        nodes = [(n, 'leaf') for n in self.nodes] + [(n, 'spine') for n in self.spines] + [(i, 'controller') for i in (1, 2, 3)]
+        return [{'dn': f'topology/pod-1/node-{n}/sys', 'name': f'{role}{n}', 'id': str(n), 'fabricId': '1', 'podId': '1', 'role': role,
+                 'serial': f'FDO2{n:05d}', 'state': 'in-service', 'version': 'n9000-15.2(8e)', 'oobMgmtAddr': f'172.16.0.{n % 250}',
+                 'inbMgmtAddr': '0.0.0.0', 'inbMgmtGateway': '0.0.0.0', 'lastRebootTime': TIMESTAMP, 'lastResetReason': 'reload',
+                 'systemUpTime': '120:10:20:30.000', 'tepPool': '10.0.0.0/16', 'address': f'10.0.{n // 250}.{n % 250}'} for n, role in nodes]
+
+    def interfaces(self) -> list:
+        return [(n, p) for n in self.nodes for p in range(1, self.ports + 1)]
+
+    def build_l1PhysIf(self) -> list:
+        return [{'dn': f'topology/pod-1/node-{n}/sys/phys-[eth1/{p}]', 'id': f'eth1/{p}', 'descr': f'server{n}-{p}' if p % 4 else '',
+                 'portT': 'fab' if p > self.ports - 2 else 'leaf', 'mode': 'trunk', 'layer': 'Layer2', 'usage': 'epg' if p % 5 else 'discovery',
+                 'adminSt': 'up' if p % 7 else 'down', 'autoNeg': 'on', 'modTs': TIMESTAMP, 'speed': 'inherit', 'mtu': '9216'}
+                for n, p in self.interfaces()]
+
+    def build_ethpmPhysIf(self) -> list:
+        return [{'dn': f'topology/pod-1/node-{n}/sys/phys-[eth1/{p}]/phys', 'lastLinkStChg': TIMESTAMP, 'accessVlan': 'vlan-1', 'nativeVlan': 'vlan-1',
+                 'operSpeed': '10G' if p % 3 else '25G', 'operDuplex': 'full', 'operSt': 'up' if p % 7 else 'down', 'operStQual': 'none',
+                 'bundleIndex': f'po{p}' if p % 10 == 0 else 'unspecified', 'operVlans': '100-140', 'allowedVlans': '100-140'}
+                for n, p in self.interfaces()]
+
+    def build_ethpmFcot(self) -> list:
+        return [{'dn': f'topology/pod-1/node-{n}/sys/phys-[eth1/{p}]/phys/fcot', 'guiCiscoEID': 'SFP-10G-SR', 'guiName': 'CISCO-AVAGO',
+                 'guiSN': f'AVD{n:04d}{p:03d}', 'guiCiscoPN': '10-2415-03', 'state': 'inserted'} for n, p in self.interfaces() if p % 6]
+
+    def build_rmonIfIn(self) -> list:
+        return [{'dn': f'topology/pod-1/node-{n}/sys/phys-[eth1/{p}]/dbgIfIn', 'discards': str(self.rnd.choice([0, 0, 0, 12])),
+                 'errors': str(self.rnd.choice([0, 0, 0, 0, 3]))} for n, p in self.interfaces()]
+
+    def build_rmonIfOut(self) -> list:
+        return [{'dn': f'topology/pod-1/node-{n}/sys/phys-[eth1/{p}]/dbgIfOut', 'discards': str(self.rnd.choice([0, 0, 5])), 'errors': '0'}
+                for n, p in self.interfaces()]
+
+    def build_lldpAdjEp(self) -> list:
+        return [{'dn': f'topology/pod-1/node-{n}/sys/lldp/inst/if-[eth1/{p}]/adj-1', 'sysName': f'spine{s}', 'portIdV': f'Eth1/{n - 100}',
+                 'mgmtIp': f'10.0.0.{s % 250}', 'chassisIdV': f'00:3a:9c:00:{s % 256:02x}:01'}
+                for n in self.nodes for p, s in zip((self.ports - 1, self.ports), self.spines)]
+
+    def build_infraRsAccBaseGrp(self) -> list:
+        # an access port range per leaf (p<N>-<M>), two single port vPC selectors (p<N>) per leaf pair
+        objects = [{'dn': f'uni/infra/accportprof-lif-{n}/hports-p1-{self.ports // 2}-typ-range/rsaccBaseGrp', 'tCl': 'infraAccPortGrp',
+                    'tDn': 'uni/infra/funcprof/accportgrp-ipg-server'} for n in self.nodes]
+        for n1, n2 in zip(self.nodes[::2], self.nodes[1::2]):
+            objects += [{'dn': f'uni/infra/accportprof-lif-{n1}-{n2}/hports-p{p}-typ-range/rsaccBaseGrp', 'tCl': 'infraAccBndlGrp',
+                         'tDn': f'uni/infra/funcprof/accbundle-vpc-{n1}-{n2}-p{p}'} for p in range(self.ports // 2 + 1, self.ports // 2 + 3)]
+        return objects
+
+    def build_infraAccBndlGrp(self) -> list:
+        return [{'dn': obj['tDn'], 'name': obj['tDn'].split('accbundle-', 1)[1], 'descr': '', 'lagT': 'node'}
+                for obj in self.build_infraRsAccBaseGrp() if obj['tCl'] == 'infraAccBndlGrp']
+
+    def build_faultInst(self) -> list:
+        codes = [('F0532', 'major', 'interface-physical-down'), ('F1394', 'warning', 'oper-state-err'), ('F0467', 'minor', 'configuration-failed')]
+        return [{'dn': f'topology/pod-1/node-{self.nodes[i % len(self.nodes)]}/sys/phys-[eth1/{i % self.ports + 1}]/fault-{codes[i % 3][0]}',
+                 'code': codes[i % 3][0], 'severity': codes[i % 3][1], 'cause': codes[i % 3][2], 'lc': 'raised', 'created': TIMESTAMP,
+                 'descr': f'Port is down, reason:{codes[i % 3][2]}', 'ack': 'no', 'type': 'communications', 'title': ''} for i in range(self.faults)]
+
+    def equipment(self, name: str, count: int) -> list:
+        return [{'dn': f'topology/pod-1/node-{n}/sys/ch/{name}-{i}', 'id': str(i), 'model': f'N9K-{name.upper()}', 'operSt': 'ok', 'ser': f'SER{n}{i}'}
+                for n in self.nodes + self.spines for i in range(1, count + 1)]
+
+    def build_eqptFlash(self) -> list:
+        return self.equipment('flash', 1)
+
+    def build_eqptFt(self) -> list:
+        return self.equipment('ftslot', 4)
+
+    def build_eqptFan(self) -> list:
+        return self.equipment('fan', 8)
+
+    def build_eqptPsu(self) -> list:
+        return self.equipment('psu', 2)
+
+    # tenants ========================================
+    def build_fvAp(self) -> list:
+        return [{'dn': dn, 'name': dn.rsplit('-', 1)[1]} for dn in sorted({dn.rsplit('/', 1)[0] for dn in self.epg_dns})]
+
+    def build_fvBD(self) -> list:
+        return [{'dn': dn, 'name': dn.rsplit('-', 1)[1], 'arpFlood': 'no', 'unicastRoute': 'yes', 'limitIpLearnToSubnets': 'yes'} for dn in self.bd_dns]
+
+    def build_fvAEPg(self) -> list:
+        return [{'dn': dn, 'name': dn.rsplit('-', 1)[1], 'prefGrMemb': 'exclude', 'pcEnfPref': 'unenforced', 'shutdown': 'no'} for dn in self.epg_dns]
+
+    def build_fvRsBd(self) -> list:
+        return [{'dn': f'{epg}/rsbd', 'tDn': bd, 'tnFvBDName': bd.rsplit('-', 1)[1]} for epg, bd in zip(self.epg_dns, self.bd_dns)]
+
+    def subnet(self, i: int) -> str:
+        return f'10.{i // 256 % 256}.{i % 256}'
+
+    def build_fvSubnet(self) -> list:
+        objects = [{'dn': f'{bd}/subnet-[{self.subnet(i)}.1/24]', 'ip': f'{self.subnet(i)}.1/24', 'scope': 'private'} for i, bd in enumerate(self.bd_dns)]
+        objects += [{'dn': f'{bd}/subnet-[2001:db8:{i:x}::1/64]', 'ip': f'2001:db8:{i:x}::1/64', 'scope': 'private'} for i, bd in enumerate(self.bd_dns) if i % 10 == 0]
+        return objects
+
+    def build_fvRtCtx(self) -> list:
+        return [{'dn': f'{vrf}/rtctx-[{bd}]', 'tDn': bd} for bd, vrf in zip(self.bd_dns, self.vrf_of_bd)]
+
+    def build_vzBrCP(self) -> list:
+        return [{'dn': dn, 'name': dn.rsplit('-', 1)[1], 'targetDscp': 'unspecified'} for dn in self.contract_dns]
+
+    def build_vzEntry(self) -> list:
+        ports = ['https', 'http', 'ssh', 'dns', '8443', '3306']
+        return [{'dn': f'{dn}/e-e{e}', 'name': f'e{e}', 'etherT': 'ip', 'prot': 'tcp' if e < 2 else 'udp',
+                 'dFromPort': ports[(f + e) % len(ports)], 'dToPort': ports[(f + e) % len(ports)],
+                 'sFromPort': 'unspecified', 'sToPort': 'unspecified'}
+                for f, dn in enumerate(self.filter_dns) for e in range(1 + f % 3)]
+
+    def build_vzRsSubjFiltAtt(self) -> list:
+        return [{'dn': f'{dn}/subj-subj0/rssubjFiltAtt-{self.filter_dns[(c + k) % len(self.filter_dns)].rsplit("-", 1)[1]}',
+                 'tnVzFilterName': self.filter_dns[(c + k) % len(self.filter_dns)].rsplit('-', 1)[1], 'action': 'permit'}
+                for c, dn in enumerate(self.contract_dns) for k in range(1 + c % 2)]
+
+    def build_fvRsCons(self) -> list:
+        return [{'dn': f'{epg}/rscons-{self.contract_dns[c].rsplit("-", 1)[1]}', 'tDn': self.contract_dns[c], 'tnVzBrCPName': self.contract_dns[c].rsplit('-', 1)[1]}
+                for epg, contracts in zip(self.epg_dns, self.consumes) for c in contracts]
+
+    def build_fvRsProv(self) -> list:
+        return [{'dn': f'{epg}/rsprov-{self.contract_dns[c].rsplit("-", 1)[1]}', 'tDn': self.contract_dns[c], 'tnVzBrCPName': self.contract_dns[c].rsplit('-', 1)[1]}
+                for epg, c in zip(self.epg_dns, self.provides)]
+
+    def build_vzRtCons(self) -> list:
+        return [{'dn': f'{obj["tDn"]}/rtfvCons-[{obj["dn"].rsplit("/", 1)[0]}]', 'tDn': obj['dn'].rsplit('/', 1)[0]} for obj in self.build_fvRsCons()]
+
+    def build_vzRtProv(self) -> list:
+        return [{'dn': f'{obj["tDn"]}/rtfvProv-[{obj["dn"].rsplit("/", 1)[0]}]', 'tDn': obj['dn'].rsplit('/', 1)[0]} for obj in self.build_fvRsProv()]
+
+    def build_vzRtAnyToCons(self) -> list:
+        vrfs = sorted(set(self.vrf_of_bd))
+        return [{'dn': f'{self.contract_dns[i % self.contracts]}/rtanyToCons-[{vrf}/any]', 'tDn': f'{vrf}/any'} for i, vrf in enumerate(vrfs)]
+
+    def build_vzRtAnyToProv(self) -> list:
+        vrfs = sorted(set(self.vrf_of_bd))
+        return [{'dn': f'{self.contract_dns[-1 - i % self.contracts]}/rtanyToProv-[{vrf}/any]', 'tDn': f'{vrf}/any'} for i, vrf in enumerate(vrfs[::2])]
+
+    def build_fvRsPathAtt(self) -> list:
+        return [{'dn': f'{epg}/rspathAtt-[topology/pod-1/paths-{n}/pathep-[eth1/{p}]]', 'encap': f'vlan-{100 + i % 3900}', 'instrImedcy': 'immediate',
+                 'mode': 'regular', 'tDn': f'topology/pod-1/paths-{n}/pathep-[eth1/{p}]'}
+                for i, (epg, paths) in enumerate(zip(self.epg_dns, self.paths)) for n, p in sorted(set(paths))]
+
+    def build_vlanCktEp(self) -> list:
+        return [{'ctrl': '', 'dn': f'topology/pod-1/node-{n}/sys/ctx-[vxlan-{2097152 + i}]/bd-[vxlan-{16000000 + i}]/vlan-[vlan-{100 + i % 3900}]',
+                 'encap': f'vlan-{100 + i % 3900}', 'epgDn': epg, 'fabEncap': f'vxlan-{8000 + i}', 'id': str(10 + i % 3000), 'pcTag': str(16386 + i), 'name': epg}
+                for i, (epg, paths) in enumerate(zip(self.epg_dns, self.paths)) for n in sorted({n for n, _ in paths})]
+
+    def endpoint(self, i: int) -> tuple:
+        # (EPG index, mac, ip) of endpoint i
+        e = i % self.epgs
+        return e, f'00:50:56:{i // 65536 % 256:02X}:{i // 256 % 256:02X}:{i % 256:02X}', f'{self.subnet(e)}.{10 + i // self.epgs % 240}'
+
+    def build_fvCEp(self) -> list:
+        objects = []
+        for i in range(self.endpoints):
+            e, mac, ip = self.endpoint(i)
+            n, p = self.paths[e][0]
+            objects.append({'dn': f'{self.epg_dns[e]}/cep-{mac}', 'mac': mac, 'ip': ip, 'encap': f'vlan-{100 + e % 3900}', 'fabricPathDn': f'topology/pod-1/paths-{n}/pathep-[eth1/{p}]',
+                            'learningSource': 'learned', 'vmmSrc': ''})
+        return objects
+
+    def build_fvIp(self) -> list:
+        objects = []
+        for i in range(self.endpoints):
+            e, mac, ip = self.endpoint(i)
+            objects.append({'dn': f'{self.epg_dns[e]}/cep-{mac}/ip-[{ip}]', 'addr': ip, 'fabricPathDn': ''})
+        return objects
+
+    def l3outs(self) -> list:
+        return [(f'uni/tn-{tenant}/out-l3out-{tenant}', f'uni/tn-{tenant}/ctx-vrf0') for tenant in self.tenant_names]
+
+    def build_l3extInstP(self) -> list:
+        return [{'dn': f'{out}/instP-{name}', 'name': name, 'floodOnEncap': 'disabled'} for out, _ in self.l3outs() for name in ('default', 'dc')]
+
+    def build_l3extSubnet(self) -> list:
+        return [obj for out, _ in self.l3outs() for obj in (
+            {'dn': f'{out}/instP-default/extsubnet-[0.0.0.0/0]', 'ip': '0.0.0.0/0'},
+            {'dn': f'{out}/instP-dc/extsubnet-[172.16.0.0/12]', 'ip': '172.16.0.0/12'})]
+
+    def build_ipRouteP(self) -> list:
+        return [{'dn': f'{out}/lnodep-nodes/rsnodeL3OutAtt-[topology/pod-1/node-{self.nodes[0]}]/rt-[{prefix}]', 'ip': prefix}
+                for out, _ in self.l3outs() for prefix in ('0.0.0.0/0', '172.16.0.0/12')]
+
+    def build_ipNexthopP(self) -> list:
+        return [{'dn': f'{obj["dn"]}/nh-[192.168.255.1]', 'nhAddr': '192.168.255.1', 'type': 'prefix'} for obj in self.build_ipRouteP()]
+
+    def build_vnsRsCIfPathAtt(self) -> list:
+        return [{'dn': f'uni/tn-{tenant}/lDevVip-fw/cDev-fw1/cIf-[outside]/rsCIfPathAtt', 'tDn': f'topology/pod-1/paths-{self.nodes[0]}/pathep-[eth1/1]'}
+                for tenant in self.tenant_names]
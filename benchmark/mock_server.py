@@ -0,0 +1,411 @@
+import argparse, os, re, sys, ssl, operator, json, gzip, time, random, secrets, shutil, subprocess, tempfile, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+import pysnapshot
+import fabric
+
+# Local stand-in for the controllers, so the collection can be benchmarked without a fabric.
+# One HTTPS server answers the APIC, F5 and MSO apis the collectors use, with synthetic (fabric.py)
+# or recorded (a snapshot folder of pyapicapi.py --snapshot) data, and simulates the network and
+# the controller load: latency, bandwidth, request rate limit (429), busy (503) and dropped connections.
+
+TOKEN_TIMEOUT = 600
+CHUNK_SIZE = 64 * 1024
+
+# network and controller profiles, the command line options override single values
+PROFILES = {
+    'none': {},
+    'lan': dict(latency=0.005, bandwidth=100e6),
+    'wan': dict(latency=0.08, jitter=0.04, bandwidth=5e6),
+    'busy': dict(latency=0.05, jitter=0.02, rate=20, error_rate=0.02),
+    'flaky': dict(latency=0.05, jitter=0.05, error_rate=0.05, failure_rate=0.02),
+}
+PROFILE_DEFAULTS = dict(latency=0.0, jitter=0.0, bandwidth=0.0, rate=0.0, error_rate=0.0, failure_rate=0.0)
+# implicit and operational properties of the synthetic classes, left out by rsp-prop-include=config-only
+OPERATIONAL_PROPERTIES = {'childAction', 'extMngdBy', 'forceResolve', 'lcC', 'lcOwn', 'modTs', 'monPolDn', 'rType', 'state', 'stateQual',
+                          'status', 'tCl', 'tType', 'uid', 'userdom', 'fabricPathDn', 'learningSource', 'baseEpgDn', 'createTs'}
+
+class FilterError(ValueError):
+    pass
+
+def compare(value: str, other: str, op) -> bool:
+    # numbers as numbers, everything else (e.g. modTs timestamps) as strings
+    if value is None:
+        return False
+    try:
+        return op(float(value), float(other))
+    except ValueError:
+        return op(str(value), str(other))
+
+FILTER_OPS = {
+    'eq': lambda v, a: v == a[0],
+    'ne': lambda v, a: v != a[0],
+    'lt': lambda v, a: compare(v, a[0], operator.lt),
+    'gt': lambda v, a: compare(v, a[0], operator.gt),
+    'le': lambda v, a: compare(v, a[0], operator.le),
+    'ge': lambda v, a: compare(v, a[0], operator.ge),
+    'bw': lambda v, a: compare(v, a[0], operator.ge) and compare(v, a[1], operator.le),
+    'wcard': lambda v, a: v is not None and re.search(a[0], v) is not None,
+}
+
+def parse_filter(expr: str):
+    """
+        query-target-filter of a class query as a predicate on the attributes of an object, e.g.
+        and(ge(fvCEp.modTs,"2025-01-01T00:00:00.000+08:00"),wcard(fvCEp.dn,"tn-t1"))
+        Operators: eq, ne, lt, gt, le, ge, bw, wcard, and, or, not.
+    """
+    token_re = re.compile(r'\s*(?:(\w+)\(|"((?:[^"\\]|\\.)*)"|(,)|(\))|([^,()"\s]+))')
+    pos = 0
+
+    def next_token():
+        nonlocal pos
+        m = token_re.match(expr, pos)
+        if not m or m.end() == pos:
+            raise FilterError(f'Invalid filter at {pos}: {expr}')
+        pos = m.end()
+        return m
+
+    def parse_op(op: str):
+        args = []
+        while True:
+            m = next_token()
+            if m.group(4):
+                break
+            if m.group(3):
+                continue
+            if m.group(1):
+                args.append(parse_op(m.group(1)))
+            elif m.group(2) is not None:
+                args.append(m.group(2).replace('\\"', '"'))
+            else:
+                args.append(m.group(5))
+        if op in ('and', 'or'):
+            return (lambda attributes: all(f(attributes) for f in args)) if op == 'and' else (lambda attributes: any(f(attributes) for f in args))
+        if op == 'not':
+            return lambda attributes: not args[0](attributes)
+        if op not in FILTER_OPS or len(args) < 2:
+            raise FilterError(f'Invalid filter operator {op}: {expr}')
+        # fvCEp.ip -> ip
+        prop, values, func = args[0].split('.', 1)[-1], args[1:], FILTER_OPS[op]
+        return lambda attributes: func(attributes.get(prop), values)
+
+    m = next_token()
+    if not m.group(1):
+        raise FilterError(f'Invalid filter: {expr}')
+    predicate = parse_op(m.group(1))
+    if expr[pos:].strip():
+        raise FilterError(f'Invalid filter, trailing {expr[pos:]}')
+    return predicate
+
+class RecordedFabric:
+    """Responses of one device recorded by pyapicapi.py --snapshot, served in place of a SyntheticFabric."""
+    def __init__(self, path: str):
+        self.store = pysnapshot.SnapshotStore(path)
+        self.cache = {}
+
+    def load_pages(self, key: str) -> list:
+        try:
+            json_obj = self.store.load(key)
+        except FileNotFoundError:
+            return []
+        return [json_obj] if isinstance(json_obj, dict) else list(json_obj)
+
+    def get_objects(self, key: str) -> list:
+        if key not in self.cache:
+            self.cache[key] = [data[key]['attributes'] for page in self.load_pages(key) for data in page.get('imdata', []) if key in data]
+        return self.cache[key]
+
+    def f5_response(self, key: str) -> dict:
+        pages = self.load_pages(key)
+        return pages[0] if pages else {'kind': f'tm:ltm:{key}:{key}collectionstate', 'items': []}
+
+    def mso_response(self, key: str) -> dict:
+        return {key: []}
+
+class RateLimiter:
+    """Token bucket of rate requests per second, with a burst of one second."""
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if not self.rate:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+class MockController:
+    """Routes, auth and data of the APIC, F5 and MSO apis, the network simulation is done by MockHandler."""
+    def __init__(self, source, profile: dict, compress: bool = False, seed: int = 1):
+        self.source = source
+        self.profile = dict(PROFILE_DEFAULTS, **profile)
+        self.compress = compress
+        self.limiter = RateLimiter(self.profile['rate'])
+        self.rnd = random.Random(seed)
+        self.tokens = set()
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'bytes': 0, 'status': {}}
+
+    def new_token(self) -> str:
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.tokens.add(token)
+        return token
+
+    def record(self, status: int, size: int) -> None:
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += size
+            self.stats['status'][status] = self.stats['status'].get(status, 0) + 1
+
+    def chance(self, probability: float) -> bool:
+        with self.lock:
+            return probability > 0 and self.rnd.random() < probability
+
+    def delay(self) -> float:
+        with self.lock:
+            return self.profile['latency'] + self.rnd.uniform(0, self.profile['jitter'])
+
+    def apic_error(self, status: int, code: str, text: str) -> tuple:
+        return status, {'totalCount': '1', 'imdata': [{'error': {'attributes': {'code': code, 'text': text}}}]}
+
+    def handle(self, method: str, path: str, query: dict, headers, body: bytes) -> tuple:
+        """(status, json object) of one request."""
+        # APIC ========================================
+        if path == '/api/aaaLogin.json' and method == 'POST':
+            attributes = {'token': self.new_token(), 'refreshTimeoutSeconds': str(TOKEN_TIMEOUT), 'userName': 'admin'}
+            return 200, {'totalCount': '1', 'imdata': [{'aaaLogin': {'attributes': attributes}}]}
+        if path == '/api/aaaRefresh.json':
+            if self.get_cookie_token(headers) not in self.tokens:
+                return self.apic_error(403, '403', 'Token was invalid (Error: Token timeout)')
+            attributes = {'token': self.get_cookie_token(headers), 'refreshTimeoutSeconds': str(TOKEN_TIMEOUT)}
+            return 200, {'totalCount': '1', 'imdata': [{'aaaLogin': {'attributes': attributes}}]}
+        m = re.fullmatch(r'/api/class/(\w+)\.json', path)
+        if m:
+            if self.get_cookie_token(headers) not in self.tokens:
+                return self.apic_error(403, '403', 'Token was invalid (Error: Token timeout)')
+            try:
+                return 200, self.apic_class(m.group(1), query)
+            except (FilterError, ValueError) as e:
+                return self.apic_error(400, '121', str(e))
+
+        # F5 ========================================
+        if path == '/mgmt/shared/authn/login' and method == 'POST':
+            return 200, {'username': 'admin', 'token': {'token': self.new_token(), 'timeout': 1200}}
+        m = re.fullmatch(r'/mgmt/shared/authz/tokens/(\w+)', path)
+        if m and method == 'PATCH':
+            if m.group(1) not in self.tokens:
+                return 401, {'code': 401, 'message': 'X-F5-Auth-Token does not exist.'}
+            return 200, {'token': m.group(1), 'timeout': json.loads(body or b'{}').get('timeout', 1200)}
+        m = re.fullmatch(r'/mgmt/tm/ltm/(\w+)/?', path)
+        if m:
+            if headers.get('X-F5-Auth-Token') not in self.tokens:
+                return 401, {'code': 401, 'message': 'X-F5-Auth-Token does not exist.'}
+            return 200, self.source.f5_response(m.group(1))
+
+        # MSO ========================================
+        if path in ('/login', '/api/v1/auth/login') and method == 'POST':
+            return 200, {'token': self.new_token()}
+        m = re.fullmatch(r'/api/v1/(\w+)(/.*)?', path)
+        if m:
+            if headers.get('Authorization', '').removeprefix('Bearer ') not in self.tokens:
+                return 401, {'code': 401, 'message': 'Unauthorized'}
+            return 200, self.source.mso_response(m.group(1))
+        return 404, {'code': 404, 'message': f'{method} {path} not found'}
+
+    def get_cookie_token(self, headers) -> str:
+        m = re.search(r'APIC-cookie=([^;\s]+)', headers.get('Cookie', ''), re.IGNORECASE)
+        return m.group(1) if m else None
+
+    def apic_class(self, key: str, query: dict) -> dict:
+        # query-target-filter, order-by, rsp-prop-include and paging of a class query
+        objects = self.source.get_objects(key)
+        if query.get('query-target-filter'):
+            predicate = parse_filter(query['query-target-filter'])
+            objects = [obj for obj in objects if predicate(obj)]
+        if query.get('order-by'):
+            prop, _, order = query['order-by'].split('.', 1)[-1].partition('|')
+            objects = sorted(objects, key=lambda obj: obj.get(prop, ''), reverse=order == 'desc')
+        if query.get('rsp-prop-include') == 'naming-only':
+            objects = [{prop: obj[prop] for prop in ('dn', 'name') if prop in obj} for obj in objects]
+        elif query.get('rsp-prop-include') == 'config-only':
+            objects = [{prop: value for prop, value in obj.items() if prop not in OPERATIONAL_PROPERTIES} for obj in objects]
+        total = len(objects)
+        if query.get('page-size'):
+            page, page_size = int(query.get('page', 0)), int(query['page-size'])
+            objects = objects[page * page_size:(page + 1) * page_size]
+        return {'totalCount': str(total), 'imdata': [{key: {'attributes': obj}} for obj in objects]}
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, without TCP_NODELAY each response waits for the delayed ack
+    disable_nagle_algorithm = True
+    controller = None
+    verbose = False
+
+    def do_GET(self):
+        self.respond('GET')
+
+    def do_POST(self):
+        self.respond('POST')
+
+    def do_PATCH(self):
+        self.respond('PATCH')
+
+    def respond(self, method: str) -> None:
+        controller = self.controller
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0) or 0))
+        time.sleep(controller.delay())
+        if controller.chance(controller.profile['failure_rate']):
+            # connection reset without a response
+            controller.record(0, 0)
+            self.close_connection = True
+            return
+        if not controller.limiter.allow():
+            return self.send_json(429, {'code': 429, 'message': 'Too Many Requests'}, {'Retry-After': '1'})
+        if controller.chance(controller.profile['error_rate']):
+            return self.send_json(503, {'code': 503, 'message': 'Service Unavailable'}, {'Retry-After': '1'})
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        status, json_obj = controller.handle(method, url.path, query, self.headers, body)
+        self.send_json(status, json_obj)
+
+    def send_json(self, status: int, json_obj: dict, headers: dict = None) -> None:
+        data = json.dumps(json_obj).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if self.controller.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            data = gzip.compress(data, compresslevel=1)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.write_limited(data)
+        self.controller.record(status, len(data))
+
+    def write_limited(self, data: bytes) -> None:
+        # bandwidth cap per response, the body is sent in chunks with a pause after each chunk
+        bandwidth = self.controller.profile['bandwidth']
+        if not bandwidth:
+            self.wfile.write(data)
+            return
+        start = time.monotonic()
+        for i in range(0, len(data), CHUNK_SIZE):
+            self.wfile.write(data[i:i + CHUNK_SIZE])
+            pause = start + (i + CHUNK_SIZE) / bandwidth - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+class MockServer:
+    """HTTPS server of a MockController, serve_forever in a daemon thread with start(), or in the caller with serve()."""
+    def __init__(self, controller: MockController, host: str = '127.0.0.1', port: int = 8443,
+                 certfile: str = None, keyfile: str = None, verbose: bool = False):
+        handler = type('Handler', (MockHandler,), {'controller': controller, 'verbose': verbose})
+        self.controller = controller
+        self.tmpdir = None
+        if not certfile:
+            self.tmpdir = tempfile.mkdtemp()
+            certfile, keyfile = make_certificate(self.tmpdir)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+        self.address = f'{host}:{self.httpd.server_address[1]}'
+        self.thread = None
+
+    def start(self) -> str:
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.address
+
+    def serve(self) -> None:
+        self.httpd.serve_forever()
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.tmpdir:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+def make_certificate(folder: str) -> tuple:
+    # self-signed certificate for localhost, the collectors do not verify certificates
+    certfile, keyfile = os.path.join(folder, 'mock.crt'), os.path.join(folder, 'mock.key')
+    try:
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '30', '-subj', '/CN=localhost',
+                        '-keyout', keyfile, '-out', certfile], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError(f'openssl could not create a certificate ({e}), use --cert and --key') from e
+    return certfile, keyfile
+
+def get_profile(args) -> dict:
+    profile = dict(PROFILES[args.profile])
+    for name in PROFILE_DEFAULTS:
+        if getattr(args, name) is not None:
+            profile[name] = getattr(args, name)
+    return profile
+
+def write_config(outfile: str, address: str, devices: int, device_type: str, table_workers: int) -> None:
+    """Device config of pyapicapi.py with devices that all point at the mock server."""
+    tables = {'cisco_apic': 'table_apic.json', 'f5_ltm': 'table_f5ltm.json'}[device_type]
+    config = {'devices': [{'environment': f'mock{i}', 'ip': address, 'username': 'admin', 'password': 'pass',
+                           'device_type': device_type, 'table_workers': table_workers, 'tables': tables} for i in range(devices)]}
+    with open(outfile, 'w') as f:
+        json.dump(config, f, indent=2)
+    print(f'config: {outfile}')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default='127.0.0.1', help="listen address")
+    parser.add_argument("--port", type=int, default=8443, help="listen port, the device ip of the config is <host>:<port>")
+    parser.add_argument("--scale", default='small', help=f"synthetic fabric of {list(fabric.SCALES)}")
+    parser.add_argument("--snapshot", help="serve a recorded device instead, example: --snapshot snapshot/20251009_1200/ciscoapic_n1")
+    parser.add_argument("--profile", default='none', choices=list(PROFILES), help="network and controller profile")
+    parser.add_argument("--latency", type=float, help="seconds before each response")
+    parser.add_argument("--jitter", type=float, help="random extra seconds before each response, up to this value")
+    parser.add_argument("--bandwidth", type=float, help="bytes per second of each response, 0 is unlimited")
+    parser.add_argument("--rate", type=float, help="requests per second of the server, above it 429 Too Many Requests, 0 is unlimited")
+    parser.add_argument("--error-rate", type=float, help="share of requests answered 503 Service Unavailable")
+    parser.add_argument("--failure-rate", type=float, help="share of requests whose connection is closed without a response")
+    parser.add_argument("--gzip", action='store_true', help="gzip the responses when the client accepts it")
+    parser.add_argument("--cert", help="certificate file, default: a self-signed certificate made with openssl")
+    parser.add_argument("--key", help="private key file of --cert")
+    parser.add_argument("--write-config", help="write a pyapicapi.py device config that points at the server, example: --write-config config/mock_apic.json")
+    parser.add_argument("--devices", type=int, default=4, help="number of devices in --write-config")
+    parser.add_argument("--device-type", default='cisco_apic', choices=['cisco_apic', 'f5_ltm'], help="device type in --write-config")
+    parser.add_argument("--table-workers", type=int, default=4, help="table_workers in --write-config")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the synthetic fabric and of the simulated errors")
+    parser.add_argument("-v", "--verbose", action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    source = RecordedFabric(args.snapshot) if args.snapshot else fabric.SyntheticFabric(**fabric.SCALES[args.scale], seed=args.seed)
+    controller = MockController(source, get_profile(args), args.gzip, args.seed)
+    server = MockServer(controller, args.host, args.port, args.cert, args.key, args.verbose)
+    if args.write_config:
+        write_config(args.write_config, server.address, args.devices, args.device_type, args.table_workers)
+    print(f'mock server on https://{server.address}, profile {controller.profile}, Ctrl-C to stop')
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f'{controller.stats["requests"]} requests, {controller.stats["bytes"] / 1e6:.1f} MB, status {controller.stats["status"]}')
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import logging
 import logging.config
-import argparse, os, re, json, ipaddress
+import argparse, os, re, json
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
+import pyapicloader
+import pysubnet
 PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__ ), os.pardir))
 DATETIME = datetime.now().strftime("%Y%m%d_%H%M%S")
 LOG_ENV = 'dev'
@@ -11,6 +13,15 @@ LOG_DIR = 'log'
 CONFIG_DIR = 'config'
 CONFIG_DIR_FULL = os.path.join(PARENT_DIR, CONFIG_DIR)
 
+# Tables and columns read from the pyapicapi.py output
+REQUIRED_TABLES = {
+    'fvSubnet': ['dn','ip'],
+    'fvRsBd': ['dn','tDn'],
+    'fvRsCons': ['dn','tDn'],
+    'fvRsProv': ['dn','tDn'],
+    'vzRsSubjFiltAtt': ['dn','tnVzFilterName','action'],
+}
+
 logger = logging.getLogger(__name__)
 
 def get_datetime():
@@ -66,16 +77,6 @@ def export_df_to_xlsx(writer: pd.ExcelWriter, df: pd.DataFrame, key: str) -> Non
     ws = writer.sheets[key]
     return
 
-def calculate_subnet(ip):
-    if pd.isna(ip):
-        return ''  # Return empty string for null values
-    try:
-        # Create an IPv4 network object
-        network = ipaddress.ip_network(ip, strict=False)
-        return str(network)  # Return the network address as a string
-    except ValueError:
-        return ''  # Return empty string for invalid gateway formats
-
 def start_script(args) -> list:
     logger.info(f'###### Step1')
     infilelist = process_input(args)
@@ -99,7 +100,7 @@ def process_input(args) -> list:
         logger.info(f'###### Step1 - Get api excel from python arguments:')
         infilelist = args.infiles.split(',')
         for f in infilelist:
-            if not re.match(r'ciscoapic_.*_\d{8}_\d{4}\.xlsx', os.path.basename(f)):
+            if not re.match(r'ciscoapic_.*_\d{8}_\d{4}(\.xlsx)?$', os.path.basename(f)):
                 logger.error(f'Invalid input filename format: {f}')
                 infilelist.remove(f)
 
@@ -116,28 +117,34 @@ def process_infile(file: str, batch_datetime: str) -> str:
     logger.info(f'###### Step3 - Process excel: {file}')
     
     # Extract environment from filename
-    match = re.match(r'ciscoapic_([^_]+)_\d{8}_\d{4}\.xlsx', os.path.basename(file))
+    match = re.match(r'ciscoapic_([^_]+)_\d{8}_\d{4}(\.xlsx)?$', os.path.basename(file))
     if not match:
         logger.error(f'Invalid input filename format: {file}')
         return ''
     outfile_env = match.group(1)
+    frames = pyapicloader.load_tables(file, REQUIRED_TABLES)
+    return process_frames(frames, outfile_env, batch_datetime)
+
+def process_frames(frames: dict, outfile_env: str, batch_datetime: str) -> str:
+    """Analysis of one device from its tables, frames maps each key of REQUIRED_TABLES to a DataFrame."""
+    logger.info(f'###### Step3 - Process tables of {outfile_env}')
 
     # step 3: column operation
     # ===========================================================================
     
     # step 3A: Get subnet
     # fvSubnet ========================================
-    df_fvSubnet = pd.read_excel(file, sheet_name='fvSubnet')
-    df_fvSubnet = df_fvSubnet[['dn','ip']]                         # choose column
+    df_fvSubnet = frames['fvSubnet']
+    df_fvSubnet = df_fvSubnet[REQUIRED_TABLES['fvSubnet']]         # choose column
     # dn > epg, ip > gateway
     df_fvSubnet['dn'] = df_fvSubnet['dn'].str.replace(r'/subnet-(.*)$', '', regex=True)
 
     # step 3B: Get EPG and BD
     # fvRsBd ========================================
-    df_fvRsBd = pd.read_excel(file, sheet_name='fvRsBd')
-    df_fvRsBd = df_fvRsBd[['dn','tDn']]                             # choose column
+    df_fvRsBd = frames['fvRsBd']
+    df_fvRsBd = df_fvRsBd[REQUIRED_TABLES['fvRsBd']]               # choose column
     # dn > epg, tdn > bd
-    df_fvRsBd['dn'] = df_fvRsBd['dn'].str.replace(r'/rsbd$', '', regex=True)
+    df_fvRsBd['dn'] = df_fvRsBd['dn'].str.removesuffix('/rsbd')
     # rename column
     df_fvRsBd = df_fvRsBd.rename(columns={'dn':'epg', 'tDn': 'bd'})
     # merge
@@ -150,12 +157,12 @@ def process_infile(file: str, batch_datetime: str) -> str:
     df_epgbd_ip = pd.merge(df_fvRsBd, df_fvRsBd3, on=['epg', 'bd'], how='left')
     df_epgbd_ip = df_epgbd_ip.sort_values(by=['epg'], ascending=True)
     df_epgbd_ip = df_epgbd_ip.rename(columns={'ip': 'gateway'})
-    df_epgbd_ip['subnet'] = df_epgbd_ip['gateway'].apply(calculate_subnet)
+    df_epgbd_ip['subnet'] = pysubnet.to_subnet(df_epgbd_ip['gateway'])
 
     # step 3C: Get contract consumer EPG
     # fvRsCons ========================================
-    df_fvRsCons = pd.read_excel(file, sheet_name='fvRsCons')
-    df_fvRsCons = df_fvRsCons[['dn','tDn']]                         # choose column
+    df_fvRsCons = frames['fvRsCons']
+    df_fvRsCons = df_fvRsCons[REQUIRED_TABLES['fvRsCons']]         # choose column
     # dn > epg, tdn > contract
     df_fvRsCons['dn'] = df_fvRsCons['dn'].str.replace(r'/rscons-[^/]+$', '', regex=True)
     # rename column
@@ -163,8 +170,8 @@ def process_infile(file: str, batch_datetime: str) -> str:
     
     # step 3D: Get contract provider EPG
     # fvRsProv ========================================
-    df_fvRsProv = pd.read_excel(file, sheet_name='fvRsProv')
-    df_fvRsProv = df_fvRsProv[['dn','tDn']]                         # choose column
+    df_fvRsProv = frames['fvRsProv']
+    df_fvRsProv = df_fvRsProv[REQUIRED_TABLES['fvRsProv']]         # choose column
     # dn > epg, tdn > contract
     df_fvRsProv['dn'] = df_fvRsProv['dn'].str.replace(r'/rsprov-[^/]+$', '', regex=True)
     # rename column
@@ -172,8 +179,8 @@ def process_infile(file: str, batch_datetime: str) -> str:
 
     # step 3E: Get filters
     # vzRsSubjFiltAtt ========================================
-    df_vzRsSubjFiltAtt = pd.read_excel(file, sheet_name='vzRsSubjFiltAtt')
-    df_vzRsSubjFiltAtt = df_vzRsSubjFiltAtt[['dn','tnVzFilterName','action']]  # choose column
+    df_vzRsSubjFiltAtt = frames['vzRsSubjFiltAtt']
+    df_vzRsSubjFiltAtt = df_vzRsSubjFiltAtt[REQUIRED_TABLES['vzRsSubjFiltAtt']]  # choose column
     # dn > contract, tnVzFilterName > filter
     df_vzRsSubjFiltAtt['dn'] = df_vzRsSubjFiltAtt['dn'].str.replace(r'/subj-(.*)/rssubjFiltAtt-(.*)$', '', regex=True)
     # For output
@@ -201,7 +208,6 @@ def process_infile(file: str, batch_datetime: str) -> str:
     df_contract_epgip = df_contract_epgip[['contract','consumer_epg','consumer_subnet','provider_epg','provider_subnet','filter']]
 
     # step 99: export result to xlsx apic_n1_tables_20241016_1335.xlsx
-    outfile_env = file.split("_")[1]
     outfile = f"apic_{outfile_env}_contract_{batch_datetime}.xlsx"
     writer = pd.ExcelWriter(os.path.join(PARENT_DIR, outfile))
     tshoot = 0
@@ -221,7 +227,7 @@ def process_infile(file: str, batch_datetime: str) -> str:
     logger.info(f'###')
     logger.info(f'###')
     writer.close()
-    return
+    return outfile
 
 def main():
     logger.info(f'###')
@@ -2,8 +2,11 @@ import logging
 import logging.config
 import argparse, os, re, json, ipaddress
 import pandas as pd
+import numpy as np
 from datetime import datetime
 from pathlib import Path
+import pyapicloader
+import pyapicdn
 PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 DATETIME = datetime.now().strftime("%Y%m%d_%H%M%S")
 LOG_ENV = 'dev'
@@ -11,6 +14,21 @@ LOG_DIR = 'log'
 CONFIG_DIR = 'config'
 CONFIG_DIR_FULL = os.path.join(PARENT_DIR, CONFIG_DIR)
 
+# Tables and columns read from the pyapicapi.py output
+REQUIRED_TABLES = {
+    'topSystem': ['dn', 'name', 'id', 'fabricId', 'podId', 'role', 'serial', 'state', 'version', 'oobMgmtAddr',
+                  'inbMgmtAddr', 'inbMgmtGateway', 'lastRebootTime', 'lastResetReason', 'systemUpTime', 'tepPool', 'address'],
+    'rmonIfIn': ['dn', 'discards', 'errors'],
+    'rmonIfOut': ['dn', 'discards', 'errors'],
+    'ethpmFcot': ['dn', 'guiCiscoEID', 'guiName', 'guiSN'],
+    'l1PhysIf': ['dn', 'id', 'descr', 'portT', 'mode', 'layer', 'usage', 'adminSt', 'autoNeg','modTs'],
+    'ethpmPhysIf': ['dn','lastLinkStChg','accessVlan','nativeVlan','operSpeed','operDuplex','operSt','operStQual','bundleIndex','operVlans','allowedVlans'],
+    'fvRsPathAtt': ['dn', 'encap', 'instrImedcy' ,'mode' ,'tDn'],
+    'vlanCktEp': ['ctrl','dn', 'encap', 'epgDn' ,'fabEncap' ,'id', 'pcTag'],
+    'infraRsAccBaseGrp': ['dn', 'tCl', 'tDn'],
+    'infraAccBndlGrp': ['dn', 'name', 'descr'],
+}
+
 logger = logging.getLogger(__name__)
 
 def get_datetime():
@@ -102,7 +120,7 @@ def process_input(args) -> list:
         logger.info(f'###### Step1 - Get api excel from python arguments:')
         infilelist = args.infiles.split(',')
         for f in infilelist:
-            if not re.match(r'ciscoapic_.*_\d{8}_\d{4}\.xlsx', os.path.basename(f)):
+            if not re.match(r'ciscoapic_.*_\d{8}_\d{4}(\.xlsx)?$', os.path.basename(f)):
                 logger.error(f'Invalid input filename format: {f}')
                 infilelist.remove(f)
 
@@ -115,7 +133,7 @@ def process_input(args) -> list:
 
     return infilelist
 
-def df_intf_profile_split_row(row):
+def df_intf_profile_split_rows(df: pd.DataFrame) -> pd.DataFrame:
     # example:
     # Raw
     # dn	_nodeid	_intf_p	_intf_n	_policyGrp
@@ -135,72 +153,83 @@ def df_intf_profile_split_row(row):
     # uni/infra/accportprof-lif-1201/hports-p16-17-typ-range	1201	p16	16	ipg-phy
     # uni/infra/accportprof-lif-1201/hports-p16-17-typ-range	1201	p17	17	ipg-phy
 
-    # Handle nodeid ranges (e.g., '1103-1104')
-    nodeids = []
-    if '-' in row['_nodeid']:
-        start, end = row['_nodeid'].split('-')
-        nodeids = [str(i) for i in range(int(start), int(end) + 1)]
-    else:
-        nodeids = [row['_nodeid']]
-
-    # Handle interface ranges (e.g., 'p1-p2' or 'p16-17')
-    intf_ps = []
-    intf_ns = []
-    if '-' in row['_intf_p']:
-        prefix = row['_intf_p'][0]  # 'p' or other prefix
-        start, end = map(int, row['_intf_n'].split('-'))
-        intf_ps = [f"{prefix}{i}" for i in range(start, end + 1)]
-        intf_ns = [str(i) for i in range(start, end + 1)]
-    else:
-        intf_ps = [row['_intf_p']]
-        intf_ns = [row['_intf_n']]
-
-    # Create rows for each combination of nodeid and interface
-    result = []
-    for nodeid in nodeids:
-        for intf_p, intf_n in zip(intf_ps, intf_ns):
-            result.append({
-                'dn': row['dn'],
-                '_nodeid': nodeid,
-                '_intf_p': intf_p,
-                '_intf_n': intf_n,
-                '_policyGrp': row['_policyGrp']
-            })
-    return result
+    # A selector that is not p<N> or p<N>-<M> (e.g. hports-vpc25-typ-range), or a profile that is not lif-<node>,
+    # is left as the whole dn by the regexes of process_frames, it has no interface number and is skipped
+    parsed = (df['_nodeid'].str.fullmatch(r'\d+(?:-\d+)?') & df['_intf_n'].str.fullmatch(r'\d+(?:-\d+)?')).fillna(False).astype(bool)
+    if not parsed.all():
+        unparsed = df.loc[~parsed, 'dn']
+        logger.warning(f'Skipped {len(unparsed)} interface selectors without a node id or a p<N> port range: {unparsed.head(5).tolist()}')
+        df = df[parsed]
+
+    # Each row expands to (node count) x (interface count) rows: node id ranges outer, interface ranges inner
+    node_range = df['_nodeid'].str.extract(r'^(\d+)-(\d+)$')
+    is_node_range = node_range[0].notna().to_numpy()
+    node_start = node_range[0].fillna(0).astype(int).to_numpy()
+    node_count = np.where(is_node_range, node_range[1].fillna(0).astype(int).to_numpy() - node_start + 1, 1).clip(min=0)
+
+    # Handle interface ranges (e.g., 'p1-p2' or 'p16-17'), the range is taken from _intf_n ('1-2' or '16-17')
+    intf_range = df['_intf_n'].str.extract(r'^(\d+)-(\d+)$')
+    is_intf_range = (df['_intf_p'].str.contains('-', regex=False) & intf_range[0].notna()).to_numpy()
+    intf_start = intf_range[0].fillna(0).astype(int).to_numpy()
+    intf_count = np.where(is_intf_range, intf_range[1].fillna(0).astype(int).to_numpy() - intf_start + 1, 1).clip(min=0)
+
+    # position of each output row inside the expansion of its source row
+    row_count = node_count * intf_count
+    src = np.repeat(np.arange(len(df)), row_count)
+    k = np.arange(row_count.sum()) - np.repeat(row_count.cumsum() - row_count, row_count)
+    node_i = k // intf_count[src]
+    intf_i = k % intf_count[src]
+
+    node_id = (node_start[src] + node_i).astype(str)
+    intf_n = (intf_start[src] + intf_i).astype(str)
+    prefix = df['_intf_p'].str[0].to_numpy()[src]    # 'p' or other prefix
+    return pd.DataFrame({
+        'dn': df['dn'].to_numpy()[src],
+        '_nodeid': np.where(is_node_range[src], node_id, df['_nodeid'].to_numpy()[src]),
+        '_intf_p': np.where(is_intf_range[src], prefix + intf_n.astype(object), df['_intf_p'].to_numpy()[src]),
+        '_intf_n': np.where(is_intf_range[src], intf_n, df['_intf_n'].to_numpy()[src]),
+        '_policyGrp': df['_policyGrp'].to_numpy()[src],
+    })
 
 def process_infile(file: str, batch_datetime: str) -> str:
     logger.info(f'###### Step3 - Process excel: {file}')
     
     # Extract environment from filename
-    match = re.match(r'ciscoapic_([^_]+)_\d{8}_\d{4}\.xlsx', os.path.basename(file))
+    match = re.match(r'ciscoapic_([^_]+)_\d{8}_\d{4}(\.xlsx)?$', os.path.basename(file))
     if not match:
         logger.error(f'Invalid input filename format: {file}')
         return ''
     outfile_env = match.group(1)
+    frames = pyapicloader.load_tables(file, REQUIRED_TABLES)
+    return process_frames(frames, outfile_env, batch_datetime)
+
+def process_frames(frames: dict, outfile_env: str, batch_datetime: str) -> str:
+    """Analysis of one device from its tables, frames maps each key of REQUIRED_TABLES to a DataFrame."""
+    logger.info(f'###### Step3 - Process tables of {outfile_env}')
 
     # step 3: column operation
     # ===========================================================================
 
     # step 3A: Get system
     # topSystem ========================================
-    df_topSystem = pd.read_excel(file, sheet_name='topSystem')
-    df_topSystem = df_topSystem[['dn', 'name', 'id', 'fabricId', 'podId', 'role', 'serial', 'state', 'version', 'oobMgmtAddr',
-                                 'inbMgmtAddr', 'inbMgmtGateway', 'lastRebootTime', 'lastResetReason', 'systemUpTime', 'tepPool', 'address']]  # choose column
+    df_topSystem = frames['topSystem']
+    df_topSystem = df_topSystem[REQUIRED_TABLES['topSystem']]  # choose column
     df_topSystem = df_topSystem.sort_values(by=['id'])
 
     # step 3X: Get Interface Input Counters
     # rmonIfIn ========================================
-    df_rmonIfIn = pd.read_excel(file, sheet_name='rmonIfIn')
-    df_rmonIfIn = df_rmonIfIn[['dn', 'discards', 'errors']]  # choose column
+    df_rmonIfIn = frames['rmonIfIn']
+    df_rmonIfIn = df_rmonIfIn[REQUIRED_TABLES['rmonIfIn']]  # choose column
     df_rmonIfIn = df_rmonIfIn.rename(columns={'discards': '_inDiscards', 'errors': '_inErrors'})
-    df_rmonIfIn['dn'] = df_rmonIfIn['dn'].str.replace(r'/dbgIfIn$', '', regex=True)
+    # the fixed rn of a stats class is a plain suffix, cheaper to strip than to parse the dn: .../phys-[eth1/10]/dbgIfIn -> .../phys-[eth1/10]
+    df_rmonIfIn['dn'] = df_rmonIfIn['dn'].str.removesuffix('/dbgIfIn')
 
     # step 3Y: Get Interface Output Counters
     # rmonIfOut ========================================
-    df_rmonIfOut = pd.read_excel(file, sheet_name='rmonIfOut')
-    df_rmonIfOut = df_rmonIfOut[['dn', 'discards', 'errors']]  # choose column
+    df_rmonIfOut = frames['rmonIfOut']
+    df_rmonIfOut = df_rmonIfOut[REQUIRED_TABLES['rmonIfOut']]  # choose column
     df_rmonIfOut = df_rmonIfOut.rename(columns={'discards': '_outDiscards', 'errors': '_outErrors'})
-    df_rmonIfOut['dn'] = df_rmonIfOut['dn'].str.replace(r'/dbgIfOut$', '', regex=True)
+    df_rmonIfOut['dn'] = df_rmonIfOut['dn'].str.removesuffix('/dbgIfOut')
 
     # merge (df_rmonIfIn <- df_rmonIfOut)
     df_interfaceError =  pd.merge(df_rmonIfIn, df_rmonIfOut, on="dn", how="left")
@@ -209,21 +238,21 @@ def process_infile(file: str, batch_datetime: str) -> str:
 
     # step 3C: Get transceiver sfp_sn
     # ethpmFcot ========================================
-    df_ethpmFcot = pd.read_excel(file, sheet_name='ethpmFcot')
-    df_ethpmFcot = df_ethpmFcot[['dn', 'guiCiscoEID', 'guiName', 'guiSN']]  # choose column
-    df_ethpmFcot['dn'] = df_ethpmFcot['dn'].str.replace(r'/phys/fcot$', '', regex=True)
+    df_ethpmFcot = frames['ethpmFcot']
+    df_ethpmFcot = df_ethpmFcot[REQUIRED_TABLES['ethpmFcot']]  # choose column
+    df_ethpmFcot['dn'] = df_ethpmFcot['dn'].str.removesuffix('/phys/fcot')    # .../phys-[eth1/10]/phys/fcot -> .../phys-[eth1/10]
 
     # step 3B: Get interface l1PhysIf
     # l1PhysIf ========================================
-    df_l1PhysIf = pd.read_excel(file, sheet_name='l1PhysIf')
-    df_l1PhysIf = df_l1PhysIf[['dn', 'id', 'descr', 'portT', 'mode', 'layer', 'usage', 'adminSt', 'autoNeg','modTs']]  # choose column
+    df_l1PhysIf = frames['l1PhysIf']
+    df_l1PhysIf = df_l1PhysIf[REQUIRED_TABLES['l1PhysIf']]  # choose column
     df_l1PhysIf = df_l1PhysIf.sort_values(by=['dn'])
 
     # step 3B: Get interface ethpmPhysIf
     # ethpmPhysIf ========================================
-    df_ethpmPhysIf = pd.read_excel(file, sheet_name='ethpmPhysIf')
-    df_ethpmPhysIf = df_ethpmPhysIf[['dn','lastLinkStChg','accessVlan','nativeVlan','operSpeed','operDuplex','operSt','operStQual','bundleIndex','operVlans','allowedVlans']]  # choose column
-    df_ethpmPhysIf['dn'] = df_ethpmPhysIf['dn'].str.replace(r'/phys$', '', regex=True)
+    df_ethpmPhysIf = frames['ethpmPhysIf']
+    df_ethpmPhysIf = df_ethpmPhysIf[REQUIRED_TABLES['ethpmPhysIf']]  # choose column
+    df_ethpmPhysIf['dn'] = df_ethpmPhysIf['dn'].str.removesuffix('/phys')
     df_ethpmPhysIf = df_ethpmPhysIf.sort_values(by=['dn'])
     
     # merge (df_l1PhysIf <- df_ethpmPhysIf)
@@ -232,20 +261,24 @@ def process_infile(file: str, batch_datetime: str) -> str:
     df_interface =  pd.merge(df_interface, df_ethpmFcot, on="dn", how="left")
 
     # column index update
+    df_dn = pyapicdn.parse_dn(df_interface['dn'], ['node', 'interface'])
     # _nodeid, dn = topology/pod-1/node-1101/sys/phys-[eth1/10] -> 1101
-    df_interface['_nodeid'] = df_interface['dn'].str.replace(r'.*node-(\d+).*', r'\1', regex=True)
+    df_interface['_nodeid'] = df_dn['node'].fillna(df_interface['dn'])
     # _intf, id = eth1/10 -> eth1/10
     df_interface['_intf'] = df_interface['id']
-    # _intf_p, dn = topology/pod-1/node-1101/sys/phys-[eth1/10] -> p10
-    df_interface['_intf_p'] = df_interface['dn'].str.replace(r'.*\[eth1\/(\d+)\].*', 'p'+ r'\1', regex=True)
+    # _intf_p, dn = topology/pod-1/node-1101/sys/phys-[eth1/10] -> p10, other interfaces keep the dn
+    port = df_dn['interface'].str.removeprefix('eth1/')
+    is_port = (df_dn['interface'].str.startswith('eth1/') & port.str.isdigit()).fillna(False).astype(bool)
+    df_interface['_intf_p'] = ('p' + port).where(is_port, df_interface['dn'])
     # _intf_n, _intf_p = p10 -> 10
     df_interface['_intf_n'] = df_interface['_intf_p'].str.replace(r'[pP](\d+(?:-\d+)?)', r'\1', regex=True)
     df_interface = df_interface[['dn','_nodeid','_intf','_intf_p','_intf_n','descr','portT','layer','usage','operSpeed','operDuplex','autoNeg','adminSt','operSt','operStQual','guiCiscoEID','bundleIndex','accessVlan','nativeVlan','operVlans','allowedVlans','lastLinkStChg','modTs']] # choose column
 
     # step 3D,3E,3F: Get encp-all, epg-encp, intf-encp, 
     # fvRsPathAtt ========================================
-    df_fvRsPathAtt = pd.read_excel(file, sheet_name='fvRsPathAtt')
-    df_fvRsPathAtt = df_fvRsPathAtt[['dn', 'encap', 'instrImedcy' ,'mode' ,'tDn']]  # choose column
+    df_fvRsPathAtt = frames['fvRsPathAtt']
+    df_fvRsPathAtt = df_fvRsPathAtt[REQUIRED_TABLES['fvRsPathAtt']]  # choose column
+    # an end anchored regex is cheaper than parsing the dn: .../epg-web/rspathAtt-[topology/...] -> .../epg-web
     df_fvRsPathAtt['dn'] = df_fvRsPathAtt['dn'].str.replace(r'/rspathAtt-\[topology/(.*)\]\]$', '', regex=True)
     df_fvRsPathAtt['encap'] = df_fvRsPathAtt['encap'].str.replace(r'^vlan-', '', regex=True)
     # For output [all, encap]
@@ -264,14 +297,14 @@ def process_infile(file: str, batch_datetime: str) -> str:
 
     # step 3G: Get leaf vlan_encap
     # vlanCktEp ========================================
-    df_vlanCktEp = pd.read_excel(file, sheet_name='vlanCktEp')
-    df_vlanCktEp = df_vlanCktEp[['ctrl','dn', 'encap', 'epgDn' ,'fabEncap' ,'id', 'pcTag']]  # choose column
+    df_vlanCktEp = frames['vlanCktEp']
+    df_vlanCktEp = df_vlanCktEp[REQUIRED_TABLES['vlanCktEp']]  # choose column
     df_leaf_vlan_encap = df_vlanCktEp[['dn','epgDn' ,'ctrl','encap','fabEncap','id','pcTag']]  # choose column
 
     # step 3H: Get interface profile
     # infraRsAccBaseGrp ========================================
-    df_infraRsAccBaseGrp = pd.read_excel(file, sheet_name='infraRsAccBaseGrp')
-    df_intf_profile = df_infraRsAccBaseGrp[['dn', 'tCl', 'tDn']] # choose column
+    df_infraRsAccBaseGrp = frames['infraRsAccBaseGrp']
+    df_intf_profile = df_infraRsAccBaseGrp[REQUIRED_TABLES['infraRsAccBaseGrp']] # choose column
     # Always create an explicit .copy() when you intend to work on a subset of a DataFrame independently.
     df_intf_profile = df_intf_profile.copy()
     df_intf_profile.loc[:, 'dn'] = df_intf_profile['dn'].str.replace(r'/rsaccBaseGrp$', '', regex=True)
@@ -291,20 +324,15 @@ def process_infile(file: str, batch_datetime: str) -> str:
 
     # step 3H part2: df_intf_profile split row
     # ========================================
-    # Apply the function and create new DataFrame
-    expanded_rows = []
-    for _, row in df_intf_profile.iterrows():
-        expanded_rows.extend(df_intf_profile_split_row(row))
-    # Create final DataFrame
-    df_intf_profile_split = pd.DataFrame(expanded_rows)
+    df_intf_profile_split = df_intf_profile_split_rows(df_intf_profile)
     # Sort by _nodeid and _intf_n for consistency
     df_intf_profile_split = df_intf_profile_split.sort_values(['_nodeid', '_intf_n']).reset_index(drop=True)
 
 
     # step 3I: Get port channel / vpc profile
     # infraAccBndlGrp ========================================
-    df_infraAccBndlGrp = pd.read_excel(file, sheet_name='infraAccBndlGrp')
-    df_vpc_profile = df_infraAccBndlGrp[['dn', 'name', 'descr']]
+    df_infraAccBndlGrp = frames['infraAccBndlGrp']
+    df_vpc_profile = df_infraAccBndlGrp[REQUIRED_TABLES['infraAccBndlGrp']]
     df_vpc_profile = df_vpc_profile.sort_values(by=['dn'])
 
     # merge to interface (df_interface <- df_intf_profile_split)
@@ -314,7 +342,6 @@ def process_infile(file: str, batch_datetime: str) -> str:
     df_interface = df_interface.rename(columns={'dn_x': 'dn', '_intf_n_x': '_intf_n'})
 
     # step 99: export result to xlsx apic_n1_xxxx_20241016_1335.xlsx
-    outfile_env = file.split("_")[1]
     outfile = f"apic_{outfile_env}_interface_{batch_datetime}.xlsx"
     writer = pd.ExcelWriter(os.path.join(PARENT_DIR, outfile))
     tshoot = 0
@@ -344,7 +371,7 @@ def process_infile(file: str, batch_datetime: str) -> str:
     logger.info(f'###')
     logger.info(f'###')
     writer.close()
-    return
+    return outfile
 
 def main():
     logger.info(f'###')
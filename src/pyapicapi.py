@@ -1,13 +1,21 @@
 import logging
 import logging.config
-import argparse, os, re, json, requests, time
+import logging.handlers
+import argparse, asyncio, os, re, json, requests, threading, time
+import multiprocessing
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, Union
 import pyapicanaylsis_interface
 import pyapicanaylsis_contract
+import pytoken
+import pysnapshot
+import pyapicloader
+import pymetrics
+import pyapicstream
 verion = '20251009'
 PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 DATETIME = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -15,6 +23,27 @@ LOG_ENV = 'dev'
 LOG_DIR = 'log'
 CONFIG_DIR = 'config'
 CONFIG_DIR_FULL = os.path.join(PARENT_DIR, CONFIG_DIR)
+DEFAULT_TABLE_WORKERS = 4
+DEFAULT_MAX_CONCURRENCY = 16
+ENGINES = ['thread', 'asyncio']
+F5_MAX_TOKEN_TIMEOUT = 36000
+TOKEN_CACHE_FILE = None
+SNAPSHOT = False
+OFFLINE_SNAPSHOT = None
+INCREMENTAL = False
+# modTs of an object that was modified, objects never modified since their creation have modTs "never"
+MODTS_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}T')
+OUTPUT_FORMAT = 'xlsx'
+XLSX_STREAM_CHUNK_ROWS = 10000
+XLSX_MAX_ROWS = 1048576
+XLSX_MAX_COLS = 16384
+ANALYSIS_ENGINES = ['thread', 'process']
+# report names (e.g. interface, contract) given with --reports, only their tables are collected and only they run
+REPORTS = None
+# AnalysisScheduler of the run, each analysis then starts as soon as its tables are collected
+ANALYSIS_SCHEDULER = None
+# stage times and table counters of the run, see pymetrics.RunMetrics
+METRICS = pymetrics.RunMetrics('pyapicapi')
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +55,14 @@ def register_device_type(cls):
     DEVICE_REGISTRY[cls.device_type] = cls
     return cls
 
+# Output registry to map output formats to their writer classes
+OUTPUT_REGISTRY = {}
+
+def register_output_format(cls):
+    """Decorator to register output format classes."""
+    OUTPUT_REGISTRY[cls.output_format] = cls
+    return cls
+
 def get_datetime():
     return datetime.now().strftime("%Y%m%d_%H%M")
 
@@ -53,27 +90,97 @@ def setup_logging() -> None:
         logger.error(f"Failed to load logging config: {str(e)}")
     return
 
+def get_session(pool_size: int) -> requests.Session:
+    """Keep-alive session with a per-host connection pool and compressed responses."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.verify = False
+    session.headers.update({
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "Accept-Encoding": "gzip, deflate"
+    })
+    return session
+
 # Abstract base class for device types
 class DeviceBaseClass(ABC):
     device_type = None
+    environment = None
+    snapshot = None
+    previous = None
 
-    def __init__(self, ip: str, username: str, password: str):
+    def __init__(self, ip: str, username: str, password: str, pool_size: int = DEFAULT_TABLE_WORKERS, token_cache: str = None):
         self.ip = ip
         self.username = username
         self.password = password
+        self.session = get_session(pool_size)
+        self.token_timeout = pytoken.DEFAULT_TOKEN_TIMEOUT
+        self.tokens = pytoken.TokenManager(f'{self.device_type}|{ip}|{username}', self._new_token, self._refresh_token,
+                                           on_token=self.set_token, cache_file=token_cache)
 
     @abstractmethod
     def get_token(self) -> str:
         pass
 
+    def refresh_token(self, token: str) -> str:
+        """Extend or renew the token, devices without a refresh api login again instead."""
+        return None
+
+    def _new_token(self) -> tuple:
+        token = self.get_token()
+        return token, self.token_timeout
+
+    def _refresh_token(self, token: str) -> tuple:
+        new_token = self.refresh_token(token)
+        if new_token is None:
+            return self._new_token()
+        return new_token, self.token_timeout
+
+    def login(self) -> str:
+        """Return a valid token, from the token cache, a refresh or a new login."""
+        return self.tokens.get()
+
+    def get_auth_headers(self, token: str) -> dict:
+        return {}
+
+    def set_token(self, token: str) -> None:
+        """Carry the auth token on the pooled session, so every request reuses it."""
+        self.session.headers.update(self.get_auth_headers(token))
+
+    def send(self, method: str, url: str, **kwargs) -> requests.Response:
+        # refresh the token before it expires, and login again once if the device rejects it
+        token = self.tokens.get()
+        with METRICS.stage('request'):
+            resp = self.session.request(method, url, **kwargs)
+            if resp.status_code in (401, 403):
+                METRICS.add('retries')
+                resp.close()
+                self.tokens.relogin(token)
+                resp = self.session.request(method, url, **kwargs)
+        METRICS.add('requests')
+        if not kwargs.get('stream'):
+            # a streamed body is counted while it is read
+            METRICS.add('response_bytes', len(resp.content))
+        return resp
+
+    def decode(self, resp: requests.Response) -> dict:
+        with METRICS.stage('decode'):
+            return resp.json()
+
     @abstractmethod
     def get_api_resp(self, key: str, token: str) -> requests.Response:
         pass
 
     @abstractmethod
-    def parse_json(self, json_obj: dict, key: str) -> pd.DataFrame:
+    def parse_json(self, json_obj: dict, key: str, keep: list = None, drop: list = None) -> pd.DataFrame:
         pass
 
+    def get_json(self, table: dict, token: str) -> Union[dict, Iterable[dict]]:
+        """Fetch one table, returns a json object or an iterable of json pages for parse_json."""
+        return self.decode(self.get_api_resp(table['key'], token))
+
 @register_device_type
 class CiscoApicDevice(DeviceBaseClass):
     device_type = "cisco_apic"
@@ -88,50 +195,191 @@ class CiscoApicDevice(DeviceBaseClass):
                 }
             }
         }
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
         requests.packages.urllib3.disable_warnings()
         try:
-            resp = requests.post(url, headers=headers, data=json.dumps(payload), verify=False)
+            resp = self.session.post(url, data=json.dumps(payload))
             resp.raise_for_status()
-            token = resp.json()['imdata'][0]['aaaLogin']['attributes']['token']
+            attributes = resp.json()['imdata'][0]['aaaLogin']['attributes']
+            token = attributes['token']
+            self.token_timeout = int(attributes.get('refreshTimeoutSeconds', pytoken.DEFAULT_TOKEN_TIMEOUT))
+            self.set_token(token)
             logger.info(f'Token obtained for {self.ip}')
             return token
         except requests.RequestException as e:
             logger.error(f'Failed to get token for {self.ip}: {str(e)}')
             raise
 
-    def get_api_resp(self, key: str, token: str) -> requests.Response:
+    def refresh_token(self, token: str) -> str:
+        url = f'https://{self.ip}/api/aaaRefresh.json'
+        resp = self.session.get(url, headers=self.get_auth_headers(token))
+        resp.raise_for_status()
+        attributes = resp.json()['imdata'][0]['aaaLogin']['attributes']
+        self.token_timeout = int(attributes.get('refreshTimeoutSeconds', pytoken.DEFAULT_TOKEN_TIMEOUT))
+        return attributes['token']
+
+    def get_auth_headers(self, token: str) -> dict:
+        return {"Cookie": f'APIC-Cookie={token}'}
+
+    def get_api_resp(self, key: str, token: str, params: dict = None, stream: bool = False) -> requests.Response:
         url = f'https://{self.ip}/api/class/{key}.json'
-        payload = {}
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Cookie": f'APIC-Cookie={token}'
-        }
         try:
-            logger.info(f'Fetching API data: {key} from {url}')
-            resp = requests.get(url, headers=headers, data=payload, verify=False)
+            logger.info(f'Fetching API data: {key} from {url} {params or ""}')
+            resp = self.send('GET', url, params=params, stream=stream)
             resp.raise_for_status()
             return resp
         except requests.RequestException as e:
             logger.error(f'Failed to fetch API data for {key} from {self.ip}: {str(e)}')
             raise
 
-    def parse_json(self, json_obj: dict, key: str) -> pd.DataFrame:
-        parsed_data = []
+    def get_api_pages(self, key: str, token: str, page_size: int, params: dict = None) -> Iterator[dict]:
+        """Yield the class query one page at a time, so only one page body is held in memory."""
+        page = 0
+        while True:
+            # order-by keeps page boundaries stable while the class is being paged
+            page_params = dict(params or {}, **{'page': page, 'page-size': page_size, 'order-by': f'{key}.dn'})
+            json_obj = self.decode(self.get_api_resp(key, token, page_params))
+            count = len(json_obj['imdata'])
+            total = int(json_obj['totalCount']) if 'totalCount' in json_obj else None
+            yield json_obj
+            if is_last_page(page, page_size, count, total):
+                break
+            page += 1
+
+    def get_api_streams(self, key: str, token: str, page_size: int = None, params: dict = None) -> Iterator[pyapicstream.ImdataStream]:
+        """Yield the class query as response streams, one per page, parse_json decodes each one while it is read."""
+        page = 0
+        while True:
+            page_params = dict(params or {}, **{'page': page, 'page-size': page_size, 'order-by': f'{key}.dn'}) if page_size else params or None
+            resp = self.get_api_resp(key, token, page_params, stream=True)
+            stream = pyapicstream.ImdataStream(resp.iter_content(pyapicstream.CHUNK_SIZE), key)
+            try:
+                yield stream
+            finally:
+                resp.close()
+            METRICS.add_time('request', stream.read_seconds)
+            METRICS.add('response_bytes', stream.bytes)
+            if not page_size or is_last_page(page, page_size, stream.count, stream.total):
+                break
+            page += 1
+
+    def get_query_params(self, table: dict) -> dict:
+        # APIC only projects server side by property category (all, naming-only, config-only),
+        # there is no per-attribute include list on class queries.
+        # A snapshot keeps every attribute, --incremental needs its modTs, which is not a config property.
+        params = {}
+        if table.get('rsp_prop_include') and self.snapshot is None and self.previous is None:
+            params['rsp-prop-include'] = table['rsp_prop_include']
+        return params
+
+    def get_pages(self, table: dict, token: str, params: dict) -> Iterator[dict]:
+        if table.get('page_size'):
+            return self.get_api_pages(table['key'], token, int(table['page_size']), params)
+        return iter([self.decode(self.get_api_resp(table['key'], token, params or None))])
+
+    def get_json(self, table: dict, token: str) -> Union[dict, Iterable[dict]]:
+        if self.previous is not None and table.get('incremental', True):
+            json_obj = self.get_delta_json(table, token)
+            if json_obj is not None:
+                return json_obj
+        params = self.get_query_params(table)
+        if self.snapshot is None:
+            # decoded while it is read, the pages are only held whole when a snapshot saves them
+            return self.get_api_streams(table['key'], token, int(table['page_size']) if table.get('page_size') else None, params)
+        if table.get('page_size'):
+            return self.get_api_pages(table['key'], token, int(table['page_size']), params)
+        return self.decode(self.get_api_resp(table['key'], token, params or None))
+
+    def get_delta_json(self, table: dict, token: str) -> Union[dict, Iterable[dict]]:
+        """
+            Rebuild the table from the previous snapshot and the objects modified since then:
+            1. objects with modTs >= the newest modTs of the previous snapshot
+            2. the dn of every current object (naming-only), to drop deleted objects and keep the api order
+            Returns None when the previous snapshot can not be used, or a current object is in neither of them,
+            the table is then fetched in full. Objects with modTs "never" are not used for the newest modTs.
+            modTs only changes with the configuration, operational classes are set "incremental": false.
+        """
+        key = table['key']
         try:
-            for data in json_obj['imdata']:
-                parsed_data.append(data[key]['attributes'])
-            df = pd.DataFrame(parsed_data)
+            previous = self.previous.load(key)
+        except FileNotFoundError:
+            return None
+        records = {}
+        since = ''
+        for page in ([previous] if isinstance(previous, dict) else previous):
+            for data in page['imdata']:
+                attributes = data[key]['attributes']
+                if 'modTs' not in attributes:
+                    return None
+                records[attributes['dn']] = data
+                # "never" would sort after every timestamp
+                if MODTS_PATTERN.match(attributes['modTs']):
+                    since = max(since, attributes['modTs'])
+        if not records or not since:
+            return None
+
+        params = self.get_query_params(table)
+        changed = {}
+        # the changed objects are fetched before the dn list, so an object created in between is not lost
+        for page in self.get_pages(table, token, dict(params, **{'query-target-filter': f'ge({key}.modTs,"{since}")'})):
+            for data in page['imdata']:
+                changed[data[key]['attributes']['dn']] = data
+        imdata = []
+        for page in self.get_pages(table, token, dict(params, **{'rsp-prop-include': 'naming-only'})):
+            for data in page['imdata']:
+                dn = data[key]['attributes']['dn']
+                record = changed.get(dn) or records.get(dn)
+                if record is None:
+                    # a new object without a modTs timestamp, the modTs filter can not return it
+                    logger.info(f'Incremental {key}: new object {dn} not in the changed objects, full collection')
+                    return None
+                imdata.append(record)
+        logger.info(f'Incremental {key}: {len(records)} previous, {len(changed)} changed, {len(imdata)} current')
+
+        if table.get('page_size'):
+            page_size = int(table['page_size'])
+            return ({'totalCount': str(len(imdata)), 'imdata': imdata[i:i + page_size]} for i in range(0, len(imdata), page_size))
+        return {'totalCount': str(len(imdata)), 'imdata': imdata}
+
+    def parse_json(self, json_obj: Union[dict, Iterable[dict]], key: str, keep: list = None, drop: list = None) -> pd.DataFrame:
+        # a single response, a generator of pages from get_api_pages, or of response streams from get_api_streams
+        pages = [json_obj] if isinstance(json_obj, (dict, pyapicstream.ImdataStream)) else json_obj
+        # the attribute values go straight into column lists, the DataFrame is built once at the end
+        columns = pyapicstream.ColumnBuffers(*get_property_sets(keep, drop))
+        try:
+            for page in pages:
+                for attributes in pyapicstream.iter_attributes(page, key):
+                    columns.append(attributes)
+            df = columns.to_frame()
             logger.debug(f'Exported to dataframe for {key}, size: {df.shape}')
             return df
         except KeyError as e:
             logger.error(f'Failed to parse JSON for {key}: {str(e)}')
             raise
 
+class OfflineDevice(DeviceBaseClass):
+    """Replay a device from a snapshot, parsing is delegated to the handler of the real device type."""
+    device_type = "offline"
+
+    def __init__(self, device_handler: DeviceBaseClass, store: pysnapshot.SnapshotStore):
+        # the snapshot is read from disk, no token is cached and the session is never used
+        super().__init__(device_handler.ip, device_handler.username, device_handler.password, pool_size=1)
+        self.device_handler = device_handler
+        self.store = store
+        self.environment = device_handler.environment
+
+    def get_token(self) -> str:
+        return ''
+
+    def get_api_resp(self, key: str, token: str) -> requests.Response:
+        raise RuntimeError(f"offline snapshot {self.store.path} has no API, {key} can only be loaded from the snapshot")
+
+    def get_json(self, table: dict, token: str) -> Union[dict, Iterable[dict]]:
+        logger.info(f"Loading snapshot data: {table['key']} from {self.store.path}")
+        return self.store.load(table['key'])
+
+    def parse_json(self, json_obj: dict, key: str, keep: list = None, drop: list = None) -> pd.DataFrame:
+        return self.device_handler.parse_json(json_obj, key, keep, drop)
+
 @register_device_type
 class CiscoNexusDevice(DeviceBaseClass):
     device_type = "cisco_nexus"
@@ -142,7 +390,7 @@ class CiscoNexusDevice(DeviceBaseClass):
     def get_api_resp(self, key: str, token: str) -> requests.Response:
         raise NotImplementedError("Cisco Nexus API response not implemented")
 
-    def parse_json(self, json_obj: dict, key: str) -> pd.DataFrame:
+    def parse_json(self, json_obj: dict, key: str, keep: list = None, drop: list = None) -> pd.DataFrame:
         raise NotImplementedError("Cisco Nexus JSON parsing not implemented")
 
 @register_device_type
@@ -156,43 +404,48 @@ class F5LtmDevice(DeviceBaseClass):
             "password": self.password,
             "loginProviderName": "tmos"
         }
-        headers = {
-            "Accept":"application/json",
-            "Content-Type": "application/json"
-        }
         requests.packages.urllib3.disable_warnings()
         try:
-            resp = requests.post(url, headers=headers, data=json.dumps(payload), verify=False)
+            resp = self.session.post(url, data=json.dumps(payload))
             resp.raise_for_status()
             token = resp.json()['token']['token']
+            self.token_timeout = int(resp.json()['token'].get('timeout', pytoken.DEFAULT_TOKEN_TIMEOUT))
+            self.set_token(token)
             logger.info(f'Token obtained for {self.ip}')
             return token
         except requests.RequestException as e:
             logger.error(f'Failed to get token for {self.ip}: {str(e)}')
             raise
 
+    def refresh_token(self, token: str) -> str:
+        url = f'https://{self.ip}/mgmt/shared/authz/tokens/{token}'
+        resp = self.session.patch(url, data=json.dumps({"timeout": F5_MAX_TOKEN_TIMEOUT}))
+        resp.raise_for_status()
+        # the F5 timeout counts from the token creation, not from the extension,
+        # tokens.created is the login time, also for a token loaded from the cache and refreshed before
+        self.token_timeout = int(resp.json()['timeout']) - int(time.time() - self.tokens.created)
+        return token
+
+    def get_auth_headers(self, token: str) -> dict:
+        return {"X-F5-Auth-Token": f'{token}'}
+
     def get_api_resp(self, key: str, token: str) -> requests.Response:
         url = f'https://{self.ip}/mgmt/tm/ltm/{key}'
-        payload={}
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "X-F5-Auth-Token" : f'{token}'
-        }
         try:
             logger.info(f'Fetching API data: {key} from {url}')
-            resp = requests.get(url, headers=headers, data=payload, verify=False)
+            resp = self.send('GET', url)
             resp.raise_for_status()
             return resp
         except requests.RequestException as e:
             logger.error(f'Failed to fetch API data for {key} from {self.ip}: {str(e)}')
             raise
 
-    def parse_json(self, json_obj: dict, key: str) -> pd.DataFrame:
+    def parse_json(self, json_obj: dict, key: str, keep: list = None, drop: list = None) -> pd.DataFrame:
         parsed_data = []
+        keep, drop = get_property_sets(keep, drop)
         try:
             for data in json_obj['items']:
-                parsed_data.append(data)
+                parsed_data.append(filter_properties(data, keep, drop))
             df = pd.DataFrame(parsed_data)
             logger.debug(f'Exported to dataframe for {key}, size: {df.shape}')
             return df
@@ -207,6 +460,58 @@ ANALYSIS_REGISTRY = {
     "f5_ltm": [],
 }
 
+def get_report_name(analysis_module) -> str:
+    # pyapicanaylsis_interface -> interface
+    return analysis_module.__name__.rsplit('_', 1)[-1]
+
+def get_report_names() -> list:
+    return sorted({get_report_name(module) for modules in ANALYSIS_REGISTRY.values() for module in modules})
+
+def get_analysis_modules(device_type: str) -> list:
+    """Analysis modules of a device type, only those of REPORTS when it is set."""
+    return [module for module in ANALYSIS_REGISTRY.get(device_type, []) if REPORTS is None or get_report_name(module) in REPORTS]
+
+def get_report_tables(req_tables: list, device_type: str) -> list:
+    """Tables of req_tables read by the analyses of REPORTS, in the configured order, all of them when REPORTS is not set."""
+    if REPORTS is None:
+        return req_tables
+    keys = {key for module in get_analysis_modules(device_type) for key in module.REQUIRED_TABLES}
+    return [table for table in req_tables if table['key'] in keys]
+
+def get_analysis_tables(device_type: str) -> dict:
+    """Columns of each table used by the analysis modules of a device type."""
+    analysis_tables = {}
+    for analysis_module in get_analysis_modules(device_type):
+        for key, columns in analysis_module.REQUIRED_TABLES.items():
+            analysis_tables.setdefault(key, [])
+            analysis_tables[key] += [col for col in columns if col not in analysis_tables[key]]
+    return analysis_tables
+
+def get_analysis_frame(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    # same columns and dtypes the analysis would read back from the output file
+    return pyapicloader.restore_excel_types(df[[col for col in columns if col in df.columns]])
+
+def is_last_page(page: int, page_size: int, count: int, total: int = None) -> bool:
+    # without a totalCount in the response, only a short page ends the class
+    return count < page_size or (total is not None and (page + 1) * page_size >= total)
+
+def get_table_properties(table: dict, remove_properties_flag: int) -> tuple:
+    """Return the (keep, drop) property lists of a table, used to project attributes while parsing."""
+    keep = table.get('keep_properties')
+    drop = table.get('remove_properties') if remove_properties_flag == 1 else None
+    return keep, drop
+
+def get_property_sets(keep: list, drop: list) -> tuple:
+    return (set(keep) if keep else None), (set(drop) if drop else None)
+
+def filter_properties(attributes: dict, keep: set, drop: set) -> dict:
+    # keep the attribute order of the response, so the column order is unchanged
+    if keep is not None:
+        return {k: v for k, v in attributes.items() if k in keep}
+    if drop is not None:
+        return {k: v for k, v in attributes.items() if k not in drop}
+    return attributes
+
 def remove_columns(df: pd.DataFrame, properties: list) -> pd.DataFrame:
     for i in properties:
         if i in df.columns:
@@ -223,6 +528,161 @@ def export_df_to_xlsx(writer: pd.ExcelWriter, df: pd.DataFrame, key: str) -> Non
         raise
     return
 
+# Abstract base class for output formats
+class OutputBaseClass(ABC):
+    output_format = None
+    folder = False
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @abstractmethod
+    def write(self, df: pd.DataFrame, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+@register_output_format
+class XlsxOutput(OutputBaseClass):
+    output_format = "xlsx"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.writer = pd.ExcelWriter(path)
+
+    def write(self, df: pd.DataFrame, key: str) -> None:
+        export_df_to_xlsx(self.writer, df, key)
+
+    def close(self) -> None:
+        self.writer.close()
+
+@register_output_format
+class StreamingXlsxOutput(OutputBaseClass):
+    """
+        xlsx written row by row in constant memory mode: each row is flushed to a temp file as it is written,
+        so the workbook is not held in memory. The DataFrame of the table being exported still is, peak memory
+        follows the largest table, not the number of tables.
+        Uses xlsxwriter, or openpyxl write only mode when xlsxwriter is not installed.
+    """
+    output_format = "xlsx-stream"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        try:
+            import xlsxwriter
+            # cells are written verbatim like to_excel, text starting with = or http is not turned into a formula or a link
+            self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False})
+            self.header_format = self.workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        except ImportError:
+            import openpyxl
+            self.workbook = openpyxl.Workbook(write_only=True)
+            self.header_format = None
+
+    def write(self, df: pd.DataFrame, key: str) -> None:
+        try:
+            # xlsxwriter drops the rows past the sheet limit without an error, to_excel raises
+            if len(df) + 1 > XLSX_MAX_ROWS or df.shape[1] > XLSX_MAX_COLS:
+                raise ValueError(f'This sheet is too large! Your sheet size is: {len(df) + 1}, {df.shape[1]} '
+                                 f'Max sheet size is: {XLSX_MAX_ROWS}, {XLSX_MAX_COLS}')
+            header = [str(col) for col in df.columns]
+            if self.header_format is None:
+                ws = self.workbook.create_sheet(key)
+                ws.append(header)
+                for rows in iter_xlsx_rows(df):
+                    for row in rows:
+                        ws.append(row)
+            else:
+                ws = self.workbook.add_worksheet(key)
+                ws.write_row(0, 0, header, self.header_format)
+                r = 1
+                for rows in iter_xlsx_rows(df):
+                    for row in rows:
+                        ws.write_row(r, 0, row)
+                        r += 1
+        except Exception as e:
+            logger.error(f'Failed to export DataFrame to Excel for sheet {key}: {str(e)}')
+            raise
+
+    def close(self) -> None:
+        if self.header_format is None:
+            self.workbook.save(self.path)
+        else:
+            self.workbook.close()
+
+def iter_xlsx_rows(df: pd.DataFrame) -> Iterator[list]:
+    # cells are converted a chunk at a time, empty cells are written as blanks and nested values as text like pandas to_excel
+    for start in range(0, len(df), XLSX_STREAM_CHUNK_ROWS):
+        chunk = df.iloc[start:start + XLSX_STREAM_CHUNK_ROWS].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield [[str(v) if isinstance(v, (dict, list)) else v for v in row] for row in chunk.itertuples(index=False, name=None)]
+
+class ColumnarOutput(OutputBaseClass):
+    """One file per table in the output folder, readers can load only the columns they need."""
+    extension = None
+    folder = True
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.tables = []
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, df: pd.DataFrame, key: str) -> None:
+        try:
+            self.write_file(to_columnar_df(df), os.path.join(self.path, f'{key}{self.extension}'))
+            self.tables.append(key)
+        except Exception as e:
+            logger.error(f'Failed to export DataFrame to {self.output_format} for table {key}: {str(e)}')
+            raise
+
+    @abstractmethod
+    def write_file(self, df: pd.DataFrame, path: str) -> None:
+        pass
+
+    def close(self) -> None:
+        # keep the configured table order for readers and the xlsx export
+        with open(os.path.join(self.path, pyapicloader.TABLES_FILE), 'w') as f:
+            json.dump(self.tables, f)
+
+@register_output_format
+class ParquetOutput(ColumnarOutput):
+    output_format = "parquet"
+    extension = ".parquet"
+
+    def write_file(self, df: pd.DataFrame, path: str) -> None:
+        df.to_parquet(path, index=False)
+
+@register_output_format
+class FeatherOutput(ColumnarOutput):
+    output_format = "feather"
+    extension = ".feather"
+
+    def write_file(self, df: pd.DataFrame, path: str) -> None:
+        df.to_feather(path)
+
+def to_columnar_df(df: pd.DataFrame) -> pd.DataFrame:
+    # nested values (e.g. F5 references) are kept as json text, like a cell in the xlsx output
+    for col in df.columns:
+        if df[col].dtype == object and df[col].map(lambda v: isinstance(v, (dict, list))).any():
+            df[col] = df[col].map(lambda v: json.dumps(v) if isinstance(v, (dict, list)) else v)
+    return df
+
+def get_output(outfile: str) -> OutputBaseClass:
+    return OUTPUT_REGISTRY[OUTPUT_FORMAT](os.path.join(PARENT_DIR, outfile))
+
+def export_columnar_to_xlsx(outfile: str) -> str:
+    """Late xlsx export of a columnar output folder."""
+    xlsx_file = f'{outfile}.xlsx'
+    path = os.path.join(PARENT_DIR, outfile)
+    logger.info(f'Exporting {outfile} to {xlsx_file}')
+    # one table in memory at a time
+    writer = StreamingXlsxOutput(os.path.join(PARENT_DIR, xlsx_file))
+    for key in pyapicloader.list_tables(path):
+        writer.write(pyapicloader.read_table(path, key), key)
+    writer.close()
+    return xlsx_file
+
 def get_config_files_to_list(dir: str) -> list:
     matched_files = []
     try:
@@ -275,52 +735,328 @@ def read_config_json(in_file: str) -> tuple:
         logger.error(f'Failed to read config file {in_file}: {str(e)}')
         raise
 
+def process_table(device_handler: DeviceBaseClass, table: dict, token: str, remove_properties_flag: int) -> pd.DataFrame:
+    logger.info(f"### process {table['key']}")
+    with METRICS.table(device_handler.environment, table['key']):
+        # pages are fetched while they are parsed, their request and decode time is not parse time
+        with METRICS.stage('parse', exclude=('request', 'decode')):
+            json_obj = device_handler.get_json(table, token)
+            if device_handler.snapshot:
+                json_obj = device_handler.snapshot.save(table['key'], json_obj)
+            keep, drop = get_table_properties(table, remove_properties_flag)
+            # the remove_properties are dropped while parsing
+            df = device_handler.parse_json(json_obj, table['key'], keep, drop)
+        METRICS.set('rows', len(df))
+        METRICS.set('columns', df.shape[1])
+    return df
+
+def collect_table(device_handler: DeviceBaseClass, table: dict, token: str, remove_properties_flag: int, outfile: str) -> pd.DataFrame:
+    # process_table, then hand the table to the analyses waiting for it
+    df = process_table(device_handler, table, token, remove_properties_flag)
+    if ANALYSIS_SCHEDULER:
+        ANALYSIS_SCHEDULER.table_ready(outfile, table['key'], df)
+    return df
+
+def get_device_handler(device: dict) -> DeviceBaseClass:
+    if 'device_type' not in device:
+        logger.error(f"Device {device['environment']} missing 'device_type' in configuration")
+        raise ValueError("Missing 'device_type' in device configuration")
+    device_type = device['device_type']
+    if device_type not in DEVICE_REGISTRY:
+        logger.error(f"Unsupported device type: {device_type}")
+        raise ValueError(f"Unsupported device type: {device_type}")
+    pool_size = int(device.get('pool_size', get_table_workers(device)))
+    return DEVICE_REGISTRY[device_type](device['ip'], device['username'], device['password'], pool_size, TOKEN_CACHE_FILE)
+
+def get_device_source(device: dict, batch_datetime: str) -> DeviceBaseClass:
+    """Device handler to collect from, the live device or its offline snapshot."""
+    device_handler = get_device_handler(device)
+    device_handler.environment = device['environment']
+    if OFFLINE_SNAPSHOT:
+        snapshot_dir = pysnapshot.get_snapshot_dir(device, OFFLINE_SNAPSHOT)
+        if not os.path.isdir(snapshot_dir):
+            raise FileNotFoundError(f'Snapshot not found: {snapshot_dir}')
+        return OfflineDevice(device_handler, pysnapshot.SnapshotStore(snapshot_dir))
+    if SNAPSHOT or INCREMENTAL:
+        device_handler.snapshot = pysnapshot.SnapshotStore(pysnapshot.get_snapshot_dir(device, batch_datetime))
+    if INCREMENTAL:
+        previous_dir = pysnapshot.find_latest_snapshot(device, batch_datetime)
+        if previous_dir:
+            logger.info(f'Incremental collection for {device["environment"]} from snapshot: {previous_dir}')
+            device_handler.previous = pysnapshot.SnapshotStore(previous_dir)
+        else:
+            logger.info(f'No previous snapshot for {device["environment"]}, full collection')
+    return device_handler
+
+def get_outfile(device: dict, batch_datetime: str) -> str:
+    # columnar formats write a folder of the same name without extension
+    outfile = f"{device['device_type'].replace('_', '')}_{device['environment']}_{batch_datetime}"
+    return outfile if OUTPUT_REGISTRY[OUTPUT_FORMAT].folder else f'{outfile}.xlsx'
+
+def get_table_workers(device: dict) -> int:
+    return max(1, int(device.get('table_workers', DEFAULT_TABLE_WORKERS)))
+
+def get_selected_tables(device: dict, req_tables: list) -> list:
+    # with --reports, the tables the selected analyses read
+    selected = get_report_tables(req_tables, device['device_type'])
+    if not selected:
+        logger.info(f'###### Reports {REPORTS}: no table of {device["device_type"]} is read by them, skipping {device["environment"]}')
+        return selected
+    if len(selected) < len(req_tables):
+        logger.info(f'###### Reports {REPORTS}: fetching {len(selected)} of {len(req_tables)} tables for {device["environment"]}')
+    return selected
+
 def process_device(device: dict, req_tables: list, remove_properties_flag: int, batch_datetime: str) -> str:
+    """Collect one device to its output, returns the outfile, None for a device skipped by --reports."""
+    # a device none of the selected reports reads is not collected
+    req_tables = get_selected_tables(device, req_tables)
+    if not req_tables:
+        return None
+    start = time.perf_counter()
     try:
-        if 'device_type' not in device:
-            logger.error(f"Device {device['environment']} missing 'device_type' in configuration")
-            raise ValueError("Missing 'device_type' in device configuration")
-        device_type = device['device_type']
-        if device_type not in DEVICE_REGISTRY:
-            logger.error(f"Unsupported device type: {device_type}")
-            raise ValueError(f"Unsupported device type: {device_type}")
-        
-        device_handler = DEVICE_REGISTRY[device_type](device['ip'], device['username'], device['password'])
-        logger.info(f'###### Step4 - Login device and get token for {device["environment"]} ({device_type}):')
-        token = device_handler.get_token()
+        device_handler = get_device_source(device, batch_datetime)
+        logger.info(f'###### Step4 - Login device and get token for {device["environment"]} ({device["device_type"]}):')
+        with METRICS.stage('login', device['environment']):
+            token = device_handler.login()
         
-        outfile = f"{device['device_type'].replace('_', '')}_{device['environment']}_{batch_datetime}.xlsx"
-        writer = pd.ExcelWriter(os.path.join(PARENT_DIR, outfile))
-        
-        for table in req_tables:
-            logger.info(f"### [{req_tables.index(table) + 1}/{len(req_tables)}], process {table['key']}")
-            resp = device_handler.get_api_resp(table['key'], token)
-            df = device_handler.parse_json(resp.json(), table['key'])
-            if remove_properties_flag == 1 and 'remove_properties' in table:
-                df = remove_columns(df, table['remove_properties'])
-            export_df_to_xlsx(writer, df, table['key'])
+        outfile = get_outfile(device, batch_datetime)
+        writer = get_output(outfile)
         
+        if ANALYSIS_SCHEDULER:
+            ANALYSIS_SCHEDULER.add_device(outfile, device['device_type'], device['environment'])
+        table_workers = get_table_workers(device)
+        logger.info(f'###### Step5 - Fetching {len(req_tables)} tables for {device["environment"]} with {table_workers} workers')
+        with ThreadPoolExecutor(max_workers=table_workers) as executor:
+            # at most table_workers tables are fetched ahead of the table being written, so a slow table
+            # does not keep the DataFrames of every later table in memory
+            futures = {i: executor.submit(collect_table, device_handler, table, token, remove_properties_flag, outfile)
+                       for i, table in enumerate(req_tables[:table_workers])}
+            try:
+                # sheets are written in the configured table order, each one as soon as it is ready
+                for i, table in enumerate(req_tables):
+                    df = futures.pop(i).result()
+                    if i + table_workers < len(req_tables):
+                        futures[i + table_workers] = executor.submit(collect_table, device_handler, req_tables[i + table_workers], token,
+                                                                     remove_properties_flag, outfile)
+                    logger.info(f"### [{i + 1}/{len(req_tables)}], export {table['key']}")
+                    with METRICS.stage('write', device['environment'], table['key']):
+                        writer.write(df, table['key'])
+                    del df
+            except Exception:
+                executor.shutdown(cancel_futures=True)
+                raise
+
         logger.info(f'Closing output: {outfile}')
-        writer.close()
+        with METRICS.stage('close', device['environment']):
+            writer.close()
+        if device_handler.snapshot:
+            device_handler.snapshot.write_meta(device, [table['key'] for table in req_tables])
+        if ANALYSIS_SCHEDULER:
+            ANALYSIS_SCHEDULER.device_done(outfile)
         return outfile
     except Exception as e:
         logger.error(f'Failed to process device {device["environment"]}: {str(e)}')
+        if ANALYSIS_SCHEDULER:
+            ANALYSIS_SCHEDULER.device_done(get_outfile(device, batch_datetime), failed=True)
         raise
+    finally:
+        METRICS.add_time('collect', time.perf_counter() - start, device['environment'])
+
+async def process_table_async(device_handler: DeviceBaseClass, table: dict, token: str, remove_properties_flag: int, outfile: str,
+                              global_limit: asyncio.Semaphore, host_limit: asyncio.Semaphore) -> pd.DataFrame:
+    # the device handlers use blocking requests, so each table runs in the loop's executor;
+    # the host slot is taken first, so tables waiting for a busy device do not hold global slots other devices could use
+    async with host_limit, global_limit:
+        return await asyncio.to_thread(collect_table, device_handler, table, token, remove_properties_flag, outfile)
 
-def process_analysis(outfile: str, device_type: str, batch_datetime: str) -> None:
+async def process_device_async(device: dict, req_tables: list, remove_properties_flag: int, batch_datetime: str,
+                               global_limit: asyncio.Semaphore, host_limits: dict) -> str:
+    # a device none of the selected reports reads is not collected
+    req_tables = get_selected_tables(device, req_tables)
+    if not req_tables:
+        return None
+    start = time.perf_counter()
     try:
-        logger.info(f'Processing analysis for file: {outfile} (device_type: {device_type})')
-        if device_type not in ANALYSIS_REGISTRY:
-            logger.warning(f'No analysis scripts defined for device type: {device_type}. Skipping analysis.')
-            return
-        args = argparse.Namespace()
-        args.infiles = outfile
-        args.batch_datetime = batch_datetime
-        for analysis_module in ANALYSIS_REGISTRY[device_type]:
-            analysis_module.start_script(args)
-        logger.info(f'Successfully completed analysis for {outfile}')
+        device_handler = get_device_source(device, batch_datetime)
+        table_workers = get_table_workers(device)
+        host_limit = host_limits.setdefault(device['ip'], asyncio.Semaphore(table_workers))
+        logger.info(f'###### Step4 - Login device and get token for {device["environment"]} ({device["device_type"]}):')
+        async with host_limit, global_limit:
+            with METRICS.stage('login', device['environment']):
+                token = await asyncio.to_thread(device_handler.login)
+
+        outfile = get_outfile(device, batch_datetime)
+        writer = get_output(outfile)
+        if ANALYSIS_SCHEDULER:
+            ANALYSIS_SCHEDULER.add_device(outfile, device['device_type'], device['environment'])
+        # as process_device, at most table_workers tables are fetched ahead of the table being written
+        tasks = {i: asyncio.create_task(process_table_async(device_handler, table, token, remove_properties_flag, outfile, global_limit, host_limit))
+                 for i, table in enumerate(req_tables[:table_workers])}
+        try:
+            # sheets are written in the configured table order, each one as soon as it is ready
+            for i, table in enumerate(req_tables):
+                df = await tasks.pop(i)
+                if i + table_workers < len(req_tables):
+                    tasks[i + table_workers] = asyncio.create_task(process_table_async(device_handler, req_tables[i + table_workers], token,
+                                                                                       remove_properties_flag, outfile, global_limit, host_limit))
+                logger.info(f"### [{i + 1}/{len(req_tables)}], export {table['key']} for {device['environment']}")
+                with METRICS.stage('write', device['environment'], table['key']):
+                    await asyncio.to_thread(writer.write, df, table['key'])
+                del df
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        logger.info(f'Closing output: {outfile}')
+        with METRICS.stage('close', device['environment']):
+            await asyncio.to_thread(writer.close)
+        if device_handler.snapshot:
+            device_handler.snapshot.write_meta(device, [table['key'] for table in req_tables])
+        if ANALYSIS_SCHEDULER:
+            ANALYSIS_SCHEDULER.device_done(outfile)
+        return outfile
     except Exception as e:
-        logger.error(f'Failed to process analysis for {outfile}: {str(e)}')
+        logger.error(f'Failed to process device {device["environment"]}: {str(e)}')
+        if ANALYSIS_SCHEDULER:
+            ANALYSIS_SCHEDULER.device_done(get_outfile(device, batch_datetime), failed=True)
+        raise
+    finally:
+        METRICS.add_time('collect', time.perf_counter() - start, device['environment'])
+
+async def collect_devices_async(jobs: list, batch_datetime: str, max_concurrency: int) -> list:
+    """Collect every (device, req_tables, remove_properties_flag) job on one event loop."""
+    global_limit = asyncio.Semaphore(max_concurrency)
+    host_limits = {}
+    # room for every request slot plus one output writer per device
+    executor = ThreadPoolExecutor(max_workers=max_concurrency + len(jobs))
+    asyncio.get_running_loop().set_default_executor(executor)
+    return await asyncio.gather(*[process_device_async(device, req_tables, remove_properties_flag, batch_datetime, global_limit, host_limits)
+                                  for device, req_tables, remove_properties_flag in jobs], return_exceptions=True)
+
+def process_infiles_async(files: list, batch_datetime: str, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> tuple:
+    jobs = []
+    for file in files:
+        logger.info(f'###### Step3 - Load json config from {file}')
+        try:
+            devices, req_tables, remove_properties_flag = read_config_json(os.path.join(CONFIG_DIR_FULL, file))
+        except Exception as e:
+            logger.error(f'Failed to process config file {file}: {str(e)}')
+            continue
+        jobs.extend((device, req_tables, remove_properties_flag) for device in devices)
+
+    logger.info(f'###### Step4 - Processing {len(jobs)} devices on one event loop, max concurrency {max_concurrency}')
+    results = asyncio.run(collect_devices_async(jobs, batch_datetime, max_concurrency))
+
+    outfilelist = []
+    for (device, _, _), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            logger.error(f'Error processing device {device["environment"]}: {str(result)}')
+            continue
+        if result is None:
+            continue
+        outfilelist.append(result)
+        logger.info(f'Successfully processed device {device["environment"]}, output: {result}')
+    return outfilelist, [job[0] for job in jobs]
+
+def timed_call(func, *args) -> tuple:
+    # (result, seconds), the wall time of a task in a worker process goes back to METRICS of the parent with the result
+    start = time.perf_counter()
+    return func(*args), time.perf_counter() - start
+
+def init_analysis_worker(log_queue: multiprocessing.Queue, level: int) -> None:
+    """Process pool initializer: the records of the worker go through log_queue to the handlers of the parent."""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+def get_analysis_executor(engine: str, max_workers: int):
+    """Executor of the analysis stage and the QueueListener forwarding the logs of the worker processes (None for threads)."""
+    if engine != 'process':
+        return ThreadPoolExecutor(max_workers=max_workers), None
+    # spawn, the parent still holds the threads and locks of the collection
+    context = multiprocessing.get_context('spawn')
+    log_queue = context.Queue()
+    root = logging.getLogger()
+    listener = logging.handlers.QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+    listener.start()
+    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=init_analysis_worker, initargs=(log_queue, root.level))
+    return executor, listener
+
+class AnalysisScheduler:
+    """
+        Starts each analysis module of a device as soon as the tables of its REQUIRED_TABLES are collected,
+        while the other tables of the device are still being fetched. The analyses of all devices share one
+        thread or process pool (see get_analysis_executor), the tables are kept until every analysis needing them has started.
+    """
+    def __init__(self, batch_datetime: str, engine: str = 'thread', max_workers: int = None):
+        if max_workers is None:
+            max_workers = os.cpu_count() if engine == 'process' else 4
+        self.batch_datetime = batch_datetime
+        self.executor, self.listener = get_analysis_executor(engine, max(1, max_workers))
+        self.lock = threading.Lock()
+        self.devices = {}  # outfile: (environment, {key: columns}, {key: DataFrame}, [analysis modules not started])
+        self.tasks = {}  # outfile: [(analysis module, environment, future or exception)]
+        logger.info(f'###### Analysis starts with its tables, {max(1, max_workers)} {engine} workers')
+
+    def add_device(self, outfile: str, device_type: str, environment: str) -> None:
+        with self.lock:
+            self.devices[outfile] = (environment, get_analysis_tables(device_type), {}, get_analysis_modules(device_type))
+            self.tasks.setdefault(outfile, [])
+
+    def table_ready(self, outfile: str, key: str, df: pd.DataFrame) -> None:
+        """Keep the columns the analyses read from a collected table, and start the analyses with all their tables."""
+        device = self.devices.get(outfile)
+        if device is None or key not in device[1]:
+            return
+        environment, analysis_tables, frames, pending = device
+        frame = get_analysis_frame(df, analysis_tables[key])
+        with self.lock:
+            frames[key] = frame
+            for analysis_module in [module for module in pending if module.REQUIRED_TABLES.keys() <= frames.keys()]:
+                pending.remove(analysis_module)
+                logger.info(f'###### Start {analysis_module.__name__} for {environment}, {len(analysis_module.REQUIRED_TABLES)} tables collected')
+                module_frames = {k: frames[k] for k in analysis_module.REQUIRED_TABLES}
+                self.tasks[outfile].append((analysis_module, environment,
+                                            self.executor.submit(timed_call, analysis_module.process_frames, module_frames, environment, self.batch_datetime)))
+            # release the tables no pending analysis reads
+            for k in [k for k in frames if not any(k in module.REQUIRED_TABLES for module in pending)]:
+                del frames[k]
+
+    def device_done(self, outfile: str, failed: bool = False) -> None:
+        """End of the collection of a device, the analyses still waiting for tables do not run."""
+        with self.lock:
+            environment, _, frames, pending = self.devices.pop(outfile, (None, {}, {}, []))
+            for analysis_module in pending:
+                missing = sorted(analysis_module.REQUIRED_TABLES.keys() - frames.keys())
+                error = RuntimeError(f'{analysis_module.__name__} not started for {environment}, ' + ('collection failed' if failed else f'missing tables: {missing}'))
+                logger.error(str(error))
+                self.tasks[outfile].append((analysis_module, environment, error))
+
+    def wait(self) -> dict:
+        """Wait for the started analyses. Returns {outfile: [analysis output, or the exception of a failed analysis]}."""
+        results = {}
+        try:
+            for outfile, tasks in self.tasks.items():
+                results[outfile] = []
+                for analysis_module, environment, task in tasks:
+                    if isinstance(task, Exception):
+                        results[outfile].append(task)
+                        continue
+                    try:
+                        result, seconds = task.result()
+                        METRICS.add_time(f'analysis_{get_report_name(analysis_module)}', seconds, environment)
+                        results[outfile].append(result)
+                    except Exception as e:
+                        logger.error(f'Error in analysis task {analysis_module.__name__} for {outfile}: {str(e)}')
+                        results[outfile].append(e)
+        finally:
+            self.executor.shutdown()
+            if self.listener:
+                self.listener.stop()
+        return results
 
 def start_script(args) -> tuple:
     logger.info(f'######')
@@ -333,14 +1069,20 @@ def start_script(args) -> tuple:
     device_configs = {}
 
     logger.info(f'###### Step2 - Process config files: {infilelist}')
-    i = 0
-    for inf in infilelist:
-        logger.info(f'###### {i+1}/{len(infilelist)}, process {inf}')
-        i += 1
-        outf, devices = process_infile(inf, args.batch_datetime)
+    if getattr(args, 'engine', 'thread') == 'asyncio':
+        outf, devices = process_infiles_async(infilelist, args.batch_datetime, args.max_concurrency)
         outfilelist.extend(outf)
         for device in devices:
-            device_configs[f"{device['device_type'].replace('_', '')}_{device['environment']}_{args.batch_datetime}.xlsx"] = device['device_type']
+            device_configs[get_outfile(device, args.batch_datetime)] = device['device_type']
+    else:
+        i = 0
+        for inf in infilelist:
+            logger.info(f'###### {i+1}/{len(infilelist)}, process {inf}')
+            i += 1
+            outf, devices = process_infile(inf, args.batch_datetime)
+            outfilelist.extend(outf)
+            for device in devices:
+                device_configs[get_outfile(device, args.batch_datetime)] = device['device_type']
     logger.info(f'###### Complete, outfiles: {outfilelist}, device_config: {device_configs}')
     return outfilelist, device_configs
 
@@ -375,6 +1117,8 @@ def process_infile(file: str, batch_datetime: str) -> tuple:
             device = future_to_device[future]
             try:
                 outfile = future.result()
+                if outfile is None:
+                    continue
                 outfilelist.append(outfile)
                 logger.info(f'Successfully processed device {device["environment"]}, output: {outfile}')
             except Exception as e:
@@ -388,29 +1132,70 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--infiles", help="input json in config folder, example: -i all_apic_example.json")
     parser.add_argument("-a", "--anaylsis", action='store_true', help="flag to analysis and parse table to new excel")
+    parser.add_argument("--reports", help=f"collect only the tables these analyses read ({','.join(get_report_names())}) and run them, implies -a, comma separated, example: --reports contract")
+    parser.add_argument("--analysis-engine", choices=ANALYSIS_ENGINES, default='thread', help="analysis stage, process runs each output in its own process, example: --analysis-engine process")
+    parser.add_argument("--analysis-workers", type=int, help="analysis workers, default: CPU count for process, 4 for thread")
+    parser.add_argument("-e", "--engine", choices=ENGINES, default='thread', help="collection engine, example: -e asyncio")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="asyncio engine, max concurrent requests over all devices")
+    parser.add_argument("--token-cache", action='store_true', help="keep valid login tokens on disk for the next run")
+    parser.add_argument("-s", "--snapshot", action='store_true', help="save raw api responses to the snapshot folder")
+    parser.add_argument("--offline", help="replay a snapshot instead of the api, example: --offline 20251009_1200")
+    parser.add_argument("--incremental", action='store_true', help="fetch only objects modified since the last snapshot, implies --snapshot")
+    parser.add_argument("-o", "--output", choices=list(OUTPUT_REGISTRY), default='xlsx', help="output format, xlsx-stream writes xlsx without holding the workbook in memory, parquet/feather write one file per table, example: -o parquet")
+    parser.add_argument("--export-xlsx", action='store_true', help="with a columnar output, also export each device to xlsx at the end")
+    parser.add_argument("--metrics", action='store_true', help="write the stage times and table counters to apic_metrics_<datetime>.json and .prom")
     args = parser.parse_args()
 
+    global TOKEN_CACHE_FILE, SNAPSHOT, OFFLINE_SNAPSHOT, INCREMENTAL, OUTPUT_FORMAT, ANALYSIS_SCHEDULER, REPORTS
+    if args.token_cache:
+        TOKEN_CACHE_FILE = pytoken.TOKEN_CACHE_FILE
+    SNAPSHOT = args.snapshot
+    OFFLINE_SNAPSHOT = args.offline
+    INCREMENTAL = args.incremental
+    OUTPUT_FORMAT = args.output
+    if args.reports:
+        REPORTS = args.reports.split(',')
+        unknown = [report for report in REPORTS if report not in get_report_names()]
+        if unknown:
+            parser.error(f'unknown reports {unknown}, choose from {get_report_names()}')
+        args.anaylsis = True
+    if OFFLINE_SNAPSHOT:
+        logger.info(f'Offline mode, replay snapshot: {pysnapshot.get_snapshot_root(OFFLINE_SNAPSHOT)}')
+
     batch_datetime = get_datetime()
     logger.info(f'Batch datetime set to: {batch_datetime}')
     args.batch_datetime = batch_datetime
+    if args.anaylsis:
+        ANALYSIS_SCHEDULER = AnalysisScheduler(batch_datetime, args.analysis_engine, args.analysis_workers)
 
     outfilelist, device_configs = start_script(args)
 
     if args.anaylsis:
         logger.info(f'######')
-        logger.info(f'###### Analysis argument enabled, processing {len(outfilelist)} files')
+        logger.info(f'###### Analysis argument enabled, waiting for the analyses of {len(outfilelist)} files')
         logger.info(f'######')
-        if outfilelist:
-            max_workers = max(1, min(len(outfilelist), 4))
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [executor.submit(process_analysis, outfile, device_configs.get(outfile, "unknown"), batch_datetime) for outfile in outfilelist]
-                for future in futures:
-                    try:
-                        future.result()
-                    except Exception as e:
-                        logger.error(f'Error in analysis task: {str(e)}')
-        else:
+        results = ANALYSIS_SCHEDULER.wait()
+        if not outfilelist:
             logger.warning('No output files to analyze. Skipping analysis.')
+        total = sum(len(outputs) for outputs in results.values())
+        failed = sum(isinstance(result, Exception) for outputs in results.values() for result in outputs)
+        if failed:
+            logger.error(f'###### Analysis failed for {failed} of {total} analyses, see the errors above')
+        else:
+            logger.info(f'###### Analysis complete, {total} analyses')
+
+    if args.export_xlsx and OUTPUT_REGISTRY[OUTPUT_FORMAT].folder:
+        logger.info(f'###### Export {len(outfilelist)} outputs to xlsx')
+        for outfile in outfilelist:
+            try:
+                export_columnar_to_xlsx(outfile)
+            except Exception as e:
+                logger.error(f'Failed to export {outfile} to xlsx: {str(e)}')
+
+    METRICS.log_summary()
+    if args.metrics:
+        metrics_files = METRICS.write(os.path.join(PARENT_DIR, f'apic_metrics_{batch_datetime}'))
+        logger.info(f'### metrics: {metrics_files}')
 
     logger.info(f'##################         END SCRIPT       ################## ')
     logger.info(f'############################################################## ')
@@ -0,0 +1,208 @@
+import logging
+import logging.config
+import argparse, os, json
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+import pyapicloader
+import pyapicdn
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+DATETIME = datetime.now().strftime("%Y%m%d_%H%M%S")
+LOG_ENV = 'dev'
+LOG_DIR = 'log'
+CONFIG_DIR = 'config'
+
+# Tables and columns read from the pyapicapi.py output
+REQUIRED_TABLES = {
+    'fvRsCons': ['dn', 'tDn'],
+    'fvRsProv': ['dn', 'tDn'],
+    'vzRtAnyToCons': ['dn', 'tDn'],
+    'vzRtAnyToProv': ['dn', 'tDn'],
+    'vzRsSubjFiltAtt': ['dn', 'tnVzFilterName', 'action'],
+    'fvRsBd': ['dn', 'tDn'],
+    'fvRtCtx': ['dn', 'tDn'],
+}
+
+logger = logging.getLogger(__name__)
+
+def setup_logging() -> None:
+    log_configs = {
+        "dev": "logging.dev.json",
+        "prod": "logging.prod.json"
+        }
+    log_name = Path(os.path.basename(__file__)).stem # filename without extension
+    log_config = log_configs.get(LOG_ENV, "logging.dev.json")
+    log_config_path = os.path.join(PARENT_DIR, CONFIG_DIR, log_config)
+    log_file_path = os.path.join(PARENT_DIR, LOG_DIR, f'{log_name}_{DATETIME}.log')
+
+    with open(log_config_path, 'r') as f:
+        config = json.load(f)
+
+    # Update the file handler's filename
+    for handler in config['handlers'].values():
+        if handler['class'] == 'logging.FileHandler':
+            handler['filename'] = log_file_path
+
+    logging.config.dictConfig(config)
+    return
+
+def group_sets(df: pd.DataFrame, key: str, value: str) -> dict:
+    # {key: set of values}, a loop over the two columns is much faster than groupby().agg(set) on many small groups
+    groups = {}
+    for k, v in zip(df[key].tolist(), df[value].tolist()):
+        groups.setdefault(k, set()).add(v)
+    return groups
+
+class ContractGraph:
+    """
+        Contract relations of one fabric: EPGs and external EPGs (l3extInstP) consume and provide contracts (fvRsCons, fvRsProv),
+        so does the vzAny of a VRF (vzRtAnyToCons, vzRtAnyToProv) for every EPG of the VRF (fvRsBd, fvRtCtx).
+        A contract has subjects with filters (vzRsSubjFiltAtt).
+        Only the relations are kept, as sets per EPG and per contract, the EPG pairs are found per query
+        instead of materializing the consumer x provider product of each contract.
+        The VRF of an external EPG is not collected, so the vzAny of its VRF is not applied to it.
+    """
+    def __init__(self, frames: dict):
+        # fvRsCons, fvRsProv ========================================
+        # uni/tn-t1/ap-app/epg-web/rscons-c1, uni/tn-t1/out-o1/instP-ext/rsprov-c1 -> EPG, contract
+        relations = []
+        for key, role in (('fvRsCons', 'consumer'), ('fvRsProv', 'provider'), ('vzRtAnyToCons', 'consumer'), ('vzRtAnyToProv', 'provider')):
+            df = frames[key][REQUIRED_TABLES[key]]
+            if key.startswith('fvRs'):
+                # dn > epg, tDn > contract
+                df = pd.DataFrame({'epg': pyapicdn.parse_dn(df['dn'], ['parent'])['parent'], 'contract': df['tDn']})
+            else:
+                # uni/tn-t1/brc-c1/rtanyToCons-[uni/tn-t1/ctx-v1/any] > contract, tDn > vzAny
+                df = pd.DataFrame({'epg': df['tDn'], 'contract': pyapicdn.parse_dn(df['dn'], ['contract_dn'])['contract_dn']})
+            df['role'] = role
+            relations.append(df)
+        self.relations = pd.concat(relations, ignore_index=True).dropna().drop_duplicates()
+        consumer = self.relations[self.relations['role'] == 'consumer']
+        provider = self.relations[self.relations['role'] == 'provider']
+        self.consumes = group_sets(consumer, 'epg', 'contract')
+        self.provides = group_sets(provider, 'epg', 'contract')
+        self.consumers = group_sets(consumer, 'contract', 'epg')
+        self.providers = group_sets(provider, 'contract', 'epg')
+
+        # vzAny members ========================================
+        # EPG -> BD (fvRsBd), BD -> VRF (fvRtCtx uni/tn-t1/ctx-v1/rtctx-[uni/tn-t1/BD-b1]), vzAny = <VRF>/any
+        df_fvRsBd = frames['fvRsBd'][REQUIRED_TABLES['fvRsBd']]
+        df_fvRsBd = pd.DataFrame({'epg': pyapicdn.parse_dn(df_fvRsBd['dn'], ['parent'])['parent'], 'bd': df_fvRsBd['tDn']})
+        df_fvRtCtx = frames['fvRtCtx'][REQUIRED_TABLES['fvRtCtx']]
+        df_fvRtCtx = pd.DataFrame({'any': pyapicdn.parse_dn(df_fvRtCtx['dn'], ['vrf_dn'])['vrf_dn'] + '/any', 'bd': df_fvRtCtx['tDn']})
+        df_member = pd.merge(df_fvRsBd, df_fvRtCtx, on='bd', how='inner').dropna()
+        self.vzany = dict(zip(df_member['epg'], df_member['any']))
+        self.members = group_sets(df_member, 'any', 'epg')
+
+        # vzRsSubjFiltAtt ========================================
+        # uni/tn-t1/brc-c1/subj-s1/rssubjFiltAtt-f1 > contract, subject
+        df_filter = frames['vzRsSubjFiltAtt'][REQUIRED_TABLES['vzRsSubjFiltAtt']]
+        df_dn = pyapicdn.parse_dn(df_filter['dn'], ['contract_dn', 'subject'])
+        self.filters = {}  # {contract: [(subject, filter, action)]}
+        for row in zip(df_dn['contract_dn'].tolist(), df_dn['subject'].tolist(), df_filter['tnVzFilterName'].tolist(), df_filter['action'].tolist()):
+            self.filters.setdefault(row[0], []).append(row[1:])
+        logger.info(f'Contract graph: {len(self.relations)} relations, {len(self.consumers.keys() | self.providers.keys())} contracts, {len(self.vzany)} EPGs in a vzAny')
+
+    def groups(self, epg: str) -> list:
+        # the EPG and the vzAny of its VRF, which hold its contracts
+        return [epg, self.vzany[epg]] if epg in self.vzany else [epg]
+
+    def expand(self, groups: set) -> dict:
+        # {EPG: group it takes the contract from}, a vzAny stands for its EPGs
+        epgs = {}
+        for group in groups:
+            for epg in self.members.get(group, [group]) if group.endswith('/any') else [group]:
+                epgs.setdefault(epg, group)
+        return epgs
+
+    def contracts(self, consumer: str, provider: str) -> list:
+        """(contract, consumer_via, provider_via) consumer can use to reach provider, via is the EPG or the vzAny holding the relation."""
+        rows = []
+        for consumer_via in self.groups(consumer):
+            for provider_via in self.groups(provider):
+                for contract in sorted(self.consumes.get(consumer_via, set()) & self.provides.get(provider_via, set())):
+                    rows.append((contract, consumer_via, provider_via))
+        return rows
+
+    def can_talk(self, epg_a: str, epg_b: str) -> pd.DataFrame:
+        """Contracts between two EPGs in both directions, one row per subject and filter of each contract."""
+        rows = []
+        for consumer, provider in ((epg_a, epg_b), (epg_b, epg_a)):
+            for contract, consumer_via, provider_via in self.contracts(consumer, provider):
+                for subject, filter, action in self.filters.get(contract, [(None, None, None)]):
+                    rows.append((consumer, provider, contract, consumer_via, provider_via, subject, filter, action))
+        return pd.DataFrame(rows, columns=['consumer', 'provider', 'contract', 'consumer_via', 'provider_via', 'subject', 'filter', 'action'])
+
+    def who_can_reach(self, epg: str) -> pd.DataFrame:
+        """EPGs that consume a contract provided by epg: consumer, contract, consumer_via (the EPG or its vzAny), provider_via."""
+        rows = []
+        for provider_via in self.groups(epg):
+            for contract in sorted(self.provides.get(provider_via, set())):
+                for consumer, consumer_via in sorted(self.expand(self.consumers.get(contract, set())).items()):
+                    rows.append({'consumer': consumer, 'contract': contract, 'consumer_via': consumer_via, 'provider_via': provider_via})
+        return pd.DataFrame(rows, columns=['consumer', 'contract', 'consumer_via', 'provider_via'])
+
+    def reachable_from(self, epg: str) -> pd.DataFrame:
+        """EPGs that provide a contract consumed by epg: provider, contract, consumer_via, provider_via (the EPG or its vzAny)."""
+        rows = []
+        for consumer_via in self.groups(epg):
+            for contract in sorted(self.consumes.get(consumer_via, set())):
+                for provider, provider_via in sorted(self.expand(self.providers.get(contract, set())).items()):
+                    rows.append({'provider': provider, 'contract': contract, 'consumer_via': consumer_via, 'provider_via': provider_via})
+        return pd.DataFrame(rows, columns=['provider', 'contract', 'consumer_via', 'provider_via'])
+
+    def resolve(self, name: str) -> str:
+        """dn of an EPG given as its dn, or as the name of an EPG (epg-<name>) or external EPG (instP-<name>) if that is unique."""
+        known = self.consumes.keys() | self.provides.keys() | self.vzany.keys()
+        if name in known:
+            return name
+        matches = sorted(dn for dn in known if dn.endswith((f'/epg-{name}', f'/instP-{name}')))
+        if len(matches) != 1:
+            raise ValueError(f'{name} matches {len(matches)} EPGs: {matches[:5]}')
+        return matches[0]
+
+def start_script(args) -> pd.DataFrame:
+    frames = pyapicloader.load_tables(args.infile, REQUIRED_TABLES)
+    graph = ContractGraph(frames)
+    if args.src and args.dst:
+        df_result = graph.can_talk(graph.resolve(args.src), graph.resolve(args.dst))
+    elif args.reach:
+        df_result = graph.who_can_reach(graph.resolve(args.reach))
+    elif args.src:
+        df_result = graph.reachable_from(graph.resolve(args.src))
+    else:
+        logger.error(f'Nothing to query, use --src and --dst, --src or --reach')
+        return None
+    logger.info(f'###### {len(df_result)} rows')
+
+    outfile = args.outfile or os.path.join(PARENT_DIR, f'apic_contractgraph_{DATETIME}.csv')
+    if outfile.endswith('.xlsx'):
+        df_result.to_excel(outfile, sheet_name='contract_graph', index=False)
+    else:
+        df_result.to_csv(outfile, index=False)
+    logger.info(f'### close output: {outfile}')
+    return df_result
+
+def main():
+    logger.info(f'###')
+    logger.info(f'###')
+    logger.info(f'############################################################## ')
+    logger.info(f'##################       START SCRIPT       ################## ')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i", "--infile", required=True, help="output of pyapicapi.py, example: -i ciscoapic_n1_20240101_1200.xlsx")
+    parser.add_argument("--src", help="consumer EPG, dn or name. With --dst: contracts between the two EPGs, alone: the EPGs it can reach")
+    parser.add_argument("--dst", help="provider EPG, dn or name")
+    parser.add_argument("--reach", help="EPG, dn or name: the EPGs that can reach it")
+    parser.add_argument("-o", "--outfile", help="result .csv or .xlsx file, default: apic_contractgraph_<datetime>.csv")
+    args = parser.parse_args()
+
+    start_script(args)
+
+    logger.info(f'##################         END SCRIPT       ################## ')
+    logger.info(f'############################################################## ')
+
+if __name__ == "__main__":
+    setup_logging()
+    logger = logging.getLogger(__name__)
+    main()
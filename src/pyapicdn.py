@@ -0,0 +1,234 @@
+import logging
+import functools
+import numpy as np
+import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+# rn prefixes of the structured columns, e.g. topology/pod-1/node-1101/sys/phys-[eth1/10] -> pod 1, node 1101, interface eth1/10
+DN_FIELDS = {
+    'pod': ['pod'],
+    'node': ['node', 'paths', 'protpaths'],
+    'tenant': ['tn'],
+    'vrf': ['ctx'],
+    'ap': ['ap'],
+    'epg': ['epg'],
+    'bd': ['BD'],
+    'l3out': ['out'],
+    'instp': ['instP'],
+    'contract': ['brc'],
+    'subject': ['subj'],
+    'filter': ['flt'],
+    'interface': ['phys', 'pathep', 'aggr'],
+}
+RN_FIELDS = {prefix: field for field, prefixes in DN_FIELDS.items() for prefix in prefixes}
+# relation rns hold the target dn, e.g. rspathAtt-[topology/pod-1/paths-1101/pathep-[eth1/1]]
+NESTED_DN_ROOTS = ('uni/', 'topology/')
+# distinct heads and tails kept parsed, the tables of a device share them, e.g. the nodes and ports of l1PhysIf and rmonIfIn
+PARSE_CACHE_SIZE = 65536
+
+logger = logging.getLogger(__name__)
+
+def parse_rn(rn: str) -> tuple:
+    """(field, value) of an rn, e.g. phys-[eth1/10] -> (interface, eth1/10), field is None for other classes."""
+    prefix, sep, value = rn.partition('-')
+    if value[:1] == '[' and value[-1:] == ']':
+        value = value[1:-1]
+    return (RN_FIELDS.get(prefix) if sep else None), value
+
+def split_rns(dn: str) -> list:
+    """rns of a dn, bracketed values may contain '/' and nested brackets."""
+    rns, depth, start = [], 0, 0
+    for i, ch in enumerate(dn):
+        if ch == '[':
+            depth += 1
+        elif ch == ']':
+            depth -= 1
+        elif ch == '/' and depth == 0:
+            rns.append(dn[start:i])
+            start = i + 1
+    rns.append(dn[start:])
+    return rns
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_head(head: str, fields: bool = True) -> dict:
+    """
+        The part of a dn up to its first '[', e.g. topology/pod-1/node-1101/sys/phys-[
+        has the complete rns pod-1, node-1101, sys and the open rn phys- whose value is in the tail.
+    """
+    bracket = head.endswith('[')
+    rns = (head[:-1] if bracket else head).split('/')
+    parsed = {'parent': '/'.join(rns[:-1]) if len(rns) > 1 else None, 'open': parse_rn(rns[-1])[0] if bracket else None}
+    if not fields:
+        return parsed
+    end = -1
+    for rn in (rns[:-1] if bracket else rns):
+        end += len(rn) + 1
+        field, value = parse_rn(rn)
+        if field and field not in parsed:
+            parsed[field] = (value, head[:end])
+    return parsed
+
+# a tail that is not parsed, see parse_values
+EMPTY_TAIL = {'value': '', 'value_dn': '', 'parent': None}
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_tail(tail: str, fields: bool = True) -> dict:
+    """
+        The part of a dn after its first '[', e.g. eth1/10]/phys/fcot: the value of the open rn up to the matching ']',
+        then the remaining rns. The dn of a field is given as the tail up to its rn.
+    """
+    # the matching ']' is the first one with as many ']' as '[' before it, e.g. topology/pod-1/paths-1101/pathep-[eth1/1]]
+    close = tail.find(']')
+    while close >= 0 and tail.count('[', 0, close) >= tail.count(']', 0, close + 1):
+        close = tail.find(']', close + 1)
+    if close < 0:
+        close = len(tail)
+    parsed = {'value': tail[:close], 'value_dn': tail[:close + 1], 'parent': None}
+    start = close + 2
+    if tail[close + 1:start] != '/':
+        return parsed
+    rns = split_rns(tail[start:])
+    parsed['parent'] = tail[:start + len(tail[start:]) - len(rns[-1]) - 1]
+    if not fields:
+        return parsed
+    for rn in rns:
+        field, value = parse_rn(rn)
+        if field and field not in parsed:
+            parsed[field] = (value, tail[:start + len(rn)])
+        start += len(rn) + 1
+    return parsed
+
+def lookup(flags: list, codes: np.ndarray) -> np.ndarray:
+    # flag of each row from the flags of the distinct values, code -1 (no value) takes the trailing False
+    return np.array(flags + [False], dtype=bool)[codes]
+
+def take(values: list, codes: np.ndarray) -> np.ndarray:
+    # code -1 (no value) takes the trailing None
+    return np.array(values + [None], dtype=object)[codes]
+
+def split_dns(dns) -> tuple:
+    """
+        Split dns at their first '[' into the factorized heads, with the '[', and tails, code -1 without a bracket.
+        Done in pyarrow when it is installed, so no python code runs per row.
+    """
+    if pa is None:
+        split = [dn.partition('[') for dn in dns]
+        head_codes, heads = pd.factorize(np.array([head + bracket for head, bracket, _ in split], dtype=object))
+        tail_codes, tails = pd.factorize(np.array([tail if bracket else None for _, bracket, tail in split], dtype=object))
+        return head_codes, list(heads), tail_codes, list(tails)
+    dns = pa.array(dns, type=pa.large_string(), from_pandas=True)
+    if isinstance(dns, pa.ChunkedArray):
+        dns = dns.combine_chunks()  # a Series built by concat
+    parts = pc.split_pattern(dns, '[', max_splits=1)
+    bracket = pc.greater(pc.list_value_length(parts), 1)
+    heads = pc.dictionary_encode(pc.binary_join_element_wise(pc.list_element(parts, 0), pc.if_else(bracket, pa.scalar('[', pa.large_string()), pa.scalar('', pa.large_string())), pa.scalar('', pa.large_string())))
+    tail_parts = pc.list_slice(parts, 1, 2)
+    tails = pc.dictionary_encode(pc.list_flatten(tail_parts))
+    tail_codes = np.full(len(parts), -1, dtype=np.intp)
+    tail_codes[pc.list_parent_indices(tail_parts).to_numpy()] = tails.indices.to_numpy()
+    return heads.indices.to_numpy().astype(np.intp), heads.dictionary.to_pylist(), tail_codes, tails.dictionary.to_pylist()
+
+def parse_values(dns, columns: list) -> tuple:
+    """
+        Parse dns (a list or a Series without missing values) into the given columns.
+        Each dn is split once at its first '[': the heads (e.g. node, EPG) and the tails (e.g. port, path) repeat a lot,
+        so only their distinct values are tokenized. Returns the heads and, per column, (prefix, codes, values):
+        row i is heads[prefix[i]] + values[codes[i]], without a head where prefix is -1 and missing where codes is -1.
+    """
+    head_codes, heads, tail_codes, tails = split_dns(dns)
+    fields = any(col != 'parent' for col in columns)
+    head_parsed = [parse_head(head, fields) for head in heads]
+    # a tail is only needed by the parent or by rows whose head misses a field, e.g. not for the epg of .../epg-web/cep-<mac>/ip-[10.1.1.1]
+    needed = np.ones(len(tails), dtype=bool)
+    if 'parent' not in columns:
+        in_heads = [all(col.partition('_')[0] in parsed for col in columns) for parsed in head_parsed]
+        needed[:] = False
+        needed[tail_codes[~lookup(in_heads, head_codes) & (tail_codes >= 0)]] = True
+    tail_parsed = [parse_tail(tail, fields) if need else EMPTY_TAIL for tail, need in zip(tails, needed)]
+    # offsets of the values taken from the heads and tails
+    n_head, n_tail = len(heads), len(tails)
+    tail_codes_1 = tail_codes + n_head
+    tail_codes_2 = tail_codes + n_head + n_tail
+    tail_codes_3 = tail_codes + n_head + 2 * n_tail
+    has_tail = tail_codes >= 0
+    no_prefix = np.full(len(head_codes), -1, dtype=np.intp)
+
+    result = {}
+    for col in columns:
+        if col == 'parent':
+            # the head and the tail up to its last rn, else the parent of the head
+            head_parent = [parsed['parent'] for parsed in head_parsed]
+            tail_parent = [parsed['parent'] for parsed in tail_parsed]
+            is_tail = lookup([value is not None for value in tail_parent], tail_codes)
+            codes = np.where(is_tail, tail_codes_1, np.where(lookup([value is not None for value in head_parent], head_codes), head_codes, -1))
+            result[col] = (np.where(is_tail, head_codes, -1), codes, head_parent + tail_parent)
+            continue
+        field, _, suffix = col.partition('_')
+        if field not in DN_FIELDS or suffix not in ('', 'dn'):
+            raise ValueError(f'Unknown dn column: {col}')
+        i = 0 if suffix == '' else 1
+
+        # the outermost object of a class wins: rns of the head, the open rn, a dn nested in the open rn, then rns after its ']'
+        in_head = lookup([field in parsed for parsed in head_parsed], head_codes)
+        is_open = lookup([parsed['open'] == field for parsed in head_parsed], head_codes) & has_tail
+        after = [parsed[field][i] if field in parsed else None for parsed in tail_parsed]
+        in_after = lookup([value is not None for value in after], tail_codes)
+        values = [parsed[field][i] if field in parsed else None for parsed in head_parsed]
+        values += [parsed['value' if i == 0 else 'value_dn'] for parsed in tail_parsed]
+        codes = np.where(in_after, tail_codes_3, -1)
+        if i == 0:
+            nested = [parsed['value'] for parsed in tail_parsed if parsed['value'].startswith(NESTED_DN_ROOTS)]
+            inner = {}
+            if nested:
+                _, nested_codes, nested_values = parse_values(nested, [field])[1][field]
+                inner = dict(zip(nested, take(nested_values, nested_codes)))
+            inner_values = [inner.get(parsed['value']) for parsed in tail_parsed]
+            codes = np.where(lookup([value is not None for value in inner_values], tail_codes), tail_codes_2, codes)
+            values += inner_values
+        else:
+            values += [None] * n_tail
+        values += after
+        codes = np.where(is_open, tail_codes_1, codes)
+        codes = np.where(in_head, head_codes, codes)
+        # the dn of an object in the tail starts with the head
+        prefix = no_prefix if i == 0 else np.where(~in_head & (codes >= 0), head_codes, -1)
+        result[col] = (prefix, codes, values)
+    return heads, result
+
+def materialize(heads: list, prefix: np.ndarray, codes: np.ndarray, values: list):
+    """The str values of a column from parse_values, built in pyarrow when it is installed."""
+    if pa is None:
+        out = take(values, codes)
+        idx = np.flatnonzero(prefix >= 0)
+        out[idx] = take(heads, prefix[idx]) + out[idx]
+        return pd.array(out, dtype='str')
+    out = pa.array(values, type=pa.large_string()).take(pa.array(codes, mask=codes < 0))
+    if (prefix >= 0).any():
+        head = pa.array(heads, type=pa.large_string()).take(pa.array(prefix, mask=prefix < 0))
+        empty = pa.scalar('', pa.large_string())
+        out = pc.binary_join_element_wise(pc.fill_null(head, empty), out, empty)
+    return pd.array(out, dtype='str')
+
+def parse_dn(dn: pd.Series, columns: list = None) -> pd.DataFrame:
+    """
+        Structured columns of an ACI dn column:
+        - pod, node, tenant, vrf, ap, epg, bd, l3out, instp, contract, subject, filter, interface: the name of that object
+        - <field>_dn: the dn up to that object, e.g. epg_dn of uni/tn-t1/ap-app/epg-web/rsbd is uni/tn-t1/ap-app/epg-web
+        - parent: the dn without its last rn, e.g. the EPG of fvRsBd, the interface of rmonIfIn
+        Columns are str, missing objects are NaN. Defaults to the name columns.
+    """
+    columns = list(DN_FIELDS) if columns is None else columns
+    valid = dn.notna().to_numpy()
+    heads, parsed = parse_values(dn[valid], columns)
+    df = pd.DataFrame(index=dn.index)
+    for col in columns:
+        prefix, codes, values = parsed[col]
+        full_prefix = np.full(len(dn), -1, dtype=np.intp)
+        full_codes = np.full(len(dn), -1, dtype=np.intp)
+        full_prefix[valid] = prefix
+        full_codes[valid] = codes
+        df[col] = materialize(heads, full_prefix, full_codes, values)
+    return df
@@ -0,0 +1,219 @@
+import logging
+import logging.config
+import argparse, os, re, json, time
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+import pyapicloader
+import pyapicdn
+import pysubnet
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+DATETIME = datetime.now().strftime("%Y%m%d_%H%M%S")
+LOG_ENV = 'dev'
+LOG_DIR = 'log'
+CONFIG_DIR = 'config'
+
+# Tables and columns read from the pyapicapi.py output
+REQUIRED_TABLES = {
+    'fvSubnet': ['dn', 'ip'],
+    'fvRsBd': ['dn', 'tDn'],
+    'l3extSubnet': ['dn', 'ip'],
+    'fvIp': ['dn', 'addr'],
+}
+# Columns of an index entry, epg is the EPG or the external EPG (l3extInstP) of the prefix
+ENTRY_COLUMNS = ['environment', 'prefix', 'source', 'tenant', 'epg', 'bd', 'dn']
+
+logger = logging.getLogger(__name__)
+
+def setup_logging() -> None:
+    log_configs = {
+        "dev": "logging.dev.json",
+        "prod": "logging.prod.json"
+        }
+    log_name = Path(os.path.basename(__file__)).stem # filename without extension
+    log_config = log_configs.get(LOG_ENV, "logging.dev.json")
+    log_config_path = os.path.join(PARENT_DIR, CONFIG_DIR, log_config)
+    log_file_path = os.path.join(PARENT_DIR, LOG_DIR, f'{log_name}_{DATETIME}.log')
+
+    with open(log_config_path, 'r') as f:
+        config = json.load(f)
+
+    # Update the file handler's filename
+    for handler in config['handlers'].values():
+        if handler['class'] == 'logging.FileHandler':
+            handler['filename'] = log_file_path
+
+    logging.config.dictConfig(config)
+    return
+
+def get_entries(frames: dict, environment: str) -> pd.DataFrame:
+    """Prefixes of one fabric with their owner: BD and EPG subnets (fvSubnet, fvRsBd), external EPG subnets (l3extSubnet) and endpoints (fvIp)."""
+    df_fvRsBd = frames['fvRsBd'][REQUIRED_TABLES['fvRsBd']]
+    df_fvRsBd = pd.DataFrame({'epg': pyapicdn.parse_dn(df_fvRsBd['dn'], ['parent'])['parent'], 'bd': df_fvRsBd['tDn']})
+
+    # fvSubnet ========================================
+    # uni/tn-t1/BD-bd1/subnet-[10.1.0.1/24] is shared by the EPGs of the BD, uni/tn-t1/ap-app/epg-e1/subnet-[...] belongs to the EPG
+    df_fvSubnet = frames['fvSubnet'][REQUIRED_TABLES['fvSubnet']]
+    df_dn = pyapicdn.parse_dn(df_fvSubnet['dn'], ['epg_dn', 'bd_dn'])
+    df_fvSubnet = pd.DataFrame({'prefix': pysubnet.to_subnet(df_fvSubnet['ip']), 'epg': df_dn['epg_dn'], 'bd': df_dn['bd_dn'], 'dn': df_fvSubnet['dn']})
+    df_bd_subnet = pd.merge(df_fvSubnet[df_fvSubnet['epg'].isna()].drop(columns=['epg']), df_fvRsBd, on='bd', how='left')
+    df_epg_subnet = pd.merge(df_fvSubnet[df_fvSubnet['epg'].notna()].drop(columns=['bd']), df_fvRsBd, on='epg', how='left')
+    df_fvSubnet = pd.concat([df_bd_subnet, df_epg_subnet], ignore_index=True)
+    df_fvSubnet['source'] = 'fvSubnet'
+
+    # l3extSubnet ========================================
+    # uni/tn-t1/out-o1/instP-i1/extsubnet-[10.0.0.0/8]
+    df_l3extSubnet = frames['l3extSubnet'][REQUIRED_TABLES['l3extSubnet']]
+    df_l3extSubnet = pd.DataFrame({'prefix': pysubnet.to_subnet(df_l3extSubnet['ip']),
+                                   'epg': pyapicdn.parse_dn(df_l3extSubnet['dn'], ['instp_dn'])['instp_dn'], 'dn': df_l3extSubnet['dn']})
+    df_l3extSubnet['source'] = 'l3extSubnet'
+
+    # fvIp ========================================
+    # uni/tn-t1/ap-app/epg-e1/cep-00:50:56:AA:BB:CC/ip-[10.1.0.10]
+    df_fvIp = frames['fvIp'][REQUIRED_TABLES['fvIp']]
+    df_fvIp = pd.DataFrame({'prefix': pysubnet.to_subnet(df_fvIp['addr']), 'epg': pyapicdn.parse_dn(df_fvIp['dn'], ['epg_dn'])['epg_dn'], 'dn': df_fvIp['dn']})
+    # endpoints of an L3Out are under its external EPG
+    external = df_fvIp['epg'].isna()
+    df_fvIp.loc[external, 'epg'] = pyapicdn.parse_dn(df_fvIp.loc[external, 'dn'], ['instp_dn'])['instp_dn']
+    df_fvIp = pd.merge(df_fvIp, df_fvRsBd, on='epg', how='left')
+    df_fvIp['source'] = 'fvIp'
+
+    df_entries = pd.concat([df_fvSubnet, df_l3extSubnet, df_fvIp], ignore_index=True)
+    df_entries = df_entries[df_entries['prefix'] != '']
+    df_entries['environment'] = environment
+    df_entries['tenant'] = pyapicdn.parse_dn(df_entries['dn'], ['tenant'])['tenant']
+    return df_entries[ENTRY_COLUMNS]
+
+class IpEpgIndex:
+    """
+        Longest prefix match of addresses to the entries of get_entries, over one or more fabrics.
+        Per address family and prefix length the entries are kept as a sorted array of network keys (network >> host bits),
+        a batch lookup searches all the addresses in each array with numpy, from the longest prefix length.
+        A prefix found in several fabrics or owners (e.g. a BD subnet shared by its EPGs) matches all of them.
+    """
+    def __init__(self):
+        self.entries = pd.DataFrame(columns=ENTRY_COLUMNS)
+        self.tables = {4: [], 6: []}  # version: [(prefixlen, sorted keys, start of each key in rows, entry rows)], longest first
+
+    def add_entries(self, df_entries: pd.DataFrame) -> None:
+        df_entries = df_entries[ENTRY_COLUMNS]
+        self.entries = pd.concat([self.entries, df_entries], ignore_index=True) if len(self.entries) else df_entries.reset_index(drop=True)
+        version, network, prefix = pysubnet.to_network(self.entries['prefix'])
+        for v, bits in ((4, 32), (6, 128)):
+            tables = []
+            for length in sorted(set(prefix[version == v]), reverse=True):
+                rows = np.flatnonzero((version == v) & (prefix == length))
+                keys = network[rows] >> (bits - length)
+                keys = keys.astype(np.int64) if v == 4 else keys
+                order = np.argsort(keys, kind='stable')
+                keys, starts = np.unique(keys[order], return_index=True)
+                tables.append((length, keys, np.append(starts, len(rows)), rows[order]))
+            self.tables[v] = tables
+        logger.info(f'Index {len(df_entries)} prefixes, {len(self.entries)} in total')
+
+    def add_frames(self, frames: dict, environment: str) -> None:
+        self.add_entries(get_entries(frames, environment))
+
+    def match(self, ips: pd.Series) -> tuple:
+        """Positions in ips and entry rows of the longest prefix containing each address, in the order of the entries."""
+        version, address, prefix = pysubnet.to_network(ips)
+        positions, rows = [], []
+        for v, bits in ((4, 32), (6, 128)):
+            pending = np.flatnonzero((version == v) & (prefix == bits))  # a prefix is not an address
+            values = address[pending].astype(np.int64) if v == 4 else address[pending]
+            for length, keys, starts, entry_rows in self.tables[v]:
+                if not len(pending):
+                    break
+                query = values >> (bits - length)
+                i = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+                hit = keys[i] == query
+                # each hit takes the entry rows of its key, starts[i] to starts[i + 1]
+                first, counts = starts[i[hit]], starts[i[hit] + 1] - starts[i[hit]]
+                offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                positions.append(np.repeat(pending[hit], counts))
+                rows.append(entry_rows[np.repeat(first, counts) + offsets])
+                pending, values = pending[~hit], values[~hit]
+        if not positions:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        positions, rows = np.concatenate(positions), np.concatenate(rows)
+        order = np.argsort(positions, kind='stable')
+        return positions[order], rows[order]
+
+    def lookup(self, ips: Iterable[str]) -> pd.DataFrame:
+        """One row per address and matching entry in the order of ips, the entry columns are NaN if nothing matches."""
+        ips = pd.Series(list(ips), dtype='str')
+        positions, rows = self.match(ips)
+        # addresses without a match keep one row with entry row -1
+        missing = np.setdiff1d(np.arange(len(ips)), positions)
+        order = np.argsort(np.concatenate([positions, missing]), kind='stable')
+        positions = np.concatenate([positions, missing])[order]
+        rows = np.concatenate([rows, np.full(len(missing), -1)])[order]
+        df = self.entries.reindex(rows).reset_index(drop=True)
+        df.insert(0, 'ip', ips.iloc[positions].to_numpy())
+        return df
+
+def get_environment(file: str) -> str:
+    # ciscoapic_n1_20240101_1200.xlsx -> n1
+    match = re.match(r'ciscoapic_([^_]+)_\d{8}_\d{4}(\.xlsx)?$', os.path.basename(file))
+    return match.group(1) if match else Path(file).stem
+
+def build_index(infiles: list) -> IpEpgIndex:
+    index = IpEpgIndex()
+    for file in infiles:
+        logger.info(f'###### Index {file}')
+        index.add_frames(pyapicloader.load_tables(file, REQUIRED_TABLES), get_environment(file))
+    return index
+
+def read_ips(file: str) -> list:
+    # one address per line, or the first column of a csv, lines starting with # are skipped
+    ips = []
+    with open(file, 'r') as f:
+        for line in f:
+            ip = line.split(',')[0].strip()
+            if ip and not ip.startswith('#'):
+                ips.append(ip)
+    return ips
+
+def start_script(args) -> pd.DataFrame:
+    infilelist = args.infiles.split(',')
+    ips = read_ips(args.query) if args.query else []
+    ips += args.ip.split(',') if args.ip else []
+
+    index = build_index(infilelist)
+    start = time.perf_counter()
+    df_result = index.lookup(ips)
+    elapsed = time.perf_counter() - start
+    logger.info(f'###### Lookup {len(ips)} addresses in {elapsed:.3f}s ({elapsed / max(len(ips), 1) * 1e6:.1f}us per address)')
+
+    outfile = args.outfile or os.path.join(PARENT_DIR, f'apic_iplookup_{DATETIME}.csv')
+    if outfile.endswith('.xlsx'):
+        df_result.to_excel(outfile, sheet_name='ip_lookup', index=False)
+    else:
+        df_result.to_csv(outfile, index=False)
+    logger.info(f'### close output: {outfile}')
+    return df_result
+
+def main():
+    logger.info(f'###')
+    logger.info(f'###')
+    logger.info(f'############################################################## ')
+    logger.info(f'##################       START SCRIPT       ################## ')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i", "--infiles", required=True, help="outputs of pyapicapi.py, comma separated, example: -i ciscoapic_n1_20240101_1200.xlsx,ciscoapic_n2_20240101_1200")
+    parser.add_argument("-q", "--query", help="file of addresses to look up, one per line or the first csv column, example: -q ips.txt")
+    parser.add_argument("--ip", help="addresses to look up, comma separated, example: --ip 10.1.1.1,2001:db8::1")
+    parser.add_argument("-o", "--outfile", help="result .csv or .xlsx file, default: apic_iplookup_<datetime>.csv")
+    args = parser.parse_args()
+
+    start_script(args)
+
+    logger.info(f'##################         END SCRIPT       ################## ')
+    logger.info(f'############################################################## ')
+
+if __name__ == "__main__":
+    setup_logging()
+    logger = logging.getLogger(__name__)
+    main()
@@ -0,0 +1,125 @@
+import logging
+import os, json, threading
+import pandas as pd
+from collections import OrderedDict
+TABLES_FILE = '_tables.json'
+# columnar outputs of pyapicapi.py: a folder with one file per class, e.g. ciscoapic_n1_20251009_1200/fvCEp.parquet
+COLUMNAR_READERS = {
+    '.parquet': pd.read_parquet,
+    '.feather': pd.read_feather,
+}
+# frames of the most recently loaded outputs, shared by the analyses of the same output
+CACHE_MAX_FILES = 4
+CACHE = OrderedDict()
+CACHE_LOCK = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+def is_columnar(file: str) -> bool:
+    return os.path.isdir(file)
+
+def list_tables(file: str) -> list:
+    """Table keys of an output, in the order they were written."""
+    if not is_columnar(file):
+        return pd.ExcelFile(file).sheet_names
+    try:
+        with open(os.path.join(file, TABLES_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return sorted({os.path.splitext(f)[0] for f in os.listdir(file) if os.path.splitext(f)[1] in COLUMNAR_READERS})
+
+def read_table(file: str, key: str, columns: list = None) -> pd.DataFrame:
+    """Read one table of an xlsx or columnar output, columnar outputs only load the given columns."""
+    if not is_columnar(file):
+        return pd.read_excel(file, sheet_name=key, usecols=get_usecols(columns))
+    for ext, reader in COLUMNAR_READERS.items():
+        path = os.path.join(file, f'{key}{ext}')
+        if os.path.isfile(path):
+            if columns is not None:
+                # a missing column is left out like get_usecols does for the xlsx, the readers raise on it
+                names = get_columnar_names(path)
+                columns = [col for col in columns if col in names]
+            return restore_excel_types(reader(path, columns=columns))
+    raise FileNotFoundError(f'Table {key} not found in {file}')
+
+def get_columnar_names(path: str) -> set:
+    # column names from the file schema, the data is not read
+    import pyarrow.parquet, pyarrow.ipc
+    if path.endswith('.parquet'):
+        return set(pyarrow.parquet.read_schema(path).names)
+    with pyarrow.ipc.open_file(path) as reader:
+        return set(reader.schema.names)
+
+def restore_excel_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+        Give the text columns of a table the dtypes pd.read_excel gives them when read back from the xlsx output:
+        empty text becomes NaN and a column of numeric text becomes numbers, e.g. the rmonIfIn counters compared with 0.
+        Used for the columnar reads and the tables handed to the analysis in memory, so the results do not depend on the input.
+    """
+    for col in df.columns:
+        values = df[col]
+        if not (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+            continue
+        if pd.api.types.is_object_dtype(values):
+            # nested values are text in the xlsx
+            values = values.map(lambda v: str(v) if isinstance(v, (dict, list)) else v)
+        values = values.where(values != '')
+        try:
+            values = pd.to_numeric(values)
+        except (ValueError, TypeError):
+            pass
+        df[col] = values
+    return df
+
+def get_usecols(columns: list):
+    # a missing column is left out instead of failing the read, like selecting columns of the full sheet
+    return None if columns is None else (lambda col: col in columns)
+
+def get_cache_key(file: str) -> tuple:
+    path = os.path.abspath(file)
+    return (path, os.path.getmtime(path))
+
+def load_tables(file: str, tables: dict) -> dict:
+    """
+        Read the {key: columns} tables of an output, the xlsx workbook is opened once for all of them.
+        Frames are cached, so other analyses of the same output only read what is not loaded yet.
+    """
+    cache_key = get_cache_key(file)
+    with CACHE_LOCK:
+        if cache_key not in CACHE:
+            # frames and the columns requested for each table, filled under the lock of the output
+            CACHE[cache_key] = (threading.Lock(), {}, {})
+        CACHE.move_to_end(cache_key)
+        file_lock, frames, requested = CACHE[cache_key]
+        while len(CACHE) > CACHE_MAX_FILES:
+            CACHE.popitem(last=False)
+
+    # analyses of the same output running in threads wait for each other, so a table is read once
+    with file_lock:
+        missing = {}
+        for key, columns in tables.items():
+            # a column missing from the output is not read again
+            loaded = requested.get(key, [])
+            if key not in frames or any(col not in loaded for col in columns):
+                missing[key] = loaded + [col for col in columns if col not in loaded]
+        if missing:
+            logger.info(f'Loading {len(missing)} tables from {file}')
+            if is_columnar(file):
+                for key, columns in missing.items():
+                    frames[key] = read_table(file, key, columns)
+                    requested[key] = columns
+            else:
+                with pd.ExcelFile(file) as xlsx:
+                    for key, columns in missing.items():
+                        frames[key] = xlsx.parse(sheet_name=key, usecols=get_usecols(columns))
+                        requested[key] = columns
+        return {key: frames[key] for key in tables}
+
+def clear_cache(file: str = None) -> None:
+    with CACHE_LOCK:
+        if file is None:
+            CACHE.clear()
+            return
+        path = os.path.abspath(file)
+        for cache_key in [k for k in CACHE if k[0] == path]:
+            del CACHE[cache_key]
@@ -0,0 +1,268 @@
+import logging
+import logging.config
+import argparse, os, json, time
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+import pyapicloader
+import pyapicdn
+import pysubnet
+import pyapiciplookup
+import pyapiccontractgraph
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+DATETIME = datetime.now().strftime("%Y%m%d_%H%M%S")
+LOG_ENV = 'dev'
+LOG_DIR = 'log'
+CONFIG_DIR = 'config'
+
+# Tables and columns read from the pyapicapi.py output, with the tables of the IP index and of the contract graph
+REQUIRED_TABLES = {
+    **pyapiciplookup.REQUIRED_TABLES,
+    **pyapiccontractgraph.REQUIRED_TABLES,
+    'vzEntry': ['dn', 'name', 'etherT', 'prot', 'dFromPort', 'dToPort', 'sFromPort', 'sToPort'],
+}
+# vzEntry prot and port names, other values are numbers
+PROTOCOLS = {'icmp': 1, 'igmp': 2, 'tcp': 6, 'egp': 8, 'igp': 9, 'udp': 17, 'icmpv6': 58, 'eigrp': 88, 'ospfigp': 89, 'pim': 103, 'l2tp': 115}
+PORTS = {'ftpData': 20, 'ssh': 22, 'smtp': 25, 'dns': 53, 'http': 80, 'pop3': 110, 'https': 443, 'rtsp': 554}
+# vzEntry etherT of IP traffic: 0 any, 4 IPv4, 6 IPv6, other ether types (arp, fcoe, mpls_ucast, ...) never match a flow
+ETHER_TYPES = {'unspecified': 0, 'ip': 0, 'ipv4': 4, 'ipv6': 6}
+UNSPECIFIED = -1
+FLOW_COLUMNS = ['src_ip', 'dst_ip', 'protocol', 'src_port', 'dst_port']
+RESULT_COLUMNS = FLOW_COLUMNS + ['src_epg', 'dst_epg', 'verdict', 'reason', 'contract', 'subject', 'filter', 'entry']
+
+logger = logging.getLogger(__name__)
+
+def setup_logging() -> None:
+    log_configs = {
+        "dev": "logging.dev.json",
+        "prod": "logging.prod.json"
+        }
+    log_name = Path(os.path.basename(__file__)).stem # filename without extension
+    log_config = log_configs.get(LOG_ENV, "logging.dev.json")
+    log_config_path = os.path.join(PARENT_DIR, CONFIG_DIR, log_config)
+    log_file_path = os.path.join(PARENT_DIR, LOG_DIR, f'{log_name}_{DATETIME}.log')
+
+    with open(log_config_path, 'r') as f:
+        config = json.load(f)
+
+    # Update the file handler's filename
+    for handler in config['handlers'].values():
+        if handler['class'] == 'logging.FileHandler':
+            handler['filename'] = log_file_path
+
+    logging.config.dictConfig(config)
+    return
+
+def to_number(values, names: dict, default: int = UNSPECIFIED) -> np.ndarray:
+    """int array of protocol or port values given as names or numbers (xlsx cells may be either), unspecified and blank give default."""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    numbers = np.full(len(uniques) + 1, default, dtype=np.int32)
+    for i, value in enumerate(uniques):
+        value = str(value).strip()
+        if value in names:
+            numbers[i] = names[value]
+        elif value.lower() in names:
+            numbers[i] = names[value.lower()]
+        else:
+            try:
+                numbers[i] = int(float(value))
+            except ValueError:
+                pass
+    # code -1 (null) takes the trailing default
+    return numbers[codes]
+
+def set_port_range(df: pd.DataFrame, start: str, end: str) -> None:
+    # a range with one unspecified end is the other end, both unspecified is any port
+    df[start] = df[start].where(df[start] != UNSPECIFIED, df[end])
+    df[end] = df[end].where(df[end] != UNSPECIFIED, df[start])
+    any_port = df[start] == UNSPECIFIED
+    df.loc[any_port, start], df.loc[any_port, end] = 0, 65535
+
+class FilterEntries:
+    """
+        vzEntry of each filter as arrays of intervals: ether type, protocol, destination and source port range, in filter order.
+        The entries of filter code f are rows starts[f] to starts[f + 1].
+    """
+    def __init__(self, df_vzEntry: pd.DataFrame):
+        if not {'sFromPort', 'sToPort'} <= set(df_vzEntry.columns):
+            logger.warning(f'vzEntry has no sFromPort/sToPort, source ports are not evaluated, keep them in the table config')
+        df_vzEntry = df_vzEntry.reindex(columns=REQUIRED_TABLES['vzEntry'])
+        df_dn = pyapicdn.parse_dn(df_vzEntry['dn'], ['filter_dn'])
+        df = pd.DataFrame({'filter_dn': df_dn['filter_dn'], 'name': df_vzEntry['name'],
+                           'ether': pd.Series(df_vzEntry['etherT'], dtype=object).map(lambda v: ETHER_TYPES.get(v, UNSPECIFIED)).to_numpy(),
+                           'protocol': to_number(df_vzEntry['prot'], PROTOCOLS),
+                           'port_from': to_number(df_vzEntry['dFromPort'], PORTS),
+                           'port_to': to_number(df_vzEntry['dToPort'], PORTS),
+                           'src_port_from': to_number(df_vzEntry['sFromPort'], PORTS),
+                           'src_port_to': to_number(df_vzEntry['sToPort'], PORTS)})
+        df = df.dropna(subset=['filter_dn']).sort_values('filter_dn', kind='stable').reset_index(drop=True)
+        set_port_range(df, 'port_from', 'port_to')
+        set_port_range(df, 'src_port_from', 'src_port_to')
+        self.entries = df
+        codes, self.filters = pd.factorize(df['filter_dn'])
+        self.codes = {dn: code for code, dn in enumerate(self.filters)}
+        self.starts = np.searchsorted(codes, np.arange(len(self.filters) + 1))
+        self.ether = df['ether'].to_numpy(dtype=np.int8)
+        self.protocol = df['protocol'].to_numpy(dtype=np.int32)
+        self.port_from = df['port_from'].to_numpy(dtype=np.int32)
+        self.port_to = df['port_to'].to_numpy(dtype=np.int32)
+        self.src_port_from = df['src_port_from'].to_numpy(dtype=np.int32)
+        self.src_port_to = df['src_port_to'].to_numpy(dtype=np.int32)
+
+    def code(self, tenant: str, name: str) -> int:
+        # a filter name resolves in the tenant of the contract, then in tenant common, -1 if not found
+        for dn in (f'uni/tn-{tenant}/flt-{name}', f'uni/tn-common/flt-{name}'):
+            if dn in self.codes:
+                return self.codes[dn]
+        return -1
+
+    def match(self, filters: np.ndarray, version: np.ndarray, protocol: np.ndarray, port: np.ndarray, src_port: np.ndarray) -> tuple:
+        """
+            (position, entry row) of the entries of filters[i] matching flow i, for arrays of filter codes and flow attributes.
+            A flow without a source port (-1) only matches entries of any source port.
+        """
+        filters = np.asarray(filters)
+        counts = np.where(filters >= 0, self.starts[filters + 1] - self.starts[np.maximum(filters, 0)], 0)
+        position = np.repeat(np.arange(len(filters)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.repeat(self.starts[np.maximum(filters, 0)], counts) + offsets
+        ether, entry_protocol = self.ether[rows], self.protocol[rows]
+        # ports are only compared for entries of tcp and udp
+        has_port = (entry_protocol == PROTOCOLS['tcp']) | (entry_protocol == PROTOCOLS['udp'])
+        flow_port, flow_src_port = port[position], src_port[position]
+        src_from, src_to = self.src_port_from[rows], self.src_port_to[rows]
+        src_ok = ((src_from <= flow_src_port) & (flow_src_port <= src_to)) | ((flow_src_port == UNSPECIFIED) & (src_from == 0) & (src_to == 65535))
+        hit = (((ether == 0) | (ether == version[position]))
+               & ((entry_protocol == UNSPECIFIED) | (entry_protocol == protocol[position]))
+               & (~has_port | ((self.port_from[rows] <= flow_port) & (flow_port <= self.port_to[rows]) & src_ok)))
+        return position[hit], rows[hit]
+
+class PolicyEvaluator:
+    """
+        Verdict of flows between addresses of one fabric: the addresses are mapped to EPGs with pyapiciplookup.IpEpgIndex,
+        the contracts the source EPG consumes and the destination EPG provides (pyapiccontractgraph.ContractGraph, with vzAny)
+        give the filters of their subjects, and the flow is compared with the vzEntry intervals of the filters.
+        A deny entry wins over a permit entry, traffic inside an EPG is permitted, anything else is denied.
+        The rules of an EPG pair are resolved once per batch, all flows are compared with their entries in one numpy pass.
+    """
+    def __init__(self, frames: dict):
+        self.index = pyapiciplookup.IpEpgIndex()
+        self.index.add_frames(frames, '')
+        self.graph = pyapiccontractgraph.ContractGraph(frames)
+        self.entries = FilterEntries(frames['vzEntry'])
+        self.rule_cache = {}
+        logger.info(f'Policy: {len(self.entries.entries)} filter entries in {len(self.entries.filters)} filters')
+
+    def rules(self, src_epg: str, dst_epg: str) -> list:
+        """(contract, subject, filter, filter code, permit) of the contracts from src_epg to dst_epg."""
+        key = (src_epg, dst_epg)
+        if key not in self.rule_cache:
+            rules = []
+            for contract, _, _ in self.graph.contracts(src_epg, dst_epg):
+                tenant = pyapicdn.parse_head(contract).get('tenant', ('common',))[0]
+                for subject, filter, action in self.graph.filters.get(contract, []):
+                    rules.append((contract, subject, filter, self.entries.code(tenant, filter), action != 'deny'))
+            self.rule_cache[key] = rules
+        return self.rule_cache[key]
+
+    def get_epgs(self, ips: pd.Series) -> tuple:
+        # (flow position, EPG) of each EPG an address belongs to, NaN for addresses without one
+        positions, rows = self.index.match(ips)
+        epgs = self.index.entries['epg'].to_numpy(dtype=object)[rows]
+        missing = np.setdiff1d(np.arange(len(ips)), positions)
+        return np.concatenate([positions, missing]), np.concatenate([epgs, np.full(len(missing), np.nan, dtype=object)])
+
+    def evaluate(self, df_flows: pd.DataFrame) -> pd.DataFrame:
+        """One row per flow and pair of source and destination EPG, with the verdict and the contract, subject, filter and entry deciding it."""
+        df_flows = df_flows.reindex(columns=FLOW_COLUMNS).reset_index(drop=True)
+        src_ip, dst_ip = df_flows['src_ip'].astype('str'), df_flows['dst_ip'].astype('str')
+        version = pysubnet.to_network(dst_ip)[0]
+        protocol = to_number(df_flows['protocol'], PROTOCOLS)
+        port = to_number(df_flows['dst_port'], PORTS)
+        src_port = to_number(df_flows['src_port'], PORTS)
+
+        # flow x source EPG x destination EPG
+        src_pos, src_epg = self.get_epgs(src_ip)
+        dst_pos, dst_epg = self.get_epgs(dst_ip)
+        df = pd.merge(pd.DataFrame({'flow': src_pos, 'src_epg': src_epg}), pd.DataFrame({'flow': dst_pos, 'dst_epg': dst_epg}), on='flow')
+        df = df.sort_values('flow', kind='stable').reset_index(drop=True)
+        flow = df['flow'].to_numpy()
+
+        # rules of each distinct EPG pair, repeated for each flow of the pair
+        pair_codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([df['src_epg'], df['dst_epg']]))
+        pair_rules = [self.rules(s, d) if isinstance(s, str) and isinstance(d, str) else [] for s, d in pairs]
+        counts = np.array([len(rules) for rules in pair_rules] + [0], dtype=np.int64)
+        starts = np.append(0, np.cumsum(counts))
+        rules = [rule for rules in pair_rules for rule in rules]
+        rule_filter = np.array([rule[3] for rule in rules] + [-1], dtype=np.int64)
+        rule_permit = np.array([rule[4] for rule in rules] + [False], dtype=bool)
+        n = counts[pair_codes]
+        row = np.repeat(np.arange(len(df)), n)
+        rule = np.repeat(starts[pair_codes], n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+
+        position, entry = self.entries.match(rule_filter[rule], version[flow[row]], protocol[flow[row]], port[flow[row]], src_port[flow[row]])
+        # decision of each row: the first deny entry, else the first permit entry
+        matched_row, matched_rule = row[position], rule[position]
+        order = np.lexsort((np.arange(len(matched_row)), rule_permit[matched_rule], matched_row))
+        matched_row, matched_rule, entry = matched_row[order], matched_rule[order], entry[order]
+        first = np.flatnonzero(np.r_[True, matched_row[1:] != matched_row[:-1]]) if len(matched_row) else np.zeros(0, dtype=np.int64)
+        decided_row, decided_rule, decided_entry = matched_row[first], matched_rule[first], entry[first]
+
+        result = df_flows.iloc[flow].reset_index(drop=True)
+        result['src_epg'], result['dst_epg'] = df['src_epg'].to_numpy(), df['dst_epg'].to_numpy()
+        verdict = np.full(len(df), 'deny', dtype=object)
+        reason = np.where(df['src_epg'].isna() | df['dst_epg'].isna(), 'no_epg', 'implicit_deny').astype(object)
+        intra = (df['src_epg'] == df['dst_epg']).to_numpy()
+        verdict[intra], reason[intra] = 'permit', 'intra_epg'
+        verdict[decided_row] = np.where(rule_permit[decided_rule], 'permit', 'deny')
+        reason[decided_row] = 'contract'
+        result['verdict'], result['reason'] = verdict, reason
+        for i, col in enumerate(['contract', 'subject', 'filter']):
+            values = np.full(len(df), np.nan, dtype=object)
+            values[decided_row] = [rules[r][i] for r in decided_rule]
+            result[col] = values
+        values = np.full(len(df), np.nan, dtype=object)
+        values[decided_row] = self.entries.entries['name'].to_numpy(dtype=object)[decided_entry]
+        result['entry'] = values
+        return result[RESULT_COLUMNS]
+
+def start_script(args) -> pd.DataFrame:
+    frames = pyapicloader.load_tables(args.infile, REQUIRED_TABLES)
+    evaluator = PolicyEvaluator(frames)
+    df_flows = pd.read_csv(args.query, dtype=str)
+    start = time.perf_counter()
+    df_result = evaluator.evaluate(df_flows)
+    elapsed = time.perf_counter() - start
+    logger.info(f'###### Evaluate {len(df_flows)} flows in {elapsed:.3f}s ({len(df_flows) / max(elapsed, 1e-9) * 60:.0f} flows per minute)')
+    logger.info(f'###### {df_result["verdict"].value_counts().to_dict()}')
+
+    outfile = args.outfile or os.path.join(PARENT_DIR, f'apic_policy_{DATETIME}.csv')
+    if outfile.endswith('.xlsx'):
+        df_result.to_excel(outfile, sheet_name='policy', index=False)
+    else:
+        df_result.to_csv(outfile, index=False)
+    logger.info(f'### close output: {outfile}')
+    return df_result
+
+def main():
+    logger.info(f'###')
+    logger.info(f'###')
+    logger.info(f'############################################################## ')
+    logger.info(f'##################       START SCRIPT       ################## ')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-i", "--infile", required=True, help="output of pyapicapi.py, example: -i ciscoapic_n1_20240101_1200.xlsx")
+    parser.add_argument("-q", "--query", required=True, help="csv of flows with columns src_ip,dst_ip,protocol,src_port,dst_port, example: -q flows.csv")
+    parser.add_argument("-o", "--outfile", help="result .csv or .xlsx file, default: apic_policy_<datetime>.csv")
+    args = parser.parse_args()
+
+    start_script(args)
+
+    logger.info(f'##################         END SCRIPT       ################## ')
+    logger.info(f'############################################################## ')
+
+if __name__ == "__main__":
+    setup_logging()
+    logger = logging.getLogger(__name__)
+    main()
@@ -0,0 +1,185 @@
+import logging
+import re, json, time, codecs
+import pandas as pd
+from typing import Iterable, Iterator, Union
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+CHUNK_SIZE = 1 << 20
+BATCH_ROWS = 65536
+# dtype pandas gives a column of strings, arrow backed from pandas 3 on
+STRING_DTYPE = pd.Series(['']).dtype
+ARROW_STRINGS = pa is not None and getattr(STRING_DTYPE, 'storage', None) == 'pyarrow'
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+logger = logging.getLogger(__name__)
+
+class ImdataStream:
+    """
+        APIC class query response read as it arrives: {"totalCount": "2", "imdata": [{"<key>": {"attributes": {...}}}, ...]}
+        The objects of imdata are decoded one at a time from the byte chunks of the response, so neither the whole body
+        nor its decoded tree is held in memory. total (None without a totalCount) and count are set once the objects
+        are read, bytes and read_seconds count the (decompressed) body and the time spent waiting for it.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], key: str):
+        self.chunks = iter(chunks)
+        self.key = key
+        self.total = None
+        self.count = 0
+        self.bytes = 0
+        self.read_seconds = 0.0
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+
+    def _more(self) -> bool:
+        # drop what is parsed and append the next chunk
+        start = time.perf_counter()
+        chunk = next(self.chunks, None)
+        self.read_seconds += time.perf_counter() - start
+        if chunk is None:
+            return False
+        self.bytes += len(chunk)
+        self.buf = self.buf[self.pos:] + self.text.decode(chunk)
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        # next character that is not whitespace
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                raise ValueError(f'Truncated response for {self.key}')
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f'Invalid response for {self.key}: expected {char!r} at {self.buf[self.pos:self.pos + 40]!r}')
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # the value goes on in the next chunk
+                if not self._more():
+                    raise
+                continue
+            # a number at the end of the buffer may go on in the next chunk too
+            if end == len(self.buf) and isinstance(value, (int, float)) and self._more():
+                continue
+            self.pos = end
+            return value
+
+    def __iter__(self) -> Iterator[dict]:
+        """Attributes of each object of imdata."""
+        self._expect('{')
+        while True:
+            char = self._peek()
+            if char == '}':
+                self.pos += 1
+                return
+            if char == ',':
+                self.pos += 1
+                continue
+            name = self._value()
+            self._expect(':')
+            if name != 'imdata':
+                # totalCount comes before or after imdata
+                value = self._value()
+                if name == 'totalCount':
+                    self.total = int(value)
+                continue
+            self._expect('[')
+            while True:
+                char = self._peek()
+                if char == ']':
+                    self.pos += 1
+                    break
+                if char == ',':
+                    self.pos += 1
+                    continue
+                data = self._value()
+                self.count += 1
+                yield data[self.key]['attributes']
+
+def iter_attributes(page: Union[dict, ImdataStream], key: str) -> Iterator[dict]:
+    """Attributes of each object of a decoded response page or of a stream."""
+    if isinstance(page, ImdataStream):
+        return iter(page)
+    return (data[key]['attributes'] for data in page['imdata'])
+
+class ColumnBuffers:
+    """
+        One list per column, filled one object at a time with the keep or drop properties applied as the objects arrive.
+        Columns are in the order they first appear and missing values are None: for string columns (APIC attributes are
+        all strings) the frame is the one of pd.DataFrame(list of dicts), which would give NaN in other object columns.
+        With arrow backed strings (pandas 3), every BATCH_ROWS rows the lists of string columns are moved to arrow chunks,
+        which become the columns of the frame without a copy, so the Python strings of one batch at most are alive.
+    """
+
+    def __init__(self, keep: set = None, drop: set = None):
+        self.keep = keep
+        self.drop = drop
+        self.columns = {}  # values of the current batch
+        self.chunks = {}  # arrow arrays of the previous batches, string columns
+        self.lists = {}  # values of the previous batches, columns with values that are not strings
+        self.rows = 0
+        self.flushed = 0
+
+    def append(self, attributes: dict) -> None:
+        columns, keep, drop = self.columns, self.keep, self.drop
+        added = 0
+        for k, v in attributes.items():
+            if (keep is not None and k not in keep) or (keep is None and drop is not None and k in drop):
+                continue
+            column = columns.get(k)
+            if column is None:
+                column = columns[k] = [None] * self.rows
+                if self.flushed:
+                    self.chunks[k] = [pa.nulls(self.flushed, pa.large_string())]
+            column.append(v)
+            added += 1
+        self.rows += 1
+        if added != len(columns):
+            for column in columns.values():
+                if len(column) < self.rows:
+                    column.append(None)
+        if self.rows == BATCH_ROWS and ARROW_STRINGS:
+            self.flush()
+
+    def flush(self) -> None:
+        for k, values in self.columns.items():
+            if k not in self.lists:
+                try:
+                    self.chunks.setdefault(k, []).append(pa.array(values, type=pa.large_string()))
+                    self.columns[k] = []
+                    continue
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    self.lists[k] = [v for chunk in self.chunks.pop(k) for v in chunk.to_pylist()]
+            self.lists[k].extend(values)
+            self.columns[k] = []
+        self.flushed += self.rows
+        self.rows = 0
+
+    def to_frame(self) -> pd.DataFrame:
+        """Build the DataFrame, the buffers of each column are released as soon as the column is built."""
+        if ARROW_STRINGS:
+            self.flush()
+        data = {}
+        for k in list(self.columns):
+            values = self.columns.pop(k)
+            if k in self.chunks:
+                column = pa.chunked_array(self.chunks.pop(k), type=pa.large_string())
+                # a column of None only is an object column in pd.DataFrame(list of dicts)
+                data[k] = pd.Series(column, dtype=STRING_DTYPE) if column.null_count < len(column) else pd.Series([None] * len(column))
+            else:
+                data[k] = pd.Series(self.lists.pop(k) if k in self.lists else values)
+        self.rows = self.flushed = 0
+        return pd.DataFrame(data) if data else pd.DataFrame()
@@ -1,17 +1,23 @@
 import logging
 import logging.config
-import argparse, os, re, json, requests
+import argparse, os, re, json, time, requests
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
 import pyapicanaylsis_interface
 import pyapicanaylsis_contract
+import pymetrics
+import pyapicapi
 PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 DATETIME = datetime.now().strftime("%Y%m%d_%H%M%S")
 LOG_ENV = 'dev'
 LOG_DIR = 'log'
 CONFIG_DIR = 'config'
 CONFIG_DIR_FULL = os.path.join(PARENT_DIR, CONFIG_DIR)
+# the tables of a device are fetched one after the other
+DEFAULT_POOL_SIZE = 1
+# stage times and table counters of the run, see pymetrics.RunMetrics
+METRICS = pymetrics.RunMetrics('pyf5ltmapi')
 
 def get_datetime():
     return datetime.now().strftime("%Y%m%d_%H%M")
@@ -37,35 +43,27 @@ def setup_logging() -> None:
     logging.config.dictConfig(config)
     return
 
-def get_f5ltm_token(ip: str, username: str, password: str) -> str:
+def get_f5ltm_token(session: requests.Session, ip: str, username: str, password: str) -> str:
     url = f'https://{ip}/mgmt/shared/authn/login'
     payload = {
         "username": username,
         "password": password,
         "loginProviderName": "tmos"
     }
-    headers = {
-        "Accept":"application/json",
-        "Content-Type": "application/json"
-    }
     requests.packages.urllib3.disable_warnings()
-    resp = requests.post(url, headers=headers, data=json.dumps(payload), verify=False)
+    resp = session.post(url, data=json.dumps(payload))
     token = resp.json()['token']['token']
+    # the token header is carried by the session for every api call
+    session.headers.update({"X-F5-Auth-Token": f'{token}'})
 
     logger.info(f'Token: {token}')
     return token
 
-def get_f5ltm_api_resp(ip: str, key: str, token: str) -> requests.Response:
+def get_f5ltm_api_resp(session: requests.Session, ip: str, key: str) -> requests.Response:
     url = f'https://{ip}/mgmt/tm/ltm/{key}'
-    payload={}
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "X-F5-Auth-Token" : f'{token}'
-    }
 
     logger.info(f' Login api: {key} - {url}')
-    resp = requests.get(url, headers=headers, data=payload, verify=False)
+    resp = session.get(url)
     return resp
 
 def parse_f5ltm_json(json_obj: list, key: str) -> pd.DataFrame:
@@ -204,10 +202,13 @@ def process_infile(file: str) -> list:
     # Process each device in the config
     for idx, device in enumerate(devices):
         logger.info(f'###### Step4 - Processing device {idx+1}/{len(devices)}: {device["environment"]}')
+        start = time.perf_counter()
 
         # Step 4: login apic
         logger.info(f'###### Step4 - Login apic and get token for {device["environment"]}:')
-        token = get_f5ltm_token(device['ip'], device['username'], device['password'])
+        session = pyapicapi.get_session(device.get('pool_size', DEFAULT_POOL_SIZE))
+        with METRICS.stage('login', device['environment']):
+            token = get_f5ltm_token(session, device['ip'], device['username'], device['password'])
 
         # Step 5: process apic api and export to excel
         # Prepare excel writer
@@ -217,25 +218,39 @@ def process_infile(file: str) -> list:
 
         for i in range(len(req_tables)):
             logger.info(f" ### [{i + 1}/{len(req_tables)}], process {req_tables[i]['key']}")
-            # Step 5A: Get api resp
-            resp = get_f5ltm_api_resp(device['ip'], req_tables[i]['key'], token)
-
-            # Step 5B: Export to df
-            df1 = parse_f5ltm_json(resp.json(), req_tables[i]['key'])
-
-            # Step 5C: remove properties column
-            if remove_properties_flag == 1:
-                df1 = remove_columns(df1, req_tables[i]['remove_properties'])
-
-            # Step 5D: export to excel
-            export_df_to_xlsx(writer, df1, req_tables[i]['key'])
+            with METRICS.table(device['environment'], req_tables[i]['key']):
+                # Step 5A: Get api resp
+                with METRICS.stage('request'):
+                    resp = get_f5ltm_api_resp(session, device['ip'], req_tables[i]['key'])
+                METRICS.add('requests')
+                METRICS.add('response_bytes', len(resp.content))
+
+                # Step 5B: Export to df
+                with METRICS.stage('decode'):
+                    json_obj = resp.json()
+                with METRICS.stage('parse'):
+                    df1 = parse_f5ltm_json(json_obj, req_tables[i]['key'])
+
+                # Step 5C: remove properties column
+                if remove_properties_flag == 1:
+                    with METRICS.stage('remove_columns'):
+                        df1 = remove_columns(df1, req_tables[i]['remove_properties'])
+                METRICS.set('rows', len(df1))
+                METRICS.set('columns', df1.shape[1])
+
+                # Step 5D: export to excel
+                with METRICS.stage('write'):
+                    export_df_to_xlsx(writer, df1, req_tables[i]['key'])
 
         logger.info(f'###')
         logger.info(f'###')
         logger.info(f'### close output: {outfile}')
         logger.info(f'###')
         logger.info(f'###')
-        writer.close()
+        with METRICS.stage('close', device['environment']):
+            writer.close()
+        session.close()
+        METRICS.add_time('collect', time.perf_counter() - start, device['environment'])
         outfilelist.append(outfile)
 
     return outfilelist
@@ -244,6 +259,7 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--infiles", help="input json in config folder, example: -i all_apic_example.json")
     parser.add_argument("-a", "--anaylsis", action='store_true', help="flag to analysis and parse table to new excel")
+    parser.add_argument("--metrics", action='store_true', help="write the stage times and table counters to f5ltm_metrics_<datetime>.json and .prom")
     args = parser.parse_args()
 
     outfilelist = start_script(args)
@@ -258,6 +274,11 @@ def main():
             pyapicanaylsis_interface.start_script(args2)
             pyapicanaylsis_contract.start_script(args2)
 
+    METRICS.log_summary()
+    if args.metrics:
+        metrics_files = METRICS.write(os.path.join(PARENT_DIR, f'f5ltm_metrics_{get_datetime()}'))
+        logger.info(f'### metrics: {metrics_files}')
+
     logger.info(f'##################         END SCRIPT       ################## ')
     logger.info(f'############################################################## ')
 
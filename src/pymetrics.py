@@ -0,0 +1,143 @@
+import logging
+import os, re, json, time, threading, contextvars
+from contextlib import contextmanager
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+TABLE_COUNTERS = ['requests', 'response_bytes', 'retries', 'rows', 'columns']
+DEFAULT_SLOWEST = 10
+
+# (device, table) the current thread or task works on, so the http layer can add to the right table
+CURRENT = contextvars.ContextVar('pymetrics_current', default=(None, None))
+
+logger = logging.getLogger(__name__)
+
+class RunMetrics:
+    """
+        Wall time per stage, per device and per table, and the counters of each table of one run:
+        requests, response_bytes (decoded body), retries, rows and columns of the DataFrame.
+        Stages of a table: request (http round trips), decode (json), parse (DataFrame build), write.
+        Stages of a device: login, close (output), analysis_<report>, collect (whole device).
+        Written at the end of the run as json and as a Prometheus text exposition.
+    """
+
+    def __init__(self, job: str):
+        self.job = job
+        self.started = time.time()
+        self.devices = {}
+        self.lock = threading.Lock()
+
+    def _entry(self, device: str, table: str = None) -> dict:
+        # caller holds the lock
+        entry = self.devices.setdefault(device or 'unknown', {'stages': {}, 'tables': {}})
+        if table is None:
+            return entry
+        return entry['tables'].setdefault(table, dict({'stages': {}}, **dict.fromkeys(TABLE_COUNTERS, 0)))
+
+    def _target(self, device: str, table: str) -> tuple:
+        # the current device and table, unless given
+        if device is None:
+            device, current_table = CURRENT.get()
+            table = table or current_table
+        return device, table
+
+    def add_time(self, stage: str, seconds: float, device: str = None, table: str = None) -> None:
+        device, table = self._target(device, table)
+        with self.lock:
+            stages = self._entry(device, table)['stages']
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def add(self, name: str, value: int = 1, device: str = None, table: str = None) -> None:
+        device, table = self._target(device, table)
+        with self.lock:
+            entry = self._entry(device, table)
+            entry[name] = entry.get(name, 0) + value
+
+    def set(self, name: str, value: int, device: str = None, table: str = None) -> None:
+        device, table = self._target(device, table)
+        with self.lock:
+            self._entry(device, table)[name] = value
+
+    def get_time(self, stages: tuple, device: str = None, table: str = None) -> float:
+        device, table = self._target(device, table)
+        with self.lock:
+            entry = self._entry(device, table)['stages']
+            return sum(entry.get(stage, 0.0) for stage in stages)
+
+    @contextmanager
+    def stage(self, stage: str, device: str = None, table: str = None, exclude: tuple = ()):
+        """Time the block as stage, less the time of the exclude stages recorded inside it (e.g. the lazy page requests of a parse)."""
+        device, table = self._target(device, table)
+        nested = self.get_time(exclude, device, table) if exclude else 0.0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if exclude:
+                nested = self.get_time(exclude, device, table) - nested
+            self.add_time(stage, time.perf_counter() - start - nested, device, table)
+
+    @contextmanager
+    def table(self, device: str, table: str = None):
+        """Make (device, table) current for the block, for the stages and counters recorded without one."""
+        token = CURRENT.set((device, table))
+        try:
+            yield
+        finally:
+            CURRENT.reset(token)
+
+    def slowest_tables(self, count: int = DEFAULT_SLOWEST) -> list:
+        with self.lock:
+            rows = [dict(device=device, table=key, seconds=sum(entry['stages'].values()), **entry)
+                    for device, device_entry in self.devices.items() for key, entry in device_entry['tables'].items()]
+        return sorted(rows, key=lambda row: row['seconds'], reverse=True)[:count]
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            devices = json.loads(json.dumps(self.devices))
+        return {'job': self.job, 'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'run_seconds': time.time() - self.started, 'devices': devices, 'slowest_tables': self.slowest_tables()}
+
+    def to_prometheus(self) -> str:
+        prefix = re.sub(r'\W', '_', self.job)
+        data = self.to_dict()
+        lines = []
+
+        def metric(name: str, help: str, samples: list) -> None:
+            lines.append(f'# HELP {prefix}_{name} {help}')
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{escape_label(v)}"' for k, v in labels.items())
+                lines.append(f'{prefix}_{name}{{{label_text}}} {value}' if label_text else f'{prefix}_{name} {value}')
+
+        metric('run_seconds', 'Wall time of the run.', [({}, round(data['run_seconds'], 6))])
+        metric('device_stage_seconds', 'Wall time of a device stage.',
+               [({'device': device, 'stage': stage}, round(seconds, 6))
+                for device, entry in data['devices'].items() for stage, seconds in entry['stages'].items()])
+        tables = [(device, key, entry) for device, device_entry in data['devices'].items() for key, entry in device_entry['tables'].items()]
+        metric('table_stage_seconds', 'Wall time of a table stage.',
+               [({'device': device, 'table': key, 'stage': stage}, round(seconds, 6)) for device, key, entry in tables for stage, seconds in entry['stages'].items()])
+        for counter in TABLE_COUNTERS:
+            metric(f'table_{counter}', f'{counter.replace("_", " ").capitalize()} of a table.',
+                   [({'device': device, 'table': key}, entry.get(counter, 0)) for device, key, entry in tables])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> list:
+        """Write <path>.json and <path>.prom, returns the two files."""
+        files = [f'{path}.json', f'{path}.prom']
+        with open(files[0], 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        with open(files[1], 'w') as f:
+            f.write(self.to_prometheus())
+        return files
+
+    def log_summary(self, count: int = DEFAULT_SLOWEST) -> None:
+        for device, entry in sorted(self.devices.items()):
+            stages = ', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in entry['stages'].items())
+            logger.info(f'### metrics {device}: {len(entry["tables"])} tables, {stages}')
+        logger.info(f'### {count} slowest tables:')
+        for row in self.slowest_tables(count):
+            stages = ', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in sorted(row['stages'].items(), key=lambda s: -s[1]))
+            logger.info(f'### {row["seconds"]:8.2f}s {row["device"]} {row["table"]}: {row["rows"]} rows x {row["columns"]} columns, '
+                        f'{row["response_bytes"] / 1e6:.1f} MB in {row["requests"]} requests, {row["retries"]} retries ({stages})')
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -1,17 +1,25 @@
 import logging
 import logging.config
-import argparse, os, re, json, requests
+import argparse, os, re, json, time, requests
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
 import pyapicanaylsis_interface
 import pyapicanaylsis_contract
+import pytoken
+import pymetrics
+import pyapicapi
 PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname( __file__ ), os.pardir))
 DATETIME = datetime.now().strftime("%Y%m%d_%H%M%S")
 LOG_ENV = 'dev'
 LOG_DIR = 'log'
 CONFIG_DIR = 'config'
 CONFIG_DIR_FULL = os.path.join(PARENT_DIR, CONFIG_DIR)
+DEFAULT_POOL_SIZE = 4
+# stage times and table counters of the run, see pymetrics.RunMetrics
+METRICS = pymetrics.RunMetrics('pymsoapi')
+
+logger = logging.getLogger(__name__)
 
 def get_datetime():
     return datetime.now().strftime("%Y%m%d_%H%M")
@@ -37,35 +45,41 @@ def setup_logging() -> None:
     logging.config.dictConfig(config)
     return
 
-def get_token(ip: str, username: str, password: str) -> str:
+def get_token(session: requests.Session, ip: str, username: str, password: str) -> str:
     url = f'https://{ip}/login'
     payload = {
         "userName": username,
         "userPasswd": password,
         "domain": "local"
     }
-    headers = {
-        "Accept":"application/json",
-        "Content-Type": "application/json"
-    }
     requests.packages.urllib3.disable_warnings()
-    resp = requests.post(url, headers=headers, data=json.dumps(payload), verify=False)
+    resp = session.post(url, data=json.dumps(payload))
     token = resp.json()['token']
+    # the token header is carried by the session for every api call
+    session.headers.update({"Authorization": f'Bearer {token}'})
 
     logger.info(f'Token: {token}')
     return token
 
-def get_api_resp(ip: str, uri: str, key: str, token: str) -> requests.Response:
+def get_token_manager(session: requests.Session, login_info: dict, cache_file: str = None) -> pytoken.TokenManager:
+    # mso has no token refresh api, the manager logs in again before the token times out
+    def login() -> tuple:
+        token = get_token(session, login_info['ip'], login_info['username'], login_info['password'])
+        return token, login_info.get('token_timeout', pytoken.DEFAULT_TOKEN_TIMEOUT)
+    def on_token(token: str) -> None:
+        session.headers.update({"Authorization": f'Bearer {token}'})
+    return pytoken.TokenManager(f"mso|{login_info['ip']}|{login_info['username']}", login, on_token=on_token, cache_file=cache_file)
+
+def get_api_resp(session: requests.Session, ip: str, uri: str, key: str, tokens: pytoken.TokenManager = None) -> requests.Response:
     url = f'https://{ip}/api/v1/{uri}'
-    payload={}
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "Authorization" : f'Bearer {token}'
-    }
 
     logger.info(f' Login mso api: {key} - {url}')
-    resp = requests.get(url, headers=headers, data=payload, verify=False)
+    token = tokens.get() if tokens else None
+    resp = session.get(url)
+    if resp.status_code in (401, 403) and tokens:
+        METRICS.add('retries')
+        tokens.relogin(token)
+        resp = session.get(url)
     return resp
 
 def parse_mso_json(json_obj: list, key: str, **kwargs) -> pd.DataFrame:
@@ -172,7 +186,7 @@ def start_script(args) -> list:
     for inf in infilelist:
         logger.info(f'###### {i+1}/{len(infilelist)}, process {inf}')
         i = i+1
-        outf = process_infile(inf)
+        outf = process_infile(inf, pytoken.TOKEN_CACHE_FILE if getattr(args, 'token_cache', False) else None)
         outfilelist.append(outf)
     logger.info(f'###### Complete, outfiles: {outfilelist}')
     return outfilelist
@@ -197,14 +211,18 @@ def process_input(args) -> list:
 
     return infilelist
 
-def process_infile(file: str) -> str:
+def process_infile(file: str, token_cache: str = None) -> str:
     # step 3: read config file
     logger.info(f'###### Step3 - Load json config from {file}')
     [login_info, req_tables] = read_config_json(os.path.join(CONFIG_DIR_FULL, file))
 
     # step 4: login mso
     logger.info(f'###### Step4 - Login mso and get token:')
-    token = get_token(login_info['ip'], login_info['username'], login_info['password'])
+    start = time.perf_counter()
+    session = pyapicapi.get_session(login_info.get('pool_size', DEFAULT_POOL_SIZE))
+    tokens = get_token_manager(session, login_info, token_cache)
+    with METRICS.stage('login', login_info['environment']):
+        tokens.get()
 
     # step 5: process mso api and export to excel
     # Prepare excel writer
@@ -214,40 +232,61 @@ def process_infile(file: str) -> str:
 
     for i in range(len(req_tables)):
         logger.info(f" ### [{i + 1}/{len(req_tables)}], process {req_tables[i]['key']}")
-        # step 5A: Get api resp
-        resp = get_api_resp(login_info['ip'], req_tables[i]['uri'], req_tables[i]['key'], token)
-
-        # step 5B: Export to df
-        if 'tenants_id' in req_tables[i]:
-            df1 = parse_mso_json(resp.json(), req_tables[i]['key'], tenant_id = req_tables[i]['tenants_id'])
-            sheetname = f"{req_tables[i]['uri']}_{req_tables[i]['tenants_id']}"
-        else:
-            df1 = parse_mso_json(resp.json(), req_tables[i]['key'])
-            sheetname = req_tables[i]['uri']
-
-        # step 5C: remove properties column
-        if login_info['remove_properties_flag'] == 1:
-            df1 = remove_columns(df1, req_tables[i]['remove_properties'])
-
-        # step 5D: export to excel
-        sheetname = re.sub(r'/', '_', sheetname)
-        export_df_to_xlsx(writer, df1, sheetname)
+        with METRICS.table(login_info['environment'], req_tables[i]['uri']):
+            # step 5A: Get api resp
+            with METRICS.stage('request'):
+                resp = get_api_resp(session, login_info['ip'], req_tables[i]['uri'], req_tables[i]['key'], tokens)
+            METRICS.add('requests')
+            METRICS.add('response_bytes', len(resp.content))
+
+            # step 5B: Export to df
+            with METRICS.stage('decode'):
+                json_obj = resp.json()
+            with METRICS.stage('parse'):
+                if 'tenants_id' in req_tables[i]:
+                    df1 = parse_mso_json(json_obj, req_tables[i]['key'], tenant_id = req_tables[i]['tenants_id'])
+                    sheetname = f"{req_tables[i]['uri']}_{req_tables[i]['tenants_id']}"
+                else:
+                    df1 = parse_mso_json(json_obj, req_tables[i]['key'])
+                    sheetname = req_tables[i]['uri']
+
+            # step 5C: remove properties column
+            if login_info['remove_properties_flag'] == 1:
+                with METRICS.stage('remove_columns'):
+                    df1 = remove_columns(df1, req_tables[i]['remove_properties'])
+            METRICS.set('rows', len(df1))
+            METRICS.set('columns', df1.shape[1])
+
+            # step 5D: export to excel
+            sheetname = re.sub(r'/', '_', sheetname)
+            with METRICS.stage('write'):
+                export_df_to_xlsx(writer, df1, sheetname)
 
     logger.info(f'###')
     logger.info(f'###')
     logger.info(f'### close output: {outfile}')
     logger.info(f'###')
     logger.info(f'###')
-    writer.close()
+    with METRICS.stage('close', login_info['environment']):
+        writer.close()
+    session.close()
+    METRICS.add_time('collect', time.perf_counter() - start, login_info['environment'])
     return outfile
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-i", "--infiles", help="input json in config folder, example: -i n1_mso.json,p1_mso.json")
+    parser.add_argument("--token-cache", action='store_true', help="keep valid login tokens on disk for the next run")
+    parser.add_argument("--metrics", action='store_true', help="write the stage times and table counters to mso_metrics_<datetime>.json and .prom")
     args = parser.parse_args()
 
     outfilelist = start_script(args)
 
+    METRICS.log_summary()
+    if args.metrics:
+        metrics_files = METRICS.write(os.path.join(PARENT_DIR, f'mso_metrics_{get_datetime()}'))
+        logger.info(f'### metrics: {metrics_files}')
+
     logger.info(f'##################         END SCRIPT       ################## ')
     logger.info(f'############################################################## ')
 
@@ -0,0 +1,103 @@
+import logging
+import os, re, json, gzip, glob
+from datetime import datetime
+from typing import Iterable, Iterator, Union
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+SNAPSHOT_DIR = 'snapshot'
+SNAPSHOT_DIR_FULL = os.path.join(PARENT_DIR, SNAPSHOT_DIR)
+META_FILE = '_meta.json'
+
+logger = logging.getLogger(__name__)
+
+def get_snapshot_root(snapshot: str) -> str:
+    # snapshot is a batch datetime (e.g. 20251009_1200) under the snapshot folder, or a folder path
+    if os.path.isdir(snapshot):
+        return os.path.abspath(snapshot)
+    return os.path.join(SNAPSHOT_DIR_FULL, snapshot)
+
+def get_device_dirname(device: dict) -> str:
+    return f"{device['device_type'].replace('_', '')}_{device['environment']}"
+
+def get_snapshot_dir(device: dict, snapshot: str) -> str:
+    return os.path.join(get_snapshot_root(snapshot), get_device_dirname(device))
+
+def find_latest_snapshot(device: dict, before: str) -> str:
+    """Newest completed snapshot folder of the device, older than the batch datetime before."""
+    if not os.path.isdir(SNAPSHOT_DIR_FULL):
+        return None
+    for batch in sorted(os.listdir(SNAPSHOT_DIR_FULL), reverse=True):
+        if batch >= before:
+            continue
+        path = os.path.join(SNAPSHOT_DIR_FULL, batch, get_device_dirname(device))
+        if os.path.isfile(os.path.join(path, META_FILE)):
+            return path
+    return None
+
+class SnapshotStore:
+    """
+        Raw class responses of one device, one gzip json file per response page:
+        snapshot/<batch_datetime>/<devicetype>_<environment>/<key>.<page>.json.gz
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def page_file(self, key: str, page: int) -> str:
+        return os.path.join(self.path, f'{key}.{page:04d}.json.gz')
+
+    def page_files(self, key: str) -> list:
+        return sorted(glob.glob(os.path.join(glob.escape(self.path), f'{glob.escape(key)}.[0-9][0-9][0-9][0-9].json.gz')))
+
+    def keys(self) -> list:
+        return sorted({re.sub(r'\.\d{4}\.json\.gz$', '', os.path.basename(f)) for f in glob.glob(os.path.join(glob.escape(self.path), '*.json.gz'))})
+
+    def write_page(self, key: str, page: int, json_obj: dict) -> None:
+        with gzip.open(self.page_file(key, page), 'wt', encoding='utf-8') as f:
+            json.dump(json_obj, f)
+
+    def save(self, key: str, json_obj: Union[dict, Iterable[dict]]) -> Union[dict, Iterator[dict]]:
+        """Persist a response, pages of a generator are written as they pass through to the caller."""
+        os.makedirs(self.path, exist_ok=True)
+        for f in self.page_files(key):
+            os.remove(f)
+        if isinstance(json_obj, dict):
+            self.write_page(key, 0, json_obj)
+            return json_obj
+        return self._save_pages(key, json_obj)
+
+    def _save_pages(self, key: str, pages: Iterable[dict]) -> Iterator[dict]:
+        for page, json_obj in enumerate(pages):
+            self.write_page(key, page, json_obj)
+            yield json_obj
+
+    def load(self, key: str) -> Union[dict, Iterator[dict]]:
+        files = self.page_files(key)
+        if not files:
+            raise FileNotFoundError(f'No snapshot of {key} in {self.path}')
+        if len(files) == 1:
+            return self._read_page(files[0])
+        return (self._read_page(f) for f in files)
+
+    def _read_page(self, file: str) -> dict:
+        with gzip.open(file, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write_meta(self, device: dict, tables: list) -> None:
+        # written last, a snapshot without meta is an incomplete collection
+        meta = {
+            'device_type': device['device_type'],
+            'environment': device['environment'],
+            'ip': device['ip'],
+            'tables': tables,
+            'completed': datetime.now().isoformat(timespec='seconds')
+        }
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(meta, f, indent=2)
+        logger.info(f'Snapshot saved: {self.path}')
+
+    def read_meta(self) -> dict:
+        try:
+            with open(os.path.join(self.path, META_FILE), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
@@ -0,0 +1,111 @@
+import logging
+import functools, ipaddress
+import numpy as np
+import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+# dotted quad with an optional prefix length, other forms (netmask, IPv6, ...) go through ipaddress
+IPV4_PATTERN = r'^(?:0|[1-9]\d{0,2})(?:\.(?:0|[1-9]\d{0,2})){3}(?:/(?:0|[1-9]\d?))?$'
+# distinct addresses kept, e.g. the gateways of fvSubnet or the endpoints of fvIp
+SUBNET_CACHE_SIZE = 65536
+
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=SUBNET_CACHE_SIZE)
+def calculate_subnet(ip) -> str:
+    """Network of an address, e.g. 10.0.0.1/24 -> 10.0.0.0/24, 2001:db8::1/64 -> 2001:db8::/64, 10.0.0.1 -> 10.0.0.1/32."""
+    if pd.isna(ip):
+        return ''  # Return empty string for null values
+    try:
+        network = ipaddress.ip_network(ip, strict=False)
+        return str(network)  # Return the network address as a string
+    except ValueError:
+        return ''  # Return empty string for invalid gateway formats
+
+def ipv4_networks(ips) -> tuple:
+    """
+        Networks of the dotted quad addresses in a pyarrow string array, computed on the address integers.
+        Returns the positions, network integers and prefix lengths, addresses out of range are left to ipaddress.
+    """
+    pos = np.flatnonzero(pc.fill_null(pc.match_substring_regex(ips, IPV4_PATTERN), False).to_numpy(zero_copy_only=False))
+    if not len(pos):
+        return pos, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    parts = pc.split_pattern(pc.replace_substring(ips.take(pa.array(pos)), '/', '.'), '.')
+    numbers = pc.cast(pc.list_flatten(parts), pa.int64()).to_numpy()
+    starts = parts.offsets.to_numpy()[:-1] - parts.offsets[0].as_py()
+    octets = numbers[starts[:, None] + np.arange(4)]
+    has_prefix = pc.list_value_length(parts).to_numpy(zero_copy_only=False) == 5
+    prefix = np.where(has_prefix, numbers[np.minimum(starts + 4, len(numbers) - 1)], 32)
+    valid = (octets <= 255).all(axis=1) & (prefix <= 32)
+    pos, octets, prefix = pos[valid], octets[valid], prefix[valid]
+
+    address = (octets << np.array([24, 16, 8, 0])).sum(axis=1)
+    network = address & ((0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF)
+    return pos, network, prefix
+
+def ipv4_subnets(ips) -> tuple:
+    """Positions and network strings of the dotted quad addresses in a pyarrow string array, see ipv4_networks."""
+    pos, network, prefix = ipv4_networks(ips)
+    if not len(pos):
+        return pos, []
+    text = [pc.cast(pa.array((network >> shift) & 255), pa.string()) for shift in (24, 16, 8, 0)]
+    subnets = pc.binary_join_element_wise(pc.binary_join_element_wise(*text, '.'), pc.cast(pa.array(prefix), pa.string()), '/')
+    return pos, subnets.to_pylist()
+
+def get_arrow_strings(uniques):
+    # pyarrow array of distinct values from pd.factorize, None if they are not all strings or pyarrow is not installed
+    if pa is None or not len(uniques) or pd.api.types.infer_dtype(uniques) != 'string':
+        return None
+    ips = pa.array(uniques, type=pa.string(), from_pandas=True)
+    return ips.combine_chunks() if isinstance(ips, pa.ChunkedArray) else ips
+
+def to_subnet(ip: pd.Series) -> pd.Series:
+    """
+        calculate_subnet of a column: each distinct address is computed once,
+        dotted quads in one pass over their integers when pyarrow is installed, other values with calculate_subnet.
+        Usable for fvSubnet/l3extSubnet ip, fvIp addr and F5 addresses (see f5_destination_address).
+    """
+    codes, uniques = pd.factorize(ip)
+    subnets = np.empty(len(uniques), dtype=object)
+    done = np.zeros(len(uniques), dtype=bool)
+    ips = get_arrow_strings(uniques)
+    if ips is not None:
+        pos, values = ipv4_subnets(ips)
+        subnets[pos] = values
+        done[pos] = True
+    subnets[~done] = [calculate_subnet(value) for value in uniques[~done]]
+    # code -1 (null) takes the trailing ''
+    return pd.Series(np.append(subnets, '')[codes], index=ip.index, dtype='str')
+
+def to_network(ip) -> tuple:
+    """
+        (version, network, prefix length) arrays of a column of addresses or prefixes, e.g. 10.0.0.1/24 -> (4, 167772160, 24),
+        version is 0 where the value is not an address. Networks are python ints, as IPv6 does not fit in int64.
+    """
+    codes, uniques = pd.factorize(pd.Series(ip, dtype=object) if not isinstance(ip, pd.Series) else ip)
+    version = np.zeros(len(uniques) + 1, dtype=np.int8)
+    network = np.zeros(len(uniques) + 1, dtype=object)
+    prefix = np.zeros(len(uniques) + 1, dtype=np.int64)
+    done = np.zeros(len(uniques), dtype=bool)
+    ips = get_arrow_strings(uniques)
+    if ips is not None:
+        pos, network[pos], prefix[pos] = ipv4_networks(ips)
+        version[pos] = 4
+        done[pos] = True
+    for i in np.flatnonzero(~done):
+        try:
+            net = ipaddress.ip_network(uniques[i], strict=False)
+        except (ValueError, TypeError):
+            continue
+        version[i], network[i], prefix[i] = net.version, int(net.network_address), net.prefixlen
+    # code -1 (null) takes the trailing version 0
+    return version[codes], network[codes], prefix[codes]
+
+def f5_destination_address(destination: pd.Series) -> pd.Series:
+    """Address of an F5 virtual destination, e.g. /Common/10.1.1.1%2:443 -> 10.1.1.1, /Common/2001:db8::1.443 -> 2001:db8::1"""
+    address = destination.str.replace(r'^.*/', '', regex=True)       # partition
+    address = address.str.replace(r'[.:](?:\d+|any)$', '', regex=True)  # port, ':' after IPv4 and '.' after IPv6
+    return address.str.replace(r'%\d+$', '', regex=True)            # route domain
@@ -0,0 +1,120 @@
+import logging
+import os, json, time, threading
+from typing import Callable
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+CACHE_DIR = 'cache'
+TOKEN_CACHE_FILE = os.path.join(PARENT_DIR, CACHE_DIR, 'token_cache.json')
+DEFAULT_TOKEN_TIMEOUT = 600
+DEFAULT_REFRESH_RATIO = 0.5
+CACHE_LOCK = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+class TokenManager:
+    """
+        Keep one login token valid for a device:
+        - login() -> (token, timeout_seconds), called when there is no usable token
+        - refresh(token) -> (token, timeout_seconds), called once the token is older than refresh_ratio of its timeout,
+          the timeout counts from the refresh, created keeps the time of the login that made the token
+        - on_token(token), called whenever the token changes, e.g. to update the session header
+        Valid tokens can be kept in cache_file, so the next run skips the login round trip.
+    """
+
+    def __init__(self, name: str, login: Callable[[], tuple], refresh: Callable[[str], tuple] = None,
+                 on_token: Callable[[str], None] = None, cache_file: str = None, refresh_ratio: float = DEFAULT_REFRESH_RATIO):
+        self.name = name
+        self.login = login
+        self.refresh = refresh
+        self.on_token = on_token
+        self.cache_file = cache_file
+        self.refresh_ratio = refresh_ratio
+        self.token = None
+        self.issued = 0.0
+        self.created = 0.0
+        self.timeout = 0
+        self.lock = threading.Lock()
+
+    def get(self) -> str:
+        with self.lock:
+            if self.token is None:
+                if not self._load_cache():
+                    self._login()
+            elif time.time() >= self.issued + self.timeout * self.refresh_ratio:
+                self._refresh()
+            return self.token
+
+    def relogin(self, stale_token: str) -> str:
+        """Login again after an auth failure, unless another caller already replaced the stale token."""
+        with self.lock:
+            if self.token is None or self.token == stale_token:
+                logger.warning(f'Token rejected for {self.name}, login again')
+                self._login()
+            return self.token
+
+    def _set(self, token: str, timeout: int, created: float = None) -> None:
+        self.token = token
+        self.issued = time.time()
+        self.created = self.issued if created is None else created
+        self.timeout = int(timeout)
+        if self.on_token:
+            self.on_token(token)
+        self._save_cache()
+
+    def _login(self) -> None:
+        token, timeout = self.login()
+        self._set(token, timeout)
+
+    def _refresh(self) -> None:
+        if self.refresh is None:
+            return self._login()
+        remaining = self.issued + self.timeout - time.time()
+        try:
+            token, timeout = self.refresh(self.token)
+        except Exception as e:
+            logger.warning(f'Token refresh failed for {self.name}, login again: {str(e)}')
+            return self._login()
+        if timeout <= remaining:
+            # the token can not be extended any further
+            return self._login()
+        logger.info(f'Token refreshed for {self.name}')
+        # an extended token keeps its creation time, a renewed one starts again
+        self._set(token, timeout, self.created if token == self.token else None)
+
+    def _read_cache(self) -> dict:
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_cache(self) -> bool:
+        if not self.cache_file:
+            return False
+        entry = self._read_cache().get(self.name)
+        if not entry or time.time() >= entry['issued'] + entry['timeout'] * self.refresh_ratio:
+            return False
+        self.token = entry['token']
+        self.issued = entry['issued']
+        # cache files written before the creation time was kept
+        self.created = entry.get('created', entry['issued'])
+        self.timeout = entry['timeout']
+        if self.on_token:
+            self.on_token(self.token)
+        logger.info(f'Token loaded from cache for {self.name}')
+        return True
+
+    def _save_cache(self) -> None:
+        if not self.cache_file:
+            return
+        # several devices share the cache file, so merge under a module level lock
+        with CACHE_LOCK:
+            cache = self._read_cache()
+            cache[self.name] = {'token': self.token, 'issued': self.issued, 'created': self.created, 'timeout': self.timeout}
+            try:
+                os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+                # tokens are credentials, keep the file private to the user
+                fd = os.open(self.cache_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(cache, f)
+            except OSError as e:
+                logger.warning(f'Failed to write token cache {self.cache_file}: {str(e)}')
@@ -0,0 +1,41 @@
+import os, sys
+import pandas as pd
+import pytest
+PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(PARENT_DIR, 'src'))
+
+# The modules of src are imported by name, as the scripts import each other.
+
+# A small tenant for the contract graph and the policy evaluator: direct contracts, vzAny of a VRF as consumer and as provider, an external EPG.
+# VRF v1: BD b1 (epg web), BD b2 (epg app). VRF v2: BD b3 (epg db).
+# web -> app: c-app, ext -> web: c-web, vzAny of v1 -> db: c-shared, web -> vzAny of v2: c-any.
+TENANT = 'uni/tn-t1'
+WEB, APP, DB = f'{TENANT}/ap-ap1/epg-web', f'{TENANT}/ap-ap1/epg-app', f'{TENANT}/ap-ap1/epg-db'
+EXT = f'{TENANT}/out-o1/instP-ext'
+ANY1, ANY2 = f'{TENANT}/ctx-v1/any', f'{TENANT}/ctx-v2/any'
+
+def brc(name: str) -> str:
+    return f'{TENANT}/brc-{name}'
+
+def contract_frames() -> dict:
+    return {
+        'fvRsCons': pd.DataFrame([(f'{WEB}/rscons-c-app', brc('c-app')), (f'{EXT}/rscons-c-web', brc('c-web')),
+                                  (f'{WEB}/rscons-c-any', brc('c-any'))], columns=['dn', 'tDn']),
+        'fvRsProv': pd.DataFrame([(f'{APP}/rsprov-c-app', brc('c-app')), (f'{WEB}/rsprov-c-web', brc('c-web')),
+                                  (f'{DB}/rsprov-c-shared', brc('c-shared'))], columns=['dn', 'tDn']),
+        'vzRtAnyToCons': pd.DataFrame([(f'{brc("c-shared")}/rtanyToCons-[{ANY1}]', ANY1)], columns=['dn', 'tDn']),
+        'vzRtAnyToProv': pd.DataFrame([(f'{brc("c-any")}/rtanyToProv-[{ANY2}]', ANY2)], columns=['dn', 'tDn']),
+        'vzRsSubjFiltAtt': pd.DataFrame([(f'{brc("c-app")}/subj-s1/rssubjFiltAtt-f-web', 'f-web', 'permit'),
+                                         (f'{brc("c-app")}/subj-s1/rssubjFiltAtt-f-block', 'f-block', 'deny')],
+                                        columns=['dn', 'tnVzFilterName', 'action']),
+        'fvRsBd': pd.DataFrame([(f'{WEB}/rsbd', f'{TENANT}/BD-b1'), (f'{APP}/rsbd', f'{TENANT}/BD-b2'), (f'{DB}/rsbd', f'{TENANT}/BD-b3')],
+                               columns=['dn', 'tDn']),
+        'fvRtCtx': pd.DataFrame([(f'{TENANT}/ctx-v1/rtctx-[{TENANT}/BD-b1]', f'{TENANT}/BD-b1'),
+                                 (f'{TENANT}/ctx-v1/rtctx-[{TENANT}/BD-b2]', f'{TENANT}/BD-b2'),
+                                 (f'{TENANT}/ctx-v2/rtctx-[{TENANT}/BD-b3]', f'{TENANT}/BD-b3')], columns=['dn', 'tDn']),
+    }
+
+@pytest.fixture(scope='session')
+def make_contract_frames():
+    # a new dict of frames on each call, a test module can add or replace tables
+    return contract_frames
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+import pyapicanaylsis_interface
+
+# Expansion of interface selector ranges by df_intf_profile_split_rows: vPC node ranges, port ranges (p1-p2 or p16-17),
+# both at once with the nodes outer, and selectors without a node id or a p<N> port range skipped.
+
+COLUMNS = ['dn', '_nodeid', '_intf_p', '_intf_n', '_policyGrp']
+PROF = 'uni/infra/accportprof-lif'
+
+CASES = [
+    # dn, _nodeid, _intf_p, _intf_n, _policyGrp -> rows of (_nodeid, _intf_p, _intf_n)
+    ((f'{PROF}-1101/hports-p31-typ-range', '1101', 'p31', '31', 'ipg-vm'), [('1101', 'p31', '31')]),
+    ((f'{PROF}-1103-1104/hports-p3-typ-range', '1103-1104', 'p3', '3', 'vpc-p3'), [('1103', 'p3', '3'), ('1104', 'p3', '3')]),
+    ((f'{PROF}-1103/hports-p1-p2-typ-range', '1103', 'p1-p2', '1-2', 'ipg-inb'), [('1103', 'p1', '1'), ('1103', 'p2', '2')]),
+    ((f'{PROF}-1201/hports-p16-17-typ-range', '1201', 'p16-17', '16-17', 'ipg-phy'), [('1201', 'p16', '16'), ('1201', 'p17', '17')]),
+    ((f'{PROF}-1105-1106/hports-p5-p6-typ-range', '1105-1106', 'p5-p6', '5-6', 'vpc-p5'),
+     [('1105', 'p5', '5'), ('1105', 'p6', '6'), ('1106', 'p5', '5'), ('1106', 'p6', '6')]),
+    ((f'{PROF}-1101-1104/hports-p7-typ-range', '1101-1104', 'p7', '7', 'vpc-p7'), [(str(n), 'p7', '7') for n in range(1101, 1105)]),
+    ((f'{PROF}-1101/hports-vpc25-typ-range', '1101', f'{PROF}-1101/hports-vpc25-typ-range',
+      f'{PROF}-1101/hports-vpc25-typ-range', 'ipg-vpc25'), []),                                          # not a p<N> selector
+    (('uni/infra/accportprof-spine/hports-p1-typ-range', 'uni/infra/accportprof-spine/hports-p1-typ-range', 'p1', '1', 'ipg'), []),  # no node id
+]
+
+@pytest.mark.parametrize('row, expected', CASES)
+def test_split_rows(row, expected):
+    df = pyapicanaylsis_interface.df_intf_profile_split_rows(pd.DataFrame([row], columns=COLUMNS))
+    assert list(df.columns) == COLUMNS
+    assert list(df[['_nodeid', '_intf_p', '_intf_n']].itertuples(index=False, name=None)) == expected
+    assert (df['dn'] == row[0]).all() and (df['_policyGrp'] == row[4]).all()
+
+def test_split_rows_table():
+    # the rows of a table keep their order, each expanded in place
+    df = pyapicanaylsis_interface.df_intf_profile_split_rows(pd.DataFrame([row for row, _ in CASES], columns=COLUMNS))
+    assert list(df[['_nodeid', '_intf_p', '_intf_n']].itertuples(index=False, name=None)) == [r for _, rows in CASES for r in rows]
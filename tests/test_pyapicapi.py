@@ -0,0 +1,129 @@
+import types
+import pandas as pd
+import pytest
+import pysnapshot
+import pyapicapi
+
+# Incremental collection: get_delta_json rebuilds a table from the previous snapshot, the objects modified since its newest
+# modTs and the dn list of the current objects, or returns None for a full collection.
+# AnalysisScheduler: each analysis starts with its tables, and every analysis of a device ends as an output or an exception.
+
+KEY = 'fvAEPg'
+
+def epg(name: str, mod_ts: str, descr: str = '') -> dict:
+    return {KEY: {'attributes': {'dn': f'uni/tn-t1/ap-ap1/epg-{name}', 'name': name, 'descr': descr, 'modTs': mod_ts}}}
+
+def response(imdata: list) -> dict:
+    return {'totalCount': str(len(imdata)), 'imdata': imdata}
+
+PREVIOUS = [epg('a', '2025-01-01T10:00:00.000+00:00'), epg('b', '2025-01-02T10:00:00.000+00:00'),
+            epg('c', 'never'), epg('d', '2025-01-01T12:00:00.000+00:00')]
+
+class FakeApic(pyapicapi.CiscoApicDevice):
+    """Answers the two queries of get_delta_json from lists of objects instead of the api."""
+    def __init__(self, previous_dir: str, changed: list, current: list):
+        super().__init__('10.0.0.1', 'admin', 'pass')
+        self.previous = pysnapshot.SnapshotStore(previous_dir)
+        self.changed, self.current, self.queries = changed, current, []
+
+    def get_pages(self, table: dict, token: str, params: dict):
+        self.queries.append(params)
+        if 'query-target-filter' in params:
+            return iter([response(self.changed)])
+        names = [{KEY: {'attributes': {'dn': data[KEY]['attributes']['dn']}}} for data in self.current]
+        return iter([response(names)])
+
+def make_device(tmp_path, changed: list, current: list, previous: list = PREVIOUS) -> FakeApic:
+    device = FakeApic(str(tmp_path / 'previous'), changed, current)
+    if previous is not None:
+        device.previous.save(KEY, response(previous))
+    return device
+
+def names(json_obj) -> list:
+    pages = [json_obj] if isinstance(json_obj, dict) else list(json_obj)
+    return [(data[KEY]['attributes']['name'], data[KEY]['attributes']['descr']) for page in pages for data in page['imdata']]
+
+def test_delta_merge(tmp_path):
+    # b modified, c deleted, e created, in the order of the current dn list
+    b2, e = epg('b', '2025-01-03T10:00:00.000+00:00', 'changed'), epg('e', '2025-01-03T11:00:00.000+00:00', 'new')
+    device = make_device(tmp_path, [b2, e], [PREVIOUS[0], b2, PREVIOUS[3], e])
+    json_obj = device.get_delta_json({'key': KEY}, '')
+    assert names(json_obj) == [('a', ''), ('b', 'changed'), ('d', ''), ('e', 'new')]
+    assert json_obj['totalCount'] == '4'
+    # the newest modTs of the previous snapshot, "never" left out; changed objects are fetched before the dn list
+    assert device.queries == [{'query-target-filter': f'ge({KEY}.modTs,"2025-01-02T10:00:00.000+00:00")'},
+                              {'rsp-prop-include': 'naming-only'}]
+
+def test_delta_pages(tmp_path):
+    device = make_device(tmp_path, [], PREVIOUS)
+    pages = list(device.get_delta_json({'key': KEY, 'page_size': '3'}, ''))
+    assert [len(page['imdata']) for page in pages] == [3, 1]
+    assert names(pages) == names(response(PREVIOUS))
+
+@pytest.mark.parametrize('previous, current', [
+    (None, PREVIOUS),                                                              # no previous snapshot
+    ([{KEY: {'attributes': {'dn': 'uni/tn-t1/ap-ap1/epg-a', 'name': 'a'}}}], PREVIOUS),  # saved without modTs
+    ([epg('c', 'never')], PREVIOUS),                                               # no timestamp to start from
+    ([], PREVIOUS),
+    (PREVIOUS, PREVIOUS + [epg('f', 'never')]),                                    # new object the modTs filter can not return
+])
+def test_delta_full_collection(tmp_path, previous, current):
+    device = make_device(tmp_path, [], current, previous)
+    assert device.get_delta_json({'key': KEY}, '') is None
+
+def make_analysis(name: str, tables: dict, error: Exception = None) -> types.ModuleType:
+    module = types.ModuleType(f'pyapicanaylsis_{name}')
+    module.REQUIRED_TABLES = tables
+    module.calls = []
+    def process_frames(frames: dict, environment: str, batch_datetime: str) -> str:
+        module.calls.append({key: list(df.columns) for key, df in frames.items()})
+        if error:
+            raise error
+        return f'apic_{environment}_{name}_{batch_datetime}.xlsx'
+    module.process_frames = process_frames
+    return module
+
+TABLE = pd.DataFrame({'dn': ['uni/tn-t1'], 'name': ['t1'], 'descr': ['']})
+
+@pytest.fixture
+def analyses(monkeypatch):
+    modules = [make_analysis('first', {'fvTenant': ['dn', 'name']}),
+               make_analysis('second', {'fvTenant': ['dn'], 'fvAp': ['dn']}),
+               make_analysis('broken', {'fvAp': ['name']}, ValueError('bad table'))]
+    monkeypatch.setitem(pyapicapi.ANALYSIS_REGISTRY, 'cisco_apic', modules)
+    monkeypatch.setattr(pyapicapi, 'REPORTS', None)
+    return modules
+
+def test_scheduler(analyses):
+    first, second, broken = analyses
+    scheduler = pyapicapi.AnalysisScheduler('20250101_1200', 'thread', 2)
+    scheduler.add_device('out1', 'cisco_apic', 'n1')
+    scheduler.table_ready('out1', 'fvTenant', TABLE)
+    scheduler.table_ready('out1', 'fvBD', TABLE)   # no analysis reads it
+    # first starts with its one table, the others wait for fvAp
+    assert [module for module, _, _ in scheduler.tasks['out1']] == [first]
+    scheduler.table_ready('out1', 'fvAp', TABLE)
+    scheduler.device_done('out1')
+    results = scheduler.wait()['out1']
+    assert results[:2] == ['apic_n1_first_20250101_1200.xlsx', 'apic_n1_second_20250101_1200.xlsx']
+    assert isinstance(results[2], ValueError)
+    # each analysis gets the columns of its tables, read by any analysis of the device
+    assert first.calls == [{'fvTenant': ['dn', 'name']}]
+    assert second.calls == [{'fvTenant': ['dn', 'name'], 'fvAp': ['dn', 'name']}]
+    assert 'out1' not in scheduler.devices
+
+@pytest.mark.parametrize('failed, message', [(False, "missing tables: ['fvAp']"), (True, 'collection failed')])
+def test_scheduler_not_started(analyses, failed, message):
+    # analyses without their tables at the end of a device count as failed, with the reason
+    scheduler = pyapicapi.AnalysisScheduler('20250101_1200', 'thread', 2)
+    scheduler.add_device('out1', 'cisco_apic', 'n1')
+    scheduler.add_device('out2', 'cisco_apic', 'n2')
+    scheduler.table_ready('out1', 'fvTenant', TABLE)
+    scheduler.device_done('out1', failed)
+    scheduler.device_done('out2', True)
+    results = scheduler.wait()
+    assert results['out1'][0] == 'apic_n1_first_20250101_1200.xlsx'
+    assert [str(e) for e in results['out1'][1:]] == [f'pyapicanaylsis_second not started for n1, {message}',
+                                                     f'pyapicanaylsis_broken not started for n1, {message}']
+    assert len(results['out2']) == 3 and all('collection failed' in str(e) for e in results['out2'])
+    assert all(module.calls == [] for module in analyses[1:])
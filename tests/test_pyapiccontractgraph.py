@@ -0,0 +1,72 @@
+import pytest
+import pyapiccontractgraph
+
+# Contracts between the EPGs of the tenant of conftest.contract_frames, direct and through the vzAny of a VRF.
+
+WEB, APP, DB = 'uni/tn-t1/ap-ap1/epg-web', 'uni/tn-t1/ap-ap1/epg-app', 'uni/tn-t1/ap-ap1/epg-db'
+EXT = 'uni/tn-t1/out-o1/instP-ext'
+ANY1, ANY2 = 'uni/tn-t1/ctx-v1/any', 'uni/tn-t1/ctx-v2/any'
+
+def brc(name: str) -> str:
+    return f'uni/tn-t1/brc-{name}'
+
+CONTRACTS = [
+    # consumer, provider, (contract, consumer_via, provider_via)
+    (WEB, APP, [(brc('c-app'), WEB, APP)]),
+    (APP, WEB, []),                                      # a contract has one direction
+    (EXT, WEB, [(brc('c-web'), EXT, WEB)]),
+    (WEB, EXT, []),
+    (WEB, DB, [(brc('c-any'), WEB, ANY2),                # db provides c-any through the vzAny of v2
+               (brc('c-shared'), ANY1, DB)]),            # web consumes c-shared through the vzAny of v1
+    (APP, DB, [(brc('c-shared'), ANY1, DB)]),
+    (DB, WEB, []),
+    (DB, APP, []),
+    (EXT, DB, []),                                       # the VRF of an external EPG is not known, no vzAny for it
+    (WEB, WEB, []),                                      # traffic inside an EPG needs no contract
+]
+
+@pytest.fixture(scope='module')
+def graph(make_contract_frames):
+    return pyapiccontractgraph.ContractGraph(make_contract_frames())
+
+@pytest.mark.parametrize('consumer, provider, expected', CONTRACTS)
+def test_contracts(graph, consumer, provider, expected):
+    assert graph.contracts(consumer, provider) == expected
+
+@pytest.mark.parametrize('epg, expected', [
+    (APP, {(WEB, brc('c-app'), WEB)}),
+    (WEB, {(EXT, brc('c-web'), EXT)}),
+    # the vzAny consumer of c-shared stands for every EPG of v1, db reaches back as consumer of c-any
+    (DB, {(WEB, brc('c-shared'), ANY1), (APP, brc('c-shared'), ANY1), (WEB, brc('c-any'), WEB)}),
+    (EXT, set()),
+])
+def test_who_can_reach(graph, epg, expected):
+    df = graph.who_can_reach(epg)
+    assert set(map(tuple, df[['consumer', 'contract', 'consumer_via']].to_numpy())) == expected
+
+@pytest.mark.parametrize('epg, expected', [
+    (WEB, {(APP, brc('c-app'), APP), (DB, brc('c-any'), ANY2), (DB, brc('c-shared'), DB)}),
+    (APP, {(DB, brc('c-shared'), DB)}),
+    (EXT, {(WEB, brc('c-web'), WEB)}),
+    (DB, set()),
+])
+def test_reachable_from(graph, epg, expected):
+    df = graph.reachable_from(epg)
+    assert set(map(tuple, df[['provider', 'contract', 'provider_via']].to_numpy())) == expected
+
+def test_can_talk(graph):
+    # both directions, one row per filter of the contract, a contract without filters keeps one row
+    df = graph.can_talk(APP, WEB)
+    assert list(map(tuple, df[['consumer', 'provider', 'contract', 'filter', 'action']].to_numpy())) == [
+        (WEB, APP, brc('c-app'), 'f-web', 'permit'), (WEB, APP, brc('c-app'), 'f-block', 'deny')]
+    df = graph.can_talk(EXT, WEB)
+    assert df[['consumer', 'provider', 'contract']].to_numpy().tolist() == [[EXT, WEB, brc('c-web')]]
+    assert df['filter'].isna().all()
+
+@pytest.mark.parametrize('name, expected', [(WEB, WEB), ('web', WEB), ('ext', EXT)])
+def test_resolve(graph, name, expected):
+    assert graph.resolve(name) == expected
+
+def test_resolve_unknown(graph):
+    with pytest.raises(ValueError):
+        graph.resolve('nothing')
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+import pyapicdn
+
+# parse_dn on the dns of the analyses: bracketed values with '/' and nested dns, the parent dn, <field>_dn columns,
+# the same result from the pyarrow and the python split, and only the distinct heads and tails parsed.
+
+PHYS = 'topology/pod-1/node-1101/sys/phys-[eth1/10]'
+PATH = 'topology/pod-1/paths-1101/pathep-[eth1/1]'
+VPC = 'topology/pod-2/protpaths-1103-1104/pathep-[vpc-leaf1103-1104]'
+EPG = 'uni/tn-t1/ap-app/epg-web'
+
+CASES = [
+    # dn, {column: value}, columns not listed are NaN
+    (PHYS, {'pod': '1', 'node': '1101', 'interface': 'eth1/10', 'parent': 'topology/pod-1/node-1101/sys', 'node_dn': 'topology/pod-1/node-1101',
+            'interface_dn': PHYS}),
+    (f'{PHYS}/phys/fcot', {'pod': '1', 'node': '1101', 'interface': 'eth1/10', 'parent': f'{PHYS}/phys', 'interface_dn': PHYS,
+                           'node_dn': 'topology/pod-1/node-1101'}),
+    (f'{EPG}/rspathAtt-[{PATH}]', {'tenant': 't1', 'ap': 'app', 'epg': 'web', 'pod': '1', 'node': '1101', 'interface': 'eth1/1', 'parent': EPG,
+                                  'epg_dn': EPG, 'tenant_dn': 'uni/tn-t1'}),   # node and interface of the nested path dn
+    (f'{EPG}/rspathAtt-[{VPC}]', {'tenant': 't1', 'ap': 'app', 'epg': 'web', 'pod': '2', 'node': '1103-1104', 'interface': 'vpc-leaf1103-1104',
+                                 'parent': EPG, 'epg_dn': EPG, 'tenant_dn': 'uni/tn-t1'}),
+    (f'{EPG}/subnet-[10.1.1.1/24]', {'tenant': 't1', 'ap': 'app', 'epg': 'web', 'parent': EPG, 'epg_dn': EPG, 'tenant_dn': 'uni/tn-t1'}),
+    (f'{EPG}/rsbd', {'tenant': 't1', 'ap': 'app', 'epg': 'web', 'parent': EPG, 'epg_dn': EPG, 'tenant_dn': 'uni/tn-t1'}),
+    ('uni/tn-t1/brc-c1/subj-s1/rssubjFiltAtt-f1', {'tenant': 't1', 'contract': 'c1', 'subject': 's1', 'parent': 'uni/tn-t1/brc-c1/subj-s1',
+                                                   'contract_dn': 'uni/tn-t1/brc-c1', 'tenant_dn': 'uni/tn-t1'}),
+    ('uni/tn-t1/ctx-v1/rtctx-[uni/tn-t1/BD-b1]', {'tenant': 't1', 'vrf': 'v1', 'parent': 'uni/tn-t1/ctx-v1', 'vrf_dn': 'uni/tn-t1/ctx-v1',
+                                                  'tenant_dn': 'uni/tn-t1', 'bd': 'b1'}),
+    ('uni', {}),
+]
+COLUMNS = ['pod', 'node', 'tenant', 'vrf', 'ap', 'epg', 'bd', 'contract', 'subject', 'interface', 'parent',
+           'node_dn', 'tenant_dn', 'vrf_dn', 'epg_dn', 'contract_dn', 'interface_dn']
+
+def expected_frame(cases: list) -> pd.DataFrame:
+    return pd.DataFrame([{col: values.get(col, np.nan) for col in COLUMNS} for _, values in cases], dtype='str')
+
+@pytest.mark.parametrize('dn, values', CASES)
+def test_parse_dn(dn, values):
+    df = pyapicdn.parse_dn(pd.Series([dn], dtype='str'), COLUMNS)
+    pd.testing.assert_frame_equal(df, expected_frame([(dn, values)]))
+
+@pytest.mark.parametrize('arrow', [True, False], ids=['pyarrow', 'python'])
+def test_parse_dn_table(monkeypatch, arrow):
+    # a table with missing dns keeps its index, the python split gives the same columns as pyarrow
+    if not arrow:
+        monkeypatch.setattr(pyapicdn, 'pa', None)
+    dns = pd.Series([dn for dn, _ in CASES] + [None], index=range(10, 10 + len(CASES) + 1), dtype='str')
+    df = pyapicdn.parse_dn(dns, COLUMNS)
+    pd.testing.assert_frame_equal(df, expected_frame(CASES + [(None, {})]).set_axis(dns.index))
+
+@pytest.mark.parametrize('arrow', [True, False], ids=['pyarrow', 'python'])
+def test_split_dns(monkeypatch, arrow):
+    if not arrow:
+        monkeypatch.setattr(pyapicdn, 'pa', None)
+    head_codes, heads, tail_codes, tails = pyapicdn.split_dns(pd.Series([PHYS, f'{PHYS}/phys/fcot', EPG, PHYS], dtype='str'))
+    assert heads == ['topology/pod-1/node-1101/sys/phys-[', EPG]
+    assert head_codes.tolist() == [0, 0, 1, 0]
+    assert tails == ['eth1/10]', 'eth1/10]/phys/fcot']
+    assert tail_codes.tolist() == [0, 1, -1, 0]
+
+def test_parse_cache():
+    # 48 ports on 10 nodes: each node head and each port tail is parsed once
+    pyapicdn.parse_head.cache_clear()
+    pyapicdn.parse_tail.cache_clear()
+    dns = pd.Series([f'topology/pod-1/node-{1101 + i % 10}/sys/phys-[eth1/{i % 48 + 1}]' for i in range(4800)], dtype='str')
+    df = pyapicdn.parse_dn(dns, ['node', 'interface'])
+    assert df['node'].nunique() == 10 and df['interface'].nunique() == 48
+    assert pyapicdn.parse_head.cache_info().misses == 10
+    assert pyapicdn.parse_tail.cache_info().misses == 48
+    # the next table of the same device finds them parsed
+    pyapicdn.parse_dn(dns.str.cat(['/phys'] * len(dns)), ['node'])
+    assert pyapicdn.parse_head.cache_info().misses == 10
+
+def test_unknown_column():
+    with pytest.raises(ValueError):
+        pyapicdn.parse_dn(pd.Series([EPG], dtype='str'), ['epg_name'])
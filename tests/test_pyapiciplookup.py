@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+import pyapiciplookup
+
+# Longest prefix match of IpEpgIndex: nested prefixes, a prefix shared by two owners or two fabrics, network and broadcast addresses, IPv6.
+
+ENTRIES = [
+    # environment, prefix, source, tenant, epg, bd, dn
+    ('n1', '10.0.0.0/8', 'l3extSubnet', 't1', 'uni/tn-t1/out-o1/instP-ext', None, 'ext-8'),
+    ('n1', '10.1.0.0/16', 'fvSubnet', 't1', 'uni/tn-t1/ap-app/epg-web', 'uni/tn-t1/BD-b1', 'bd-16-web'),
+    ('n1', '10.1.0.0/16', 'fvSubnet', 't1', 'uni/tn-t1/ap-app/epg-app', 'uni/tn-t1/BD-b1', 'bd-16-app'),
+    ('n1', '10.1.2.0/24', 'fvSubnet', 't1', 'uni/tn-t1/ap-app/epg-db', 'uni/tn-t1/BD-b2', 'epg-24'),
+    ('n1', '10.1.2.3/32', 'fvIp', 't1', 'uni/tn-t1/ap-app/epg-db', 'uni/tn-t1/BD-b2', 'ip-32'),
+    ('n2', '10.1.2.0/24', 'fvSubnet', 't2', 'uni/tn-t2/ap-app/epg-db', 'uni/tn-t2/BD-b2', 'n2-epg-24'),
+    ('n1', '2001:db8::/32', 'l3extSubnet', 't1', 'uni/tn-t1/out-o1/instP-ext', None, 'ext-v6-32'),
+    ('n1', '2001:db8:1::/48', 'fvSubnet', 't1', 'uni/tn-t1/ap-app/epg-web', 'uni/tn-t1/BD-b1', 'bd-v6-48'),
+    ('n1', '2001:db8:1::10/128', 'fvIp', 't1', 'uni/tn-t1/ap-app/epg-web', 'uni/tn-t1/BD-b1', 'ip-v6-128'),
+]
+
+CASES = [
+    # address, dn of the matching entries, in entry order (None: no match)
+    ('10.1.2.3', ['ip-32']),                       # the /32 wins over the /24, /16 and /8 containing it
+    ('10.1.2.4', ['epg-24', 'n2-epg-24']),         # the same /24 in two fabrics matches both
+    ('10.1.2.0', ['epg-24', 'n2-epg-24']),         # network address of the /24
+    ('10.1.2.255', ['epg-24', 'n2-epg-24']),       # broadcast address of the /24
+    ('10.1.3.1', ['bd-16-web', 'bd-16-app']),      # a BD subnet shared by two EPGs matches both
+    ('10.1.255.255', ['bd-16-web', 'bd-16-app']),  # last address of the /16
+    ('10.2.0.1', ['ext-8']),
+    ('10.0.0.0', ['ext-8']),
+    ('10.255.255.255', ['ext-8']),
+    ('11.0.0.0', [None]),                          # first address after the /8
+    ('9.255.255.255', [None]),                     # last address before the /8
+    ('2001:db8:1::10', ['ip-v6-128']),
+    ('2001:db8:1::11', ['bd-v6-48']),
+    ('2001:db8:1:ffff:ffff:ffff:ffff:ffff', ['bd-v6-48']),
+    ('2001:db8:2::1', ['ext-v6-32']),
+    ('2001:db9::1', [None]),
+    ('10.1.2.0/24', [None]),                       # a prefix is not an address
+    ('not-an-ip', [None]),
+]
+
+@pytest.fixture(scope='module')
+def index():
+    index = pyapiciplookup.IpEpgIndex()
+    index.add_entries(pd.DataFrame(ENTRIES, columns=pyapiciplookup.ENTRY_COLUMNS))
+    return index
+
+@pytest.mark.parametrize('ip, expected', CASES)
+def test_lookup(index, ip, expected):
+    df = index.lookup([ip])
+    assert df['ip'].tolist() == [ip] * len(expected)
+    assert [dn if isinstance(dn, str) else None for dn in df['dn']] == expected
+
+def test_lookup_batch(index):
+    # a batch gives the same rows as the addresses one by one, in the order of the addresses
+    df = index.lookup([ip for ip, _ in CASES])
+    assert df['ip'].tolist() == [ip for ip, expected in CASES for _ in expected]
+    assert [dn if isinstance(dn, str) else None for dn in df['dn']] == [dn for _, expected in CASES for dn in expected]
+
+def test_add_entries_twice():
+    # prefixes added from a second fabric extend the index
+    index = pyapiciplookup.IpEpgIndex()
+    df = pd.DataFrame(ENTRIES, columns=pyapiciplookup.ENTRY_COLUMNS)
+    index.add_entries(df[df['environment'] == 'n1'])
+    assert index.lookup(['10.1.2.4'])['dn'].tolist() == ['epg-24']
+    index.add_entries(df[df['environment'] == 'n2'])
+    assert index.lookup(['10.1.2.4'])['dn'].tolist() == ['epg-24', 'n2-epg-24']
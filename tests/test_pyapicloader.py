@@ -0,0 +1,63 @@
+import os, time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pytest
+import pyapicloader
+
+# The tables of an xlsx output and of a parquet or feather output read back the same, a missing requested column is left out.
+
+TABLE = pd.DataFrame({'dn': ['topology/pod-1/node-101', 'topology/pod-1/node-102'], 'name': ['leaf1', ''], 'serial': ['1001', '1002']})
+
+def write_output(path, output_format: str) -> str:
+    if output_format == 'xlsx':
+        file = os.path.join(path, 'ciscoapic_n1_20250101_1200.xlsx')
+        with pd.ExcelWriter(file) as writer:
+            TABLE.to_excel(writer, sheet_name='topSystem', index=False)
+        return file
+    file = os.path.join(path, 'ciscoapic_n1_20250101_1200')
+    os.makedirs(file)
+    getattr(TABLE, f'to_{output_format}')(os.path.join(file, f'topSystem.{output_format}'))
+    return file
+
+@pytest.fixture(params=['xlsx', 'parquet', 'feather'])
+def output(request, tmp_path):
+    file = write_output(str(tmp_path), request.param)
+    yield file
+    pyapicloader.clear_cache(file)
+
+@pytest.mark.parametrize('columns, expected', [
+    (['dn', 'name'], ['dn', 'name']),
+    (['dn', 'nope', 'serial'], ['dn', 'serial']),   # a missing column is left out
+])
+def test_read_table_columns(output, columns, expected):
+    df = pyapicloader.read_table(output, 'topSystem', columns)
+    assert list(df.columns) == expected
+    assert len(df) == 2
+
+def test_read_table_types(output):
+    # empty text is NaN and numeric text is numbers, as read_excel gives them
+    df = pyapicloader.read_table(output, 'topSystem', ['name', 'serial'])
+    assert df['name'].isna().tolist() == [False, True]
+    assert df['serial'].tolist() == [1001, 1002]
+
+def test_load_tables_threads(tmp_path, monkeypatch):
+    # analyses of the same output loading in threads read each table once
+    file = write_output(str(tmp_path), 'parquet')
+    reads, read_table = [], pyapicloader.read_table
+    def counted_read(*args):
+        reads.append(args[1])
+        time.sleep(0.05)
+        return read_table(*args)
+    monkeypatch.setattr(pyapicloader, 'read_table', counted_read)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: pyapicloader.load_tables(file, {'topSystem': ['dn', 'name']}), range(4)))
+    pyapicloader.clear_cache(file)
+    assert reads == ['topSystem']
+    assert all(result['topSystem'] is results[0]['topSystem'] for result in results)
+
+def test_load_tables_missing_column(output, monkeypatch):
+    # a requested column missing from the output is not read again by the next analysis
+    assert list(pyapicloader.load_tables(output, {'topSystem': ['dn', 'nope']})['topSystem'].columns) == ['dn']
+    monkeypatch.setattr(pyapicloader, 'read_table', None)
+    monkeypatch.setattr(pyapicloader.pd, 'ExcelFile', None)
+    assert list(pyapicloader.load_tables(output, {'topSystem': ['nope', 'dn']})['topSystem'].columns) == ['dn']
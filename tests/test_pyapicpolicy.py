@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+import pytest
+import pyapicpolicy
+
+# Verdicts of flows over the tenant of conftest.contract_frames, with subnets for its EPGs and the vzEntry of its filters.
+# web -> app: c-app, filter f-web permit, f-block deny. ext -> web: c-web, f-high permit.
+# web, app (vzAny of v1) -> db: c-shared, f-any of tenant common permit. web -> db (vzAny of v2): c-any, f-block deny.
+
+WEB, APP, DB = 'uni/tn-t1/ap-ap1/epg-web', 'uni/tn-t1/ap-ap1/epg-app', 'uni/tn-t1/ap-ap1/epg-db'
+EXT = 'uni/tn-t1/out-o1/instP-ext'
+
+def brc(name: str) -> str:
+    return f'uni/tn-t1/brc-{name}'
+
+def add_policy_frames(frames: dict) -> dict:
+    frames['vzRsSubjFiltAtt'] = pd.DataFrame([
+        (f'{brc("c-app")}/subj-s1/rssubjFiltAtt-f-web', 'f-web', 'permit'),
+        (f'{brc("c-app")}/subj-s1/rssubjFiltAtt-f-block', 'f-block', 'deny'),
+        (f'{brc("c-web")}/subj-s1/rssubjFiltAtt-f-high', 'f-high', 'permit'),
+        (f'{brc("c-shared")}/subj-s1/rssubjFiltAtt-f-any', 'f-any', 'permit'),
+        (f'{brc("c-any")}/subj-s1/rssubjFiltAtt-f-block', 'f-block', 'deny'),
+    ], columns=['dn', 'tnVzFilterName', 'action'])
+    any_port = ('unspecified', 'unspecified')
+    frames['vzEntry'] = pd.DataFrame([
+        ('uni/tn-t1/flt-f-web/e-http', 'http', 'ip', 'tcp', 'http', 'http', *any_port),
+        ('uni/tn-t1/flt-f-web/e-alt', 'alt', 'ip', 'tcp', '8000', '8080', *any_port),
+        ('uni/tn-t1/flt-f-web/e-dns', 'dns', 'ip', 'udp', 'dns', 'dns', *any_port),
+        ('uni/tn-t1/flt-f-block/e-8080', '8080', 'ip', 'tcp', '8080', '8080', *any_port),
+        ('uni/tn-t1/flt-f-block/e-src', 'src', 'ip', 'tcp', '9000', '9000', '1000', '2000'),  # deny from source ports 1000-2000 only
+        ('uni/tn-t1/flt-f-high/e-high', 'high', 'ipv4', 'tcp', '1024', '65535', *any_port),
+        ('uni/tn-t1/flt-f-high/e-udp', 'udp', 'ip', 'udp', *any_port, *any_port),           # any port
+        ('uni/tn-t1/flt-f-high/e-ssh', 'ssh', 'ip', 'tcp', '22', 'unspecified', *any_port),  # one end, port 22 only
+        ('uni/tn-t1/flt-f-high/e-ret', 'ret', 'ip', 'tcp', *any_port, 'http', 'http'),       # return traffic of http, source port 80
+        ('uni/tn-t1/flt-f-high/e-arp', 'arp', 'arp', 'unspecified', *any_port, *any_port),
+        ('uni/tn-common/flt-f-any/e-any', 'any', 'unspecified', 'unspecified', *any_port, *any_port),
+    ], columns=['dn', 'name', 'etherT', 'prot', 'dFromPort', 'dToPort', 'sFromPort', 'sToPort'])
+    frames['fvSubnet'] = pd.DataFrame([('uni/tn-t1/BD-b1/subnet-[10.1.0.1/24]', '10.1.0.1/24'),
+                                       ('uni/tn-t1/BD-b2/subnet-[10.2.0.1/24]', '10.2.0.1/24'),
+                                       ('uni/tn-t1/BD-b3/subnet-[10.3.0.1/24]', '10.3.0.1/24')], columns=['dn', 'ip'])
+    frames['l3extSubnet'] = pd.DataFrame([(f'{EXT}/extsubnet-[192.168.0.0/16]', '192.168.0.0/16')], columns=['dn', 'ip'])
+    frames['fvIp'] = pd.DataFrame(columns=['dn', 'addr'])
+    return frames
+
+IP = {WEB: '10.1.0.10', APP: '10.2.0.10', DB: '10.3.0.10', EXT: '192.168.1.1'}
+
+FLOWS = [
+    # source, destination, protocol, destination port, verdict, reason, contract, filter, entry
+    (WEB, APP, 'tcp', '80', 'permit', 'contract', 'c-app', 'f-web', 'http'),
+    (WEB, APP, '6', 'http', 'permit', 'contract', 'c-app', 'f-web', 'http'),     # protocol and port as number or name
+    (WEB, APP, 'tcp', '79', 'deny', 'implicit_deny', None, None, None),
+    (WEB, APP, 'tcp', '81', 'deny', 'implicit_deny', None, None, None),
+    (WEB, APP, 'tcp', '7999', 'deny', 'implicit_deny', None, None, None),
+    (WEB, APP, 'tcp', '8000', 'permit', 'contract', 'c-app', 'f-web', 'alt'),    # first port of the range
+    (WEB, APP, 'tcp', '8079', 'permit', 'contract', 'c-app', 'f-web', 'alt'),
+    (WEB, APP, 'tcp', '8080', 'deny', 'contract', 'c-app', 'f-block', '8080'),   # last port of the range, deny wins over permit
+    (WEB, APP, 'tcp', '8081', 'deny', 'implicit_deny', None, None, None),
+    (WEB, APP, 'udp', '53', 'permit', 'contract', 'c-app', 'f-web', 'dns'),
+    (WEB, APP, 'tcp', '53', 'deny', 'implicit_deny', None, None, None),          # port of a udp entry
+    (WEB, APP, 'icmp', '', 'deny', 'implicit_deny', None, None, None),
+    (APP, WEB, 'tcp', '80', 'deny', 'implicit_deny', None, None, None),          # the contract has one direction
+    (EXT, WEB, 'tcp', '1023', 'deny', 'implicit_deny', None, None, None),
+    (EXT, WEB, 'tcp', '1024', 'permit', 'contract', 'c-web', 'f-high', 'high'),
+    (EXT, WEB, 'tcp', '65535', 'permit', 'contract', 'c-web', 'f-high', 'high'),
+    (EXT, WEB, 'udp', '0', 'permit', 'contract', 'c-web', 'f-high', 'udp'),      # unspecified ports are 0 to 65535
+    (EXT, WEB, 'udp', '65535', 'permit', 'contract', 'c-web', 'f-high', 'udp'),
+    (EXT, WEB, 'tcp', '22', 'permit', 'contract', 'c-web', 'f-high', 'ssh'),
+    (EXT, WEB, 'tcp', '21', 'deny', 'implicit_deny', None, None, None),
+    (EXT, WEB, 'tcp', '23', 'deny', 'implicit_deny', None, None, None),
+    (EXT, WEB, 'tcp', '1000', 'deny', 'implicit_deny', None, None, None),        # the return traffic entry needs source port 80
+    (EXT, WEB, 'icmp', '', 'deny', 'implicit_deny', None, None, None),           # the arp entry never matches an IP flow
+    (WEB, DB, 'icmp', '', 'permit', 'contract', 'c-shared', 'f-any', 'any'),    # vzAny consumer, filter of tenant common
+    (WEB, DB, 'tcp', '0', 'permit', 'contract', 'c-shared', 'f-any', 'any'),
+    (WEB, DB, 'tcp', '8080', 'deny', 'contract', 'c-any', 'f-block', '8080'),   # deny of one contract wins over permit of another
+    (WEB, DB, 'tcp', '8081', 'permit', 'contract', 'c-shared', 'f-any', 'any'),
+    (APP, DB, 'tcp', '8080', 'permit', 'contract', 'c-shared', 'f-any', 'any'),  # app does not consume c-any
+    (DB, WEB, 'tcp', '80', 'deny', 'implicit_deny', None, None, None),
+]
+
+@pytest.fixture(scope='module')
+def evaluator(make_contract_frames):
+    return pyapicpolicy.PolicyEvaluator(add_policy_frames(make_contract_frames()))
+
+def to_flows(rows) -> pd.DataFrame:
+    return pd.DataFrame([(IP[src], IP[dst], prot, '40000', port) for src, dst, prot, port, *_ in rows], columns=pyapicpolicy.FLOW_COLUMNS)
+
+def to_expected(rows) -> list:
+    return [(src, dst, verdict, reason, contract and brc(contract), filter, entry) for src, dst, _, _, verdict, reason, contract, filter, entry in rows]
+
+def to_result(df: pd.DataFrame) -> list:
+    columns = ['src_epg', 'dst_epg', 'verdict', 'reason', 'contract', 'filter', 'entry']
+    return [tuple(None if pd.isna(value) else value for value in row) for row in df[columns].to_numpy(dtype=object)]
+
+@pytest.mark.parametrize('flow', FLOWS)
+def test_evaluate(evaluator, flow):
+    assert to_result(evaluator.evaluate(to_flows([flow]))) == to_expected([flow])
+
+def test_evaluate_batch(evaluator):
+    # one batch gives the verdicts of the flows one by one, in flow order
+    assert to_result(evaluator.evaluate(to_flows(FLOWS))) == to_expected(FLOWS)
+
+SOURCE_PORT_FLOWS = [
+    # source, destination, protocol, source port, destination port, verdict, entry
+    (EXT, WEB, 'tcp', '80', '1000', 'permit', 'ret'),
+    (EXT, WEB, 'tcp', 'http', '1000', 'permit', 'ret'),
+    (EXT, WEB, 'tcp', '79', '1000', 'deny', None),
+    (EXT, WEB, 'tcp', '81', '1000', 'deny', None),
+    (EXT, WEB, 'tcp', '', '1000', 'deny', None),         # no source port, only entries of any source port match
+    (EXT, WEB, 'tcp', '', '1024', 'permit', 'high'),
+    (EXT, WEB, 'tcp', '80', '1024', 'permit', 'high'),
+    (WEB, DB, 'tcp', '999', '9000', 'permit', 'any'),
+    (WEB, DB, 'tcp', '1000', '9000', 'deny', 'src'),     # first source port of the deny entry
+    (WEB, DB, 'tcp', '2000', '9000', 'deny', 'src'),     # last source port of the deny entry
+    (WEB, DB, 'tcp', '2001', '9000', 'permit', 'any'),
+    (WEB, DB, 'tcp', '1500', '9001', 'permit', 'any'),
+]
+
+@pytest.mark.parametrize('src, dst, prot, src_port, dst_port, verdict, entry', SOURCE_PORT_FLOWS)
+def test_evaluate_source_port(evaluator, src, dst, prot, src_port, dst_port, verdict, entry):
+    df = evaluator.evaluate(pd.DataFrame([(IP[src], IP[dst], prot, src_port, dst_port)], columns=pyapicpolicy.FLOW_COLUMNS))
+    assert [(v, e if isinstance(e, str) else None) for v, e in df[['verdict', 'entry']].to_numpy()] == [(verdict, entry)]
+
+def test_entries_without_source_ports(make_contract_frames, caplog):
+    # an output without sFromPort/sToPort evaluates the destination only, with a warning
+    frames = add_policy_frames(make_contract_frames())
+    frames['vzEntry'] = frames['vzEntry'].drop(columns=['sFromPort', 'sToPort'])
+    evaluator = pyapicpolicy.PolicyEvaluator(frames)
+    assert 'sFromPort' in caplog.text
+    df = evaluator.evaluate(pd.DataFrame([(IP[EXT], IP[WEB], 'tcp', '40000', '1000')], columns=pyapicpolicy.FLOW_COLUMNS))
+    assert df['verdict'].tolist() == ['permit']
+
+@pytest.mark.parametrize('src_ip, dst_ip, verdict, reason', [
+    ('10.1.0.10', '10.1.0.11', 'permit', 'intra_epg'),   # same EPG, no contract needed
+    ('10.1.0.10', '10.1.0.255', 'permit', 'intra_epg'),
+    ('10.3.0.10', '10.3.0.11', 'permit', 'intra_epg'),
+    ('172.16.0.1', '10.1.0.10', 'deny', 'no_epg'),
+    ('10.1.0.10', '10.1.1.0', 'deny', 'no_epg'),         # first address after the BD subnet
+])
+def test_evaluate_without_contract(evaluator, src_ip, dst_ip, verdict, reason):
+    df = evaluator.evaluate(pd.DataFrame([(src_ip, dst_ip, 'tcp', '40000', '8080')], columns=pyapicpolicy.FLOW_COLUMNS))
+    assert df[['verdict', 'reason']].to_numpy().tolist() == [[verdict, reason]]
+
+@pytest.mark.parametrize('values, expected', [
+    (['tcp', 'TCP', '6', 6, '6.0', 'udp', 'unspecified', '', None, np.nan, 'bogus'], [6, 6, 6, 6, 6, 17, -1, -1, -1, -1, -1]),
+])
+def test_to_number_protocol(values, expected):
+    assert pyapicpolicy.to_number(values, pyapicpolicy.PROTOCOLS).tolist() == expected
+
+@pytest.mark.parametrize('values, expected', [
+    (['https', 'ftpData', '0', '65535', 65535, 'unspecified'], [443, 20, 0, 65535, 65535, -1]),
+])
+def test_to_number_port(values, expected):
+    assert pyapicpolicy.to_number(values, pyapicpolicy.PORTS).tolist() == expected
@@ -0,0 +1,75 @@
+import json
+import pandas as pd
+import pytest
+import pyapicstream
+
+# ImdataStream decodes a response split at any byte, ColumnBuffers builds the frame of pd.DataFrame(list of dicts)
+# across the flushes of its batches.
+
+KEY = 'fvCEp'
+OBJECTS = [
+    {'dn': 'uni/tn-t1/ap-app/epg-web/cep-00:50:56:00:00:01', 'mac': '00:50:56:00:00:01', 'name': 'café-ü', 'encap': 'vlan-10'},
+    {'dn': 'uni/tn-t1/ap-app/epg-web/cep-00:50:56:00:00:02', 'mac': '00:50:56:00:00:02', 'descr': 'quote " and \\ slash'},
+    {'dn': 'uni/tn-t1/ap-app/epg-db/cep-00:50:56:00:00:03', 'mac': '00:50:56:00:00:03', 'name': '', 'ip': '10.0.0.3'},
+]
+
+def body(objects: list, total_first: bool = True, indent: int = None) -> bytes:
+    imdata = [{KEY: {'attributes': attributes}} for attributes in objects]
+    response = {'totalCount': str(len(objects)), 'imdata': imdata} if total_first else {'imdata': imdata, 'totalCount': len(objects)}
+    return json.dumps(response, indent=indent, ensure_ascii=False).encode('utf-8')
+
+def chunks(data: bytes, size: int) -> list:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize('total_first, indent', [(True, None), (False, None), (True, 2)], ids=['compact', 'total-last', 'indented'])
+def test_chunk_boundaries(total_first, indent):
+    # every chunk size splits the body inside strings, multi-byte characters, numbers and whitespace somewhere
+    data = body(OBJECTS, total_first, indent)
+    for size in range(1, 64):
+        stream = pyapicstream.ImdataStream(chunks(data, size), KEY)
+        assert list(stream) == OBJECTS, size
+        assert (stream.total, stream.count, stream.bytes) == (3, 3, len(data))
+
+def test_empty_and_without_total():
+    stream = pyapicstream.ImdataStream([b'{"imdata": []}'], KEY)
+    assert list(stream) == []
+    assert (stream.total, stream.count) == (None, 0)
+
+@pytest.mark.parametrize('data', [body(OBJECTS)[:-5], b'{"imdata": [}', b''], ids=['truncated', 'invalid', 'empty'])
+def test_invalid_response(data):
+    with pytest.raises(ValueError):
+        list(pyapicstream.ImdataStream(chunks(data, 7), KEY))
+
+def test_iter_attributes():
+    page = json.loads(body(OBJECTS))
+    assert list(pyapicstream.iter_attributes(page, KEY)) == OBJECTS
+    assert list(pyapicstream.iter_attributes(pyapicstream.ImdataStream([body(OBJECTS)], KEY), KEY)) == OBJECTS
+
+def make_objects(rows: int) -> list:
+    # columns that start after the first batch, stop before the last one, and a column of missing values only
+    return [{'dn': f'uni/tn-t1/ap-app/epg-e{i}', 'name': f'e{i}' if i % 3 else '', **({'late': f'l{i}'} if i >= 7 else {}),
+             **({'early': f'x{i}'} if i < 4 else {}), 'none': None} for i in range(rows)]
+
+@pytest.mark.parametrize('batch_rows', [3, 4, 1000], ids=['batch-3', 'batch-4', 'one-batch'])
+@pytest.mark.parametrize('keep, drop', [(None, None), ({'dn', 'late'}, None), (None, {'name', 'none'})], ids=['all', 'keep', 'drop'])
+def test_column_buffers(monkeypatch, batch_rows, keep, drop):
+    monkeypatch.setattr(pyapicstream, 'BATCH_ROWS', batch_rows)
+    objects = make_objects(10)
+    buffers = pyapicstream.ColumnBuffers(keep, drop)
+    for attributes in objects:
+        buffers.append(attributes)
+    expected = pd.DataFrame(objects)
+    columns = [col for col in expected.columns if (keep is None or col in keep) and (drop is None or col not in drop)]
+    pd.testing.assert_frame_equal(buffers.to_frame(), expected[columns])
+
+def test_column_buffers_not_strings(monkeypatch):
+    # a column that turns out not to be strings after a flush keeps its values
+    monkeypatch.setattr(pyapicstream, 'BATCH_ROWS', 2)
+    buffers = pyapicstream.ColumnBuffers()
+    values = ['a', 'b', 'c', {'nested': 1}, None]
+    for value in values:
+        buffers.append({'value': value})
+    assert buffers.to_frame()['value'].tolist() == values
+
+def test_column_buffers_empty():
+    assert pyapicstream.ColumnBuffers().to_frame().empty
@@ -0,0 +1,77 @@
+import os
+import pandas as pd
+import pytest
+import pysnapshot
+import pyapicapi
+
+# SnapshotStore round trip of single and paged responses, the latest completed snapshot, and an offline replay
+# through the parsing of the real device giving the same table as the live responses.
+
+DEVICE = {'device_type': 'cisco_apic', 'environment': 'n1', 'ip': '10.0.0.1'}
+
+def page(first: int, count: int, total: int = 5) -> dict:
+    return {'totalCount': str(total), 'imdata': [{'fvTenant': {'attributes': {'dn': f'uni/tn-t{i}', 'name': f't{i}', 'descr': ''}}}
+                                                 for i in range(first, first + count)]}
+
+PAGES = [page(0, 2), page(2, 2), page(4, 1)]
+
+@pytest.fixture
+def store(tmp_path):
+    return pysnapshot.SnapshotStore(str(tmp_path / '20250101_1200' / 'ciscoapic_n1'))
+
+def test_single_response(store):
+    assert store.save('fvTenant', PAGES[0]) == PAGES[0]
+    assert store.load('fvTenant') == PAGES[0]
+    assert store.keys() == ['fvTenant']
+
+def test_pages(store):
+    # the pages pass through to the caller as they are written
+    saved = store.save('fvTenant', iter(PAGES))
+    assert store.page_files('fvTenant') == []
+    assert next(saved) == PAGES[0]
+    assert len(store.page_files('fvTenant')) == 1
+    assert list(saved) == PAGES[1:]
+    assert list(store.load('fvTenant')) == PAGES
+
+def test_save_replaces_pages(store):
+    list(store.save('fvTenant', iter(PAGES)))
+    store.save('fvTenant', PAGES[0])
+    assert store.load('fvTenant') == PAGES[0]
+
+def test_load_missing(store):
+    with pytest.raises(FileNotFoundError):
+        store.load('fvTenant')
+
+def test_find_latest_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(pysnapshot, 'SNAPSHOT_DIR_FULL', str(tmp_path))
+    for batch, completed in [('20250101_1200', True), ('20250102_1200', True), ('20250103_1200', False)]:
+        store = pysnapshot.SnapshotStore(pysnapshot.get_snapshot_dir(DEVICE, os.path.join(str(tmp_path), batch)))
+        store.save('fvTenant', PAGES[0])
+        if completed:
+            store.write_meta(DEVICE, ['fvTenant'])
+    latest = pysnapshot.find_latest_snapshot
+    # an incomplete collection is skipped, as are the snapshots of the current batch and later
+    assert latest(DEVICE, '20250104_1200') == os.path.join(str(tmp_path), '20250102_1200', 'ciscoapic_n1')
+    assert latest(DEVICE, '20250102_1200') == os.path.join(str(tmp_path), '20250101_1200', 'ciscoapic_n1')
+    assert latest(DEVICE, '20250101_1200') is None
+    assert latest({**DEVICE, 'environment': 'n2'}, '20250104_1200') is None
+
+@pytest.mark.parametrize('responses', [PAGES[0], PAGES], ids=['single', 'pages'])
+def test_offline_replay(store, responses):
+    live = pyapicapi.CiscoApicDevice(DEVICE['ip'], 'admin', 'pass')
+    live.environment = DEVICE['environment']
+    live.snapshot = store
+    table = {'key': 'fvTenant', 'remove_properties': ['descr']}
+    json_obj = responses if isinstance(responses, dict) else iter(responses)
+    live.get_json = lambda table, token: json_obj
+    df_live = pyapicapi.process_table(live, table, '', 1)
+    store.write_meta(DEVICE, ['fvTenant'])
+
+    offline = pyapicapi.OfflineDevice(live, pysnapshot.SnapshotStore(store.path))
+    assert offline.login() == ''
+    with pytest.raises(RuntimeError, match='offline snapshot'):
+        offline.get_api_resp('fvTenant', '')
+    df_offline = pyapicapi.process_table(offline, table, '', 1)
+    pd.testing.assert_frame_equal(df_offline, df_live)
+    assert df_offline['name'].tolist() == [f't{i}' for i in range(len(df_live))]
+    assert 'descr' not in df_offline.columns
@@ -0,0 +1,78 @@
+import ipaddress
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+import pysubnet
+
+# to_subnet and to_network give what ipaddress gives, from the address integers of pyarrow and from ipaddress alone:
+# host and network addresses, /0 and /32, values out of range, netmasks, IPv6, empty and missing values.
+
+CASES = [
+    # address, subnet
+    ('10.0.0.1/24', '10.0.0.0/24'),
+    ('10.0.0.0/24', '10.0.0.0/24'),
+    ('10.1.2.3/16', '10.1.0.0/16'),
+    ('192.168.255.255/17', '192.168.128.0/17'),
+    ('255.255.255.255/31', '255.255.255.254/31'),
+    ('10.0.0.1', '10.0.0.1/32'),
+    ('10.0.0.1/32', '10.0.0.1/32'),
+    ('10.0.0.1/0', '0.0.0.0/0'),
+    ('0.0.0.0/8', '0.0.0.0/8'),
+    ('10.0.0.1/255.255.255.0', '10.0.0.0/24'),     # netmask, left to ipaddress
+    ('2001:db8::1/64', '2001:db8::/64'),
+    ('2001:db8::1', '2001:db8::1/128'),
+    ('256.0.0.1/24', ''),                          # octet out of range
+    ('10.0.0.1/33', ''),                           # prefix out of range
+    ('010.0.0.1/24', ''),                          # leading zero
+    ('10.0.0/24', ''),
+    ('10.0.0.1.1', ''),
+    ('not-an-ip', ''),
+    ('', ''),
+    (None, ''),
+]
+
+@pytest.fixture(params=[True, False], ids=['pyarrow', 'python'])
+def arrow(request, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(pysubnet, 'pa', None)
+    return request.param
+
+def test_to_subnet(arrow):
+    ips = pd.Series([ip for ip, _ in CASES] * 2, index=range(5, 5 + 2 * len(CASES)), dtype='str')
+    subnets = pysubnet.to_subnet(ips)
+    assert subnets.index.equals(ips.index)
+    assert subnets.tolist() == [subnet for _, subnet in CASES] * 2
+
+@pytest.mark.parametrize('ip, subnet', CASES)
+def test_calculate_subnet(ip, subnet):
+    assert pysubnet.calculate_subnet(ip) == subnet
+
+def test_to_network(arrow):
+    version, network, prefix = pysubnet.to_network([ip for ip, _ in CASES])
+    for ip, subnet, v, n, p in zip([ip for ip, _ in CASES], [subnet for _, subnet in CASES], version, network, prefix):
+        if subnet:
+            net = ipaddress.ip_network(subnet)
+            assert (v, n, p) == (net.version, int(net.network_address), net.prefixlen), ip
+        else:
+            assert v == 0, ip
+
+def test_ipv4_networks():
+    # positions of the dotted quads with a valid address and prefix, the others are left to ipaddress
+    ips = pa.array(['10.0.0.1/24', '2001:db8::1', '10.0.0.1/255.255.255.0', '256.0.0.1', '172.16.5.4', None], type=pa.string())
+    pos, network, prefix = pysubnet.ipv4_networks(ips)
+    assert pos.tolist() == [0, 4]
+    assert network.tolist() == [int(ipaddress.ip_address('10.0.0.0')), int(ipaddress.ip_address('172.16.5.4'))]
+    assert prefix.tolist() == [24, 32]
+    pos, network, prefix = pysubnet.ipv4_networks(pa.array(['2001:db8::1'], type=pa.string()))
+    assert (len(pos), len(network), len(prefix)) == (0, 0, 0)
+
+@pytest.mark.parametrize('destination, address', [
+    ('/Common/10.1.1.1:443', '10.1.1.1'),
+    ('/Common/10.1.1.1%2:443', '10.1.1.1'),
+    ('/Common/10.1.1.1:any', '10.1.1.1'),
+    ('/Common/2001:db8::1.443', '2001:db8::1'),
+    ('/Common/2001:db8::1%3.80', '2001:db8::1'),
+])
+def test_f5_destination_address(destination, address):
+    assert pysubnet.f5_destination_address(pd.Series([destination], dtype='str')).tolist() == [address]
@@ -0,0 +1,135 @@
+import json, os, stat
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import pytoken
+import pyapicapi
+
+# TokenManager on a fake clock: refresh at refresh_ratio of the timeout, login again when a refresh can not extend the token,
+# a private cache file, one login for callers holding the same rejected token, the creation time of an extended token.
+
+class FakeDevice:
+    def __init__(self, timeout: int = 100, refresh_timeout: int = 100, refresh_token: str = None, refresh_error: bool = False):
+        self.timeout, self.refresh_timeout = timeout, refresh_timeout
+        self.refresh_token, self.refresh_error = refresh_token, refresh_error
+        self.logins, self.refreshes = 0, 0
+
+    def login(self) -> tuple:
+        self.logins += 1
+        return f'login{self.logins}', self.timeout
+
+    def refresh(self, token: str) -> tuple:
+        self.refreshes += 1
+        if self.refresh_error:
+            raise RuntimeError('refresh rejected')
+        return self.refresh_token or token, self.refresh_timeout
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pytoken.time, 'time', lambda: now[0])
+    return now
+
+def make_manager(device: FakeDevice, **kwargs) -> pytoken.TokenManager:
+    return pytoken.TokenManager('apic|10.0.0.1|admin', device.login, device.refresh, **kwargs)
+
+@pytest.mark.parametrize('elapsed, refreshes', [
+    (0, 0),
+    (49, 0),
+    (50, 1),      # refresh_ratio 0.5 of the 100s timeout
+    (99, 1),
+])
+def test_refresh_ratio(clock, elapsed, refreshes):
+    device = FakeDevice()
+    tokens = make_manager(device)
+    assert tokens.get() == 'login1'
+    clock[0] += elapsed
+    assert tokens.get() == 'login1'
+    assert (device.logins, device.refreshes) == (1, refreshes)
+
+@pytest.mark.parametrize('device, logins', [
+    (FakeDevice(refresh_timeout=100), 1),                    # extended
+    (FakeDevice(refresh_timeout=40), 2),                     # no longer than the 50s left, login again
+    (FakeDevice(refresh_error=True), 2),                     # refresh failed, login again
+])
+def test_refresh_or_login(clock, device, logins):
+    tokens = make_manager(device)
+    tokens.get()
+    clock[0] += 50
+    tokens.get()
+    assert (device.logins, device.refreshes) == (logins, 1)
+
+def test_refresh_without_refresh_api(clock):
+    device = FakeDevice()
+    tokens = pytoken.TokenManager('apic|10.0.0.1|admin', device.login)
+    tokens.get()
+    clock[0] += 50
+    assert tokens.get() == 'login2'
+
+@pytest.mark.parametrize('refresh_token, created', [
+    (None, 1000.0),        # the same token extended keeps its creation time
+    ('renewed', 1050.0),   # a new token starts again
+])
+def test_created(clock, refresh_token, created):
+    tokens = make_manager(FakeDevice(refresh_token=refresh_token))
+    tokens.get()
+    clock[0] += 50
+    tokens.get()
+    assert (tokens.issued, tokens.created) == (1050.0, created)
+
+def test_relogin_once(clock):
+    # callers holding the same rejected token login once, the second gets the new token
+    device = FakeDevice()
+    tokens = make_manager(device)
+    stale = tokens.get()
+    assert tokens.relogin(stale) == 'login2'
+    assert tokens.relogin(stale) == 'login2'
+    assert device.logins == 2
+
+def test_relogin_threads(clock):
+    # threads rejected at the same time wait for the first relogin and take its token
+    device = FakeDevice()
+    tokens = make_manager(device)
+    stale = tokens.get()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(lambda _: tokens.relogin(stale), range(4))) == ['login2'] * 4
+    assert device.logins == 2
+
+def test_cache_file(clock, tmp_path):
+    cache_file = str(tmp_path / 'cache' / 'token_cache.json')
+    device = FakeDevice(refresh_token=None)
+    tokens = make_manager(device, cache_file=cache_file)
+    tokens.get()
+    clock[0] += 50
+    tokens.get()
+    assert stat.S_IMODE(os.stat(cache_file).st_mode) == 0o600
+    with open(cache_file) as f:
+        assert json.load(f) == {tokens.name: {'token': 'login1', 'issued': 1050.0, 'created': 1000.0, 'timeout': 100}}
+
+    # the next run loads the token and its creation time without a login, until the refresh ratio
+    device2 = FakeDevice()
+    tokens2 = make_manager(device2, cache_file=cache_file)
+    assert (tokens2.get(), tokens2.created, device2.logins) == ('login1', 1000.0, 0)
+    clock[0] += 50
+    make_manager(device2, cache_file=cache_file).get()
+    assert device2.logins == 1
+
+def test_f5_refresh_timeout(clock, monkeypatch):
+    # the F5 timeout counts from the login, a token extended up to its maximum is replaced by a new login
+    device = pyapicapi.F5LtmDevice('10.0.0.2', 'admin', 'pass')
+    monkeypatch.setattr(device, 'get_token', lambda: 'f5token')
+    device.login()
+
+    class Response:
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return {'timeout': 1200}
+    monkeypatch.setattr(device.session, 'patch', lambda url, data: Response())
+    clock[0] += 600
+    device.login()
+    assert (device.tokens.created, device.tokens.timeout) == (1000.0, 600)
+    # 1200s from the login leave 300s, no more than the token has left
+    monkeypatch.setattr(device, 'get_token', lambda: 'f5token2')
+    clock[0] += 300
+    assert device.login() == 'f5token2'
+    assert (device.tokens.created, device.session.headers['X-F5-Auth-Token']) == (1900.0, 'f5token2')